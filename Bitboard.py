@@ -0,0 +1,225 @@
+# bitboard backed chess board
+# Bit n of every bitboard is the square with board index n (see Squares), so a1 is bit 0 and h8 is bit 63.
+import Board
+import Pieces
+import Squares
+
+FULL_BOARD = (1 << 64) - 1
+ROW_MASKS = [0xff << (8 * row) for row in range(8)]
+
+
+def get_bitboard_of_indices(indices):
+    bitboard = 0
+    for index in indices:
+        bitboard |= 1 << index
+    return bitboard
+
+
+def get_lowest_index(bitboard):
+    return (bitboard & -bitboard).bit_length() - 1
+
+
+def get_highest_index(bitboard):
+    return bitboard.bit_length() - 1
+
+
+def get_indices_of_bitboard(bitboard):
+    indices = []
+    while bitboard:
+        lowest_bit = bitboard & -bitboard
+        indices.append(lowest_bit.bit_length() - 1)
+        bitboard ^= lowest_bit
+    return indices
+
+
+KNIGHT_ATTACKS = [get_bitboard_of_indices(Squares.KNIGHT_TARGETS[index]) for index in range(64)]
+KING_ATTACKS = [get_bitboard_of_indices(Squares.KING_TARGETS[index]) for index in range(64)]
+PAWN_ATTACKS = {color: [get_bitboard_of_indices(Squares.PAWN_ATTACKS[color][index]) for index in range(64)]
+                for color in (Pieces.Piece.WHITE, Pieces.Piece.BLACK)}
+# RAY_MASKS[direction][index]: every square from index (exclusive) to the edge of the board in direction
+RAY_MASKS = {direction: [get_bitboard_of_indices(Squares.RAYS[direction][index]) for index in range(64)]
+             for direction in Squares.ALL_DIRECTIONS}
+# directions walking towards higher indices find their first blocker with the lowest set bit, the others the highest
+IS_POSITIVE_DIRECTION = {direction: direction[0] * 8 + direction[1] > 0 for direction in Squares.ALL_DIRECTIONS}
+
+
+def get_sliding_attacks(index, occupied, directions):
+    # squares attacked along directions, up to and including the first occupied square in each of them
+    attacks = 0
+    for direction in directions:
+        ray = RAY_MASKS[direction][index]
+        blockers = ray & occupied
+        if blockers:
+            if IS_POSITIVE_DIRECTION[direction]:
+                first_blocker = get_lowest_index(blockers)
+            else:
+                first_blocker = get_highest_index(blockers)
+            ray ^= RAY_MASKS[direction][first_blocker]
+        attacks |= ray
+    return attacks
+
+
+def get_bishop_attacks(index, occupied):
+    return get_sliding_attacks(index, occupied, Squares.DIAGONAL_DIRECTIONS)
+
+
+def get_rook_attacks(index, occupied):
+    return get_sliding_attacks(index, occupied, Squares.ORTHOGONAL_DIRECTIONS)
+
+
+class BitboardChessBoard(Board.ChessBoard):
+    # Same rules and interface as ChessBoard, but keeps twelve piece bitboards plus occupancy masks next to the
+    # mailbox and answers move generation and attack queries from them.
+    # Select it by constructing BitboardChessBoard() instead of Board.ChessBoard()
+
+    def __init__(self):
+        # must exist before the base class places the starting pieces
+        self.piece_bitboards = {symbol: 0 for symbol in 'PNBRQKpnbrqk'}
+        self.color_occupancy = {Pieces.Piece.WHITE: 0, Pieces.Piece.BLACK: 0}
+        self.occupied = 0
+        super().__init__()
+
+    def assign_value_to_index(self, value, index):
+        previous_value = self.board[index]
+        bit = 1 << index
+        if previous_value != self.EMPTY_SQUARE:
+            self.piece_bitboards[previous_value.symbol] ^= bit
+            self.color_occupancy[previous_value.color] ^= bit
+        if value != self.EMPTY_SQUARE:
+            self.piece_bitboards[value.symbol] |= bit
+            self.color_occupancy[value.color] |= bit
+        self.occupied = self.color_occupancy[Pieces.Piece.WHITE] | self.color_occupancy[Pieces.Piece.BLACK]
+        super().assign_value_to_index(value, index)
+
+    def get_attackers_bitboard(self, index, color_of_attacking_side):
+        bitboards = self.piece_bitboards
+        if color_of_attacking_side == Pieces.Piece.WHITE:
+            pawn, knight, bishop, rook, queen, king = 'P', 'N', 'B', 'R', 'Q', 'K'
+            pawn_attacks_from = PAWN_ATTACKS[Pieces.Piece.BLACK][index]
+        else:
+            pawn, knight, bishop, rook, queen, king = 'p', 'n', 'b', 'r', 'q', 'k'
+            pawn_attacks_from = PAWN_ATTACKS[Pieces.Piece.WHITE][index]
+        queens = bitboards[queen]
+        return (KNIGHT_ATTACKS[index] & bitboards[knight]) \
+            | (KING_ATTACKS[index] & bitboards[king]) \
+            | (pawn_attacks_from & bitboards[pawn]) \
+            | (get_bishop_attacks(index, self.occupied) & (bitboards[bishop] | queens)) \
+            | (get_rook_attacks(index, self.occupied) & (bitboards[rook] | queens))
+
+    def get_attackers_of_index(self, index, color_of_attacking_side):
+        return get_indices_of_bitboard(self.get_attackers_bitboard(index, color_of_attacking_side))
+
+    def is_index_attacked_by(self, index, color_of_attacking_side):
+        return self.get_attackers_bitboard(index, color_of_attacking_side) != 0
+
+    def is_index_attacked_without_king(self, index, color_of_attacking_side, king_index):
+        occupied = self.occupied
+        self.occupied = occupied & ~(1 << king_index)
+        is_attacked = self.get_attackers_bitboard(index, color_of_attacking_side) != 0
+        self.occupied = occupied
+        return is_attacked
+
+    def append_moves_to_targets(self, moves, origin_index, targets):
+        while targets:
+            lowest_bit = targets & -targets
+            moves.append((origin_index, lowest_bit.bit_length() - 1))
+            targets ^= lowest_bit
+
+    def append_pawn_moves(self, moves, origin_index, destination_index, promotion_row):
+        if destination_index >> 3 == promotion_row:
+            for promotion in self.PROMOTION_PIECES:
+                moves.append((origin_index, destination_index, promotion))
+        else:
+            moves.append((origin_index, destination_index))
+
+    def generate_pseudo_legal_captures(self, color=None):
+        if color is None:
+            color = self.get_color_to_move()
+        bitboards = self.piece_bitboards
+        occupied = self.occupied
+        if color == Pieces.Piece.WHITE:
+            pawn, knight, bishop, rook, queen, king = 'P', 'N', 'B', 'R', 'Q', 'K'
+            opponent = self.color_occupancy[Pieces.Piece.BLACK]
+            promotion_row = 7
+            promotion_pushes = (bitboards[pawn] << 8) & ~occupied & ROW_MASKS[promotion_row]
+            forward = 8
+        else:
+            pawn, knight, bishop, rook, queen, king = 'p', 'n', 'b', 'r', 'q', 'k'
+            opponent = self.color_occupancy[Pieces.Piece.WHITE]
+            promotion_row = 0
+            promotion_pushes = (bitboards[pawn] >> 8) & ~occupied & ROW_MASKS[promotion_row]
+            forward = -8
+
+        moves = []
+        capture_targets = opponent
+        if self.en_passant_index is not None:
+            capture_targets |= 1 << self.en_passant_index
+        for origin_index in get_indices_of_bitboard(bitboards[pawn]):
+            for destination_index in get_indices_of_bitboard(PAWN_ATTACKS[color][origin_index] & capture_targets):
+                self.append_pawn_moves(moves, origin_index, destination_index, promotion_row)
+        for destination_index in get_indices_of_bitboard(promotion_pushes):
+            self.append_pawn_moves(moves, destination_index - forward, destination_index, promotion_row)
+
+        for origin_index in get_indices_of_bitboard(bitboards[knight]):
+            self.append_moves_to_targets(moves, origin_index, KNIGHT_ATTACKS[origin_index] & opponent)
+        for origin_index in get_indices_of_bitboard(bitboards[bishop] | bitboards[queen]):
+            self.append_moves_to_targets(moves, origin_index, get_bishop_attacks(origin_index, occupied) & opponent)
+        for origin_index in get_indices_of_bitboard(bitboards[rook] | bitboards[queen]):
+            self.append_moves_to_targets(moves, origin_index, get_rook_attacks(origin_index, occupied) & opponent)
+        for origin_index in get_indices_of_bitboard(bitboards[king]):
+            self.append_moves_to_targets(moves, origin_index, KING_ATTACKS[origin_index] & opponent)
+        return moves
+
+    def generate_pseudo_legal_moves(self, color=None):
+        if color is None:
+            color = self.get_color_to_move()
+        bitboards = self.piece_bitboards
+        own = self.color_occupancy[color]
+        occupied = self.occupied
+        not_own = ~own & FULL_BOARD
+        if color == Pieces.Piece.WHITE:
+            pawn, knight, bishop, rook, queen, king = 'P', 'N', 'B', 'R', 'Q', 'K'
+            forward, double_push_row, promotion_row = 8, 3, 7
+            opponent = self.color_occupancy[Pieces.Piece.BLACK]
+        else:
+            pawn, knight, bishop, rook, queen, king = 'p', 'n', 'b', 'r', 'q', 'k'
+            forward, double_push_row, promotion_row = -8, 4, 0
+            opponent = self.color_occupancy[Pieces.Piece.WHITE]
+
+        moves = []
+
+        # pawns: pushes are shifted a whole set at a time, captures come from the attack masks
+        pawns = bitboards[pawn]
+        empty = ~occupied & FULL_BOARD
+        if forward > 0:
+            single_pushes = (pawns << 8) & empty
+            double_pushes = (single_pushes << 8) & empty & ROW_MASKS[double_push_row]
+        else:
+            single_pushes = (pawns >> 8) & empty
+            double_pushes = (single_pushes >> 8) & empty & ROW_MASKS[double_push_row]
+        for destination_index in get_indices_of_bitboard(single_pushes):
+            self.append_pawn_moves(moves, destination_index - forward, destination_index, promotion_row)
+        for destination_index in get_indices_of_bitboard(double_pushes):
+            moves.append((destination_index - 2 * forward, destination_index))
+        capture_targets = opponent
+        if self.en_passant_index is not None:
+            capture_targets |= 1 << self.en_passant_index
+        for origin_index in get_indices_of_bitboard(pawns):
+            for destination_index in get_indices_of_bitboard(PAWN_ATTACKS[color][origin_index] & capture_targets):
+                self.append_pawn_moves(moves, origin_index, destination_index, promotion_row)
+
+        for origin_index in get_indices_of_bitboard(bitboards[knight]):
+            self.append_moves_to_targets(moves, origin_index, KNIGHT_ATTACKS[origin_index] & not_own)
+        for origin_index in get_indices_of_bitboard(bitboards[bishop] | bitboards[queen]):
+            self.append_moves_to_targets(moves, origin_index, get_bishop_attacks(origin_index, occupied) & not_own)
+        for origin_index in get_indices_of_bitboard(bitboards[rook] | bitboards[queen]):
+            self.append_moves_to_targets(moves, origin_index, get_rook_attacks(origin_index, occupied) & not_own)
+
+        for origin_index in get_indices_of_bitboard(bitboards[king]):
+            self.append_moves_to_targets(moves, origin_index, KING_ATTACKS[origin_index] & not_own)
+            king_piece = self.board[origin_index]
+            for destination_index in (origin_index + 2, origin_index - 2):
+                if destination_index in Pieces.King.CASTLING_ROOK_SQUARES \
+                        and king_piece.can_move_to_index(self, destination_index, False):
+                    moves.append((origin_index, destination_index))
+        return moves
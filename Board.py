@@ -1,57 +1,182 @@
+import PieceSquareTables
 import Pieces
-from copy import deepcopy
+import Squares
+import Zobrist
 
 
 class ChessBoard:
-    ALL_COLS = 'abcdefgh'
-    ALL_ROWS = '12345678'
+    ALL_COLS = Squares.ALL_COLS
+    ALL_ROWS = Squares.ALL_ROWS
     EMPTY_SQUARE = '~'
+    PROMOTION_PIECES = ('q', 'r', 'b', 'n')
+    STARTING_POSITION_FEN = 'rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1'
+    PIECE_CLASSES = {'p': Pieces.Pawn, 'n': Pieces.Knight, 'b': Pieces.Bishop,
+                     'r': Pieces.Rook, 'q': Pieces.Queen, 'k': Pieces.King}
+    SLIDER_DIRECTIONS = {Pieces.Bishop: Squares.DIAGONAL_DIRECTIONS, Pieces.Rook: Squares.ORTHOGONAL_DIRECTIONS,
+                         Pieces.Queen: Squares.ALL_DIRECTIONS}
+    # piece values for static exchange evaluation: the king is worth more than everything else together, so a
+    # sequence that would leave it on a defended square is never chosen
+    SEE_VALUES = dict(PieceSquareTables.MATERIAL_VALUES, k=20000, K=20000)
 
     def __init__(self):
-        self.board = []
+        self.board = []  # 64 entries, indexed as described in Squares (a1 = 0, h8 = 63)
+        self.zobrist_key = 0  # pieces and side to move, updated incrementally. See hash for the full key
+        # running totals of the pieces on the board per color, kept up to date by assign_value_to_index
+        self.material = {Pieces.Piece.WHITE: 0, Pieces.Piece.BLACK: 0}
+        self.piece_square_score = {Pieces.Piece.WHITE: 0, Pieces.Piece.BLACK: 0}
         self.is_game_over = False
         self.most_resent_player_has_resigned = False
         self.past_game_states = {}
         self.fifty_move_counter = 0
+        self.fullmove_number = 1  # starts at 1 and goes up after every black move, as in FEN
         self.outcome = None
         self.ignore_move_order = False
-        self.squaresAttackingWhiteKing = []  # check, double check
+        self.squaresAttackingWhiteKing = []  # check, double check (board indices)
         self.squaresAttackingBlackKing = []
         self.pieces_off_the_board = []
         self.white_pieces_on_the_board = []
         self.black_pieces_on_the_board = []
-        self.enPassantTargetSquare = ''
+        self.en_passant_index = None
         self.resetEnPassantTargetSquare = False
         self.canBlackCastleLong = True
         self.canBlackCastleShort = True
         self.canWhiteCastleLong = True
         self.canWhiteCastleShort = True
         self.promotePawnTo = None  # q, r, n or b.  To be set in a "get_move" type method and used in Pieces.Pawn
+        self.move_stack = []  # MoveUndoRecord for every move made with push (NullMoveUndoRecord for push_null)
         self.create_starting_position()
-        self.whiteKing = self.get_contents_of_square('e1')
-        self.blackKing = self.get_contents_of_square('e8')
+        self.whiteKing = self.board[Squares.E1]
+        self.blackKing = self.board[Squares.E8]
         self.sideToMove = 0  # 0 = white, 1 = black
 
+    @classmethod
+    def from_fen(cls, fen):
+        board = cls()
+        board.set_position_from_fen(fen)
+        return board
+
+    def set_position_from_fen(self, fen):
+        # fen: Forsyth-Edwards Notation, e.g. STARTING_POSITION_FEN. Raises ValueError if it can't be read
+        fields = fen.split()
+        if len(fields) < 4 or len(fields) > 6:
+            raise ValueError('FEN needs 4 to 6 fields: {}'.format(fen))
+        placement, side_to_move, castling_rights, en_passant_square = fields[:4]
+        rows = placement.split('/')
+        if len(rows) != 8:
+            raise ValueError('FEN piece placement needs 8 rows: {}'.format(placement))
+
+        for index in range(64):
+            self.clear_index(index)
+        self.white_pieces_on_the_board = []
+        self.black_pieces_on_the_board = []
+        self.pieces_off_the_board = []
+
+        for row, row_placement in zip(range(7, -1, -1), rows):
+            col = 0
+            for char in row_placement:
+                if char.isdigit():
+                    col += int(char)
+                    continue
+                if char.lower() not in self.PIECE_CLASSES or col > 7:
+                    raise ValueError('Invalid FEN row: {}'.format(row_placement))
+                color = Pieces.Piece.WHITE if char.isupper() else Pieces.Piece.BLACK
+                self.add_piece_to_index(self.PIECE_CLASSES[char.lower()], color, Squares.get_index(row, col))
+                col += 1
+            if col != 8:
+                raise ValueError('Invalid FEN row: {}'.format(row_placement))
+
+        kings = [piece for piece in self.white_pieces_on_the_board + self.black_pieces_on_the_board
+                 if type(piece) == Pieces.King]
+        if sorted(king.color for king in kings) != [Pieces.Piece.BLACK, Pieces.Piece.WHITE]:
+            raise ValueError('FEN needs exactly one king per side: {}'.format(placement))
+        for king in kings:
+            if king.is_white_piece():
+                self.whiteKing = king
+            else:
+                self.blackKing = king
+
+        if side_to_move not in ('w', 'b'):
+            raise ValueError('Invalid FEN side to move: {}'.format(side_to_move))
+        if (side_to_move == 'b') != self.is_blacks_turn():
+            self.update_side_to_move()
+
+        if castling_rights != '-' and (not castling_rights or set(castling_rights) - set('KQkq')):
+            raise ValueError('Invalid FEN castling rights: {}'.format(castling_rights))
+        self.canWhiteCastleShort = 'K' in castling_rights
+        self.canWhiteCastleLong = 'Q' in castling_rights
+        self.canBlackCastleShort = 'k' in castling_rights
+        self.canBlackCastleLong = 'q' in castling_rights
+
+        if en_passant_square == '-':
+            self.en_passant_index = None
+        elif Squares.is_valid_square(en_passant_square) and en_passant_square[1] in '36':
+            self.en_passant_index = Squares.get_index_from_square(en_passant_square)
+        else:
+            raise ValueError('Invalid FEN en passant square: {}'.format(en_passant_square))
+        self.resetEnPassantTargetSquare = self.en_passant_index is not None  # only available for the next move
+
+        halfmove_clock = fields[4] if len(fields) > 4 else '0'
+        if not halfmove_clock.isdigit():
+            raise ValueError('Invalid FEN halfmove clock: {}'.format(halfmove_clock))
+        self.fifty_move_counter = int(halfmove_clock) / 2  # fifty_move_counter goes up by .5 per half move
+
+        fullmove_number = fields[5] if len(fields) > 5 else '1'
+        if not fullmove_number.isdigit() or int(fullmove_number) < 1:
+            raise ValueError('Invalid FEN fullmove number: {}'.format(fullmove_number))
+        self.fullmove_number = int(fullmove_number)
+
+        self.past_game_states = {}
+        self.move_stack = []
+        self.is_game_over = False
+        self.outcome = None
+        self.update_squares_attacking_king()
+
+    def to_fen(self):
+        # the position in Forsyth-Edwards Notation, readable by from_fen
+        rows = []
+        for row in range(7, -1, -1):
+            row_placement = ''
+            empty_squares = 0
+            for contents in self.board[row * 8:row * 8 + 8]:
+                if contents == self.EMPTY_SQUARE:
+                    empty_squares += 1
+                    continue
+                if empty_squares:
+                    row_placement += str(empty_squares)
+                    empty_squares = 0
+                row_placement += contents.symbol
+            if empty_squares:
+                row_placement += str(empty_squares)
+            rows.append(row_placement)
+
+        castling_rights = ''.join(symbol for symbol, can_castle in (('K', self.canWhiteCastleShort),
+                                                                     ('Q', self.canWhiteCastleLong),
+                                                                     ('k', self.canBlackCastleShort),
+                                                                     ('q', self.canBlackCastleLong)) if can_castle)
+        return '{} {} {} {} {} {}'.format('/'.join(rows), 'b' if self.is_blacks_turn() else 'w',
+                                          castling_rights or '-', self.enPassantTargetSquare or '-',
+                                          int(round(self.fifty_move_counter * 2)), self.fullmove_number)
+
     def create_starting_position(self):
         self.create_empty_board()
         self.add_standard_initial_pieces_to_board()
 
     def create_empty_board(self):
-        for row in range(8):
-            row_list = []
-            for _ in self.ALL_COLS:
-                row_list.append(self.EMPTY_SQUARE)
-            self.board.append(row_list)
+        self.board = [self.EMPTY_SQUARE] * 64
 
     def add_piece_to_board(self, piece, color, squares):
+        # squares in algebraic notation
         for sq in squares:
             assert self.is_square_on_board(sq)
-            piece_to_add = piece(color, sq)
-            self.update_square_with_piece(piece_to_add, sq)
-            if piece_to_add.is_white_piece():
-                self.white_pieces_on_the_board.append(piece_to_add)
-            elif piece_to_add.is_black_piece():
-                self.black_pieces_on_the_board.append(piece_to_add)
+            self.add_piece_to_index(piece, color, Squares.get_index_from_square(sq))
+
+    def add_piece_to_index(self, piece, color, index):
+        piece_to_add = piece(color, index)
+        self.update_index_with_piece(piece_to_add, index)
+        if piece_to_add.is_white_piece():
+            self.white_pieces_on_the_board.append(piece_to_add)
+        elif piece_to_add.is_black_piece():
+            self.black_pieces_on_the_board.append(piece_to_add)
 
     def move_piece_from_on_the_board_to_off_the_board(self, piece):
         if piece.is_white_piece():
@@ -85,163 +210,97 @@ class ChessBoard:
         self.add_piece_to_board(Pieces.King, 'w', ['e1'])
         self.add_piece_to_board(Pieces.King, 'b', ['e8'])
 
-    def get_square_from_row_and_col_coordinates(self, row, col):
+    @staticmethod
+    def get_square_from_row_and_col_coordinates(row, col):
         assert type(row) == int and type(col) == int
-        assert 0 <= row <= 7
-        assert 0 <= col <= 7
-        row_as_chr = chr(row + 49)
-        col_as_chr = chr(col + 97)
-        square = col_as_chr + row_as_chr
-        assert self.is_square_on_board(square)
-        return square
+        assert Squares.is_coordinate_on_board(row, col)
+        return Squares.get_square_from_index(Squares.get_index(row, col))
 
     def get_row_and_col_coordinates_from_square(self, square):
         return self.get_row_number_from_square(square), self.get_col_number_from_square(square)
 
-    def get_row_number_from_square(self, square):
-        assert self.is_valid_square(square)
-        row = ord(square[1]) - 49  # ord('1') == 49
-        return row
+    @staticmethod
+    def get_row_number_from_square(square):
+        return Squares.get_row(Squares.get_index_from_square(square))
 
-    def get_col_number_from_square(self, square):
-        assert self.is_valid_square(square)
-        col = ord(square[0]) - 97  # ord('a') == 97
-        return col
+    @staticmethod
+    def get_col_number_from_square(square):
+        return Squares.get_col(Squares.get_index_from_square(square))
 
     @staticmethod
     def is_valid_square(square):
-        if type(square) != str:
-            return False
-        if len(square) != 2:
-            return False
-        row = ord(square[1]) - 49  # ord('1') == 49
-        col = ord(square[0]) - 97  # ord('a') == 97
-        return (0 <= row <= 7) and (0 <= col <= 7)
+        return Squares.is_valid_square(square)
 
     def is_square_on_board(self, square):
-        if not self.is_valid_square(square):
-            return False
-        row, col = self.get_row_and_col_coordinates_from_square(square)
-        return self.is_coordinate_on_board(row, col)
+        return self.is_valid_square(square)
 
     def is_square_empty(self, square):
         return self.get_contents_of_square(square) == self.EMPTY_SQUARE
 
-    def is_coordinate_empty(self, row, col):
-        assert self.is_coordinate_on_board(row, col)
-        return self.board[row][col] == self.EMPTY_SQUARE
-
-    @staticmethod
-    def is_coordinate_on_board(row, col):
-        if (0 <= row <= 7) and (0 <= col <= 7):
-            return True
-        return False
-
-    def assign_value_to_square(self, value, square):
-        row, col = self.get_row_and_col_coordinates_from_square(square)
-        self.board[row][col] = value
-
-    def clear_square(self, square):
-        if not self.is_square_empty(square):
-            self.assign_value_to_square(self.EMPTY_SQUARE, square)
-
-    def update_en_passant_target_square(self, new_en_passant_square):
-        self.enPassantTargetSquare = new_en_passant_square
-
-    def update_square_with_piece(self, piece, square):
-        if not self.is_square_empty(square):
-            self.move_piece_from_on_the_board_to_off_the_board(self.get_contents_of_square(square))
-        self.clear_square(square)
-        self.assign_value_to_square(piece, square)
-
     def get_contents_of_square(self, square):
-        row, col = self.get_row_and_col_coordinates_from_square(square)
-        return self.board[row][col]
-
-    def is_one_square_away(self, origin_square, destination_square):
-        origin_sq_row, origin_sq_col = self.get_row_and_col_coordinates_from_square(origin_square)
-        dest_sq_row, dest_sq_col = self.get_row_and_col_coordinates_from_square(destination_square)
-        return abs(origin_sq_row - dest_sq_row) <= 1 and abs(origin_sq_col - dest_sq_col) <= 1
-
-    def is_empty_diagonal_from(self, origin_square, destination_square):
-        # these should already be checked
-        assert self.is_square_on_board(origin_square) and self.is_square_on_board(destination_square)
-        assert origin_square != destination_square
-
-        origin_sq_row, origin_sq_col = self.get_row_and_col_coordinates_from_square(origin_square)
-        dest_sq_row, dest_sq_col = self.get_row_and_col_coordinates_from_square(destination_square)
-
-        # check if diagonal
-        row_dif = abs(origin_sq_row - dest_sq_row)
-        if row_dif != abs(origin_sq_col - dest_sq_col):
-            return False
-
-        # now check if that diagonal is empty
-        if origin_sq_row > dest_sq_row:
-            # count down
-            between_sq_row_coords = range(origin_sq_row - 1, dest_sq_row, -1)
-        else:
-            # count up
-            between_sq_row_coords = range(origin_sq_row + 1, dest_sq_row)
-
-        if origin_sq_col > dest_sq_col:
-            # count down
-            between_sq_col_coords = range(origin_sq_col - 1, dest_sq_col, -1)
-        else:
-            # count up
-            between_sq_col_coords = range(origin_sq_col + 1, dest_sq_col)
-
-        assert len(between_sq_row_coords) == len(between_sq_col_coords)
-
-        for i in range(len(between_sq_row_coords)):
-            if not self.is_coordinate_empty(between_sq_row_coords[i], between_sq_col_coords[i]):
+        return self.board[Squares.get_index_from_square(square)]
+
+    @property
+    def enPassantTargetSquare(self):
+        # algebraic notation, '' when there is none
+        if self.en_passant_index is None:
+            return ''
+        return Squares.get_square_from_index(self.en_passant_index)
+
+    def assign_value_to_index(self, value, index):
+        previous_value = self.board[index]
+        if previous_value != self.EMPTY_SQUARE:
+            symbol = previous_value.symbol
+            self.zobrist_key ^= Zobrist.PIECE_SQUARE_KEYS[symbol][index]
+            self.material[previous_value.color] -= PieceSquareTables.MATERIAL_VALUES[symbol]
+            self.piece_square_score[previous_value.color] -= PieceSquareTables.PIECE_SQUARE_VALUES[symbol][index]
+        if value != self.EMPTY_SQUARE:
+            symbol = value.symbol
+            self.zobrist_key ^= Zobrist.PIECE_SQUARE_KEYS[symbol][index]
+            self.material[value.color] += PieceSquareTables.MATERIAL_VALUES[symbol]
+            self.piece_square_score[value.color] += PieceSquareTables.PIECE_SQUARE_VALUES[symbol][index]
+        self.board[index] = value
+
+    def clear_index(self, index):
+        if self.board[index] != self.EMPTY_SQUARE:
+            self.assign_value_to_index(self.EMPTY_SQUARE, index)
+
+    def update_en_passant_index(self, new_en_passant_index):
+        self.en_passant_index = new_en_passant_index
+
+    def update_index_with_piece(self, piece, index):
+        if self.board[index] != self.EMPTY_SQUARE:
+            self.move_piece_from_on_the_board_to_off_the_board(self.board[index])
+        self.assign_value_to_index(piece, index)
+
+    def is_empty_path_between(self, origin_index, destination_index):
+        # the squares must already be known to be on the same diagonal or orthogonal
+        board = self.board
+        for index in Squares.SQUARES_BETWEEN[origin_index][destination_index]:
+            if board[index] != self.EMPTY_SQUARE:
                 return False
         return True
 
-    def is_empty_orthogonal_from(self, origin_square, destination_square):
-        # these should already be checked
-        assert self.is_square_on_board(origin_square) and self.is_square_on_board(destination_square)
-        assert origin_square != destination_square
-
-        origin_sq_row, origin_sq_col = self.get_row_and_col_coordinates_from_square(origin_square)
-        dest_sq_row, dest_sq_col = self.get_row_and_col_coordinates_from_square(destination_square)
+    def is_empty_diagonal_from(self, origin_index, destination_index):
+        direction = Squares.DIRECTION_BETWEEN[origin_index][destination_index]
+        if direction is None or direction[0] == 0 or direction[1] == 0:
+            return False
+        return self.is_empty_path_between(origin_index, destination_index)
 
-        if origin_sq_row == dest_sq_row:
-            fixed_row = origin_sq_row
-            range_to_check = range(min(origin_sq_col, dest_sq_col) + 1, max(origin_sq_col, dest_sq_col))
-            for col in range_to_check:
-                if not self.is_coordinate_empty(fixed_row, col):
-                    return False
-        elif origin_sq_col == dest_sq_col:
-            fixed_col = origin_sq_col
-            range_to_check = range(min(origin_sq_row, dest_sq_row) + 1, max(origin_sq_row, dest_sq_row))
-            for row in range_to_check:
-                if not self.is_coordinate_empty(row, fixed_col):
-                    return False
-        else:
+    def is_empty_orthogonal_from(self, origin_index, destination_index):
+        direction = Squares.DIRECTION_BETWEEN[origin_index][destination_index]
+        if direction is None or (direction[0] != 0 and direction[1] != 0):
             return False  # the squares are not orthogonal
-        return True
+        return self.is_empty_path_between(origin_index, destination_index)
 
     def reset_en_passant_target_square_if_needed(self):
         # reset the en passant square (makes sure it's only available for one turn)
         if self.resetEnPassantTargetSquare:
-            self.update_en_passant_target_square('')
+            self.update_en_passant_index(None)
             self.resetEnPassantTargetSquare = False
-        if self.enPassantTargetSquare != '':
+        if self.en_passant_index is not None:
             self.resetEnPassantTargetSquare = True
 
-    def is_king_in_check_after_simulating_move(self, origin_square, destination_square, king_to_validate):
-        copy_of_board = deepcopy(self)
-        copy_of_board.make_move(origin_square, destination_square)
-
-        if king_to_validate.current_square != origin_square:
-            square_of_king_after_move = king_to_validate.current_square
-        else:
-            square_of_king_after_move = destination_square
-
-        return copy_of_board.is_square_defended_by_opponent(
-            square_of_king_after_move, king_to_validate.get_color_of_opponent_side())
-
     def is_valid_move_order(self, origin_piece):
         if self.ignore_move_order:
             return True
@@ -252,122 +311,298 @@ class ChessBoard:
         return True
 
     def is_valid_move(self, origin_square, destination_square):
-        if self.is_square_empty(origin_square):
-            return False
+        # squares in algebraic notation
+        return self.is_valid_move_between_indices(
+            Squares.get_index_from_square(origin_square), Squares.get_index_from_square(destination_square))
 
-        origin_piece = self.get_contents_of_square(origin_square)
+    def is_valid_move_between_indices(self, origin_index, destination_index):
+        origin_piece = self.board[origin_index]
+        if origin_piece == self.EMPTY_SQUARE:
+            return False
 
         if not self.is_valid_move_order(origin_piece):
             return False
 
-        return origin_piece.is_legal_move(self, destination_square)
+        return origin_piece.can_move_to_index(self, destination_index)
 
     def get_king_of_side_that_is_moving(self):
         if self.is_whites_turn():
             return self.whiteKing
         return self.blackKing
 
+    def get_castling_rights_mask(self):
+        return self.canWhiteCastleShort | self.canWhiteCastleLong << 1 \
+            | self.canBlackCastleShort << 2 | self.canBlackCastleLong << 3
+
+    def is_en_passant_capture_possible(self):
+        # only count the en passant square when a pawn could actually take, so it doesn't split equal positions
+        # a pawn captures onto the en passant square from the squares a pawn of the other color there would attack
+        if Squares.get_row(self.en_passant_index) == 2:  # white pawn skipped over it, so black captures
+            capturing_pawn_symbol = 'p'
+            capturing_pawn_indices = Squares.PAWN_ATTACKS[Pieces.Piece.WHITE][self.en_passant_index]
+        else:
+            capturing_pawn_symbol = 'P'
+            capturing_pawn_indices = Squares.PAWN_ATTACKS[Pieces.Piece.BLACK][self.en_passant_index]
+        for index in capturing_pawn_indices:
+            contents = self.board[index]
+            if contents != self.EMPTY_SQUARE and contents.symbol == capturing_pawn_symbol:
+                return True
+        return False
+
+    @property
+    def hash(self):
+        # 64 bit zobrist key of the position: pieces, side to move, castling rights and en passant file
+        key = self.zobrist_key ^ Zobrist.CASTLING_KEYS[self.get_castling_rights_mask()]
+        if self.en_passant_index is not None and self.is_en_passant_capture_possible():
+            key ^= Zobrist.EN_PASSANT_FILE_KEYS[Squares.get_col(self.en_passant_index)]
+        return key
+
+    def get_game_state_after_move(self):
+        # execute_move records the game state before it hands the turn to the other side, so the key has to
+        # include that side to move to match board.hash of the same position later on
+        return self.hash ^ Zobrist.BLACK_TO_MOVE_KEY
+
     def update_past_game_states(self):
-        game_state = str(self)
+        game_state = self.get_game_state_after_move()
         if game_state in self.past_game_states:
             self.past_game_states[game_state] += 1
         else:
             self.past_game_states[game_state] = 1
 
-    def is_non_reversible_move(self, origin_square, destination_square):
+    def is_non_reversible_move(self, origin_index, destination_index):
         # pawn move
-        if type(self.get_contents_of_square(origin_square)) == Pieces.Pawn:
+        if type(self.board[origin_index]) == Pieces.Pawn:
             return True
         # or capture
-        return not self.is_square_empty(destination_square)
-
-    def get_path_traversal_incrementer(self, start_sq, middle_sq):
-        start_row, start_col = self.get_row_and_col_coordinates_from_square(start_sq)
-        middle_row, middle_col = self.get_row_and_col_coordinates_from_square(middle_sq)
-
-        row_inc = middle_row - start_row
-        col_inc = middle_col - start_col
-
-        divider_to_get_back_to_one_to_one_ratio = max(abs(row_inc), abs(col_inc))
-        row_inc //= divider_to_get_back_to_one_to_one_ratio
-        col_inc //= divider_to_get_back_to_one_to_one_ratio
+        return self.board[destination_index] != self.EMPTY_SQUARE
+
+    def get_attackers_of_index(self, index, color_of_attacking_side):
+        # indices of all pieces of color_of_attacking_side attacking index, whether or not they are pinned
+        board = self.board
+        empty = self.EMPTY_SQUARE
+        attackers = []
+        for attacker_index in Squares.KNIGHT_TARGETS[index]:
+            piece = board[attacker_index]
+            if piece != empty and piece.color == color_of_attacking_side and type(piece) == Pieces.Knight:
+                attackers.append(attacker_index)
+        for attacker_index in Squares.KING_TARGETS[index]:
+            piece = board[attacker_index]
+            if piece != empty and piece.color == color_of_attacking_side and type(piece) == Pieces.King:
+                attackers.append(attacker_index)
+        # a pawn attacks index from the squares a pawn of the other color standing on index would attack
+        if color_of_attacking_side == Pieces.Piece.WHITE:
+            pawn_attacker_indices = Squares.PAWN_ATTACKS[Pieces.Piece.BLACK][index]
+        else:
+            pawn_attacker_indices = Squares.PAWN_ATTACKS[Pieces.Piece.WHITE][index]
+        for attacker_index in pawn_attacker_indices:
+            piece = board[attacker_index]
+            if piece != empty and piece.color == color_of_attacking_side and type(piece) == Pieces.Pawn:
+                attackers.append(attacker_index)
+        for direction in Squares.ALL_DIRECTIONS:
+            if direction[0] == 0 or direction[1] == 0:
+                slider = Pieces.Rook
+            else:
+                slider = Pieces.Bishop
+            for attacker_index in Squares.RAYS[direction][index]:
+                piece = board[attacker_index]
+                if piece == empty:
+                    continue
+                if piece.color == color_of_attacking_side and (type(piece) == slider or type(piece) == Pieces.Queen):
+                    attackers.append(attacker_index)
+                break
+        return attackers
+
+    def is_index_attacked_by(self, index, color_of_attacking_side):
+        return len(self.get_attackers_of_index(index, color_of_attacking_side)) != 0
+
+    def is_index_attacked_without_king(self, index, color_of_attacking_side, king_index):
+        # the king is lifted off the board so sliders see through it, e.g. it can't step back along a checking ray
+        king = self.board[king_index]
+        self.board[king_index] = self.EMPTY_SQUARE
+        is_attacked = self.is_index_attacked_by(index, color_of_attacking_side)
+        self.board[king_index] = king
+        return is_attacked
+
+    def see(self, move):
+        # static exchange evaluation: material (centipawns) the side making move wins on its destination square if
+        # both sides keep recapturing there with their least valuable piece, each free to stop when that's better.
+        # Works from the attackers of the square, including sliders lined up behind other attackers (x-rays),
+        # without making any move. Pins and checks are ignored
+        origin_index, destination_index = move[0], move[1]
+        board = self.board
+        values = self.SEE_VALUES
+        moving_piece = board[origin_index]
+        removed_indices = {origin_index}
+        captured_piece = board[destination_index]
+        if captured_piece != self.EMPTY_SQUARE:
+            gains = [values[captured_piece.symbol]]
+        elif type(moving_piece) == Pieces.Pawn and destination_index == self.en_passant_index:
+            captured_index = Squares.get_index(Squares.get_row(origin_index), Squares.get_col(destination_index))
+            removed_indices.add(captured_index)
+            gains = [values['p']]
+        else:
+            gains = [0]
+        value_on_square = values[moving_piece.symbol]
+        if len(move) > 2:
+            value_on_square = values[move[2]]
+            gains[0] += value_on_square - values['p']
+
+        attackers = {color: [index for index in self.get_attackers_of_index(destination_index, color)
+                             if index not in removed_indices]
+                     for color in (Pieces.Piece.WHITE, Pieces.Piece.BLACK)}
+        for index in removed_indices:
+            self.add_x_ray_attacker(destination_index, index, removed_indices, attackers)
+
+        color = Pieces.Piece.BLACK if moving_piece.color == Pieces.Piece.WHITE else Pieces.Piece.WHITE
+        while attackers[color]:
+            gains.append(value_on_square - gains[-1])  # if the piece on the square is taken and not recaptured
+            attacker_index = min(attackers[color], key=lambda index: values[board[index].symbol])
+            attackers[color].remove(attacker_index)
+            removed_indices.add(attacker_index)
+            self.add_x_ray_attacker(destination_index, attacker_index, removed_indices, attackers)
+            value_on_square = values[board[attacker_index].symbol]
+            color = Pieces.Piece.BLACK if color == Pieces.Piece.WHITE else Pieces.Piece.WHITE
+        # going back through the captures, each side only recaptures when it comes out ahead
+        for depth in range(len(gains) - 1, 0, -1):
+            gains[depth - 1] = -max(-gains[depth - 1], gains[depth])
+        return gains[0]
+
+    def add_x_ray_attacker(self, index, removed_index, removed_indices, attackers):
+        # adds the slider attacking index through the square removed_index, if there is one, to attackers
+        direction = Squares.DIRECTION_BETWEEN[index][removed_index]
+        if direction is None:
+            return
+        slider = Pieces.Rook if direction[0] == 0 or direction[1] == 0 else Pieces.Bishop
+        for behind_index in Squares.RAYS[direction][removed_index]:
+            piece = self.board[behind_index]
+            if piece == self.EMPTY_SQUARE or behind_index in removed_indices:
+                continue
+            if type(piece) == slider or type(piece) == Pieces.Queen:
+                attackers[piece.color].append(behind_index)
+            return
+
+    def get_pinned_pieces(self, king_index, color):
+        # {index of piece of color pinned to its king: direction from the king towards the pinning piece}
+        board = self.board
+        empty = self.EMPTY_SQUARE
+        pins = {}
+        for direction in Squares.ALL_DIRECTIONS:
+            if direction[0] == 0 or direction[1] == 0:
+                slider = Pieces.Rook
+            else:
+                slider = Pieces.Bishop
+            pinned_index = None
+            for index in Squares.RAYS[direction][king_index]:
+                piece = board[index]
+                if piece == empty:
+                    continue
+                if pinned_index is None and piece.color == color:
+                    pinned_index = index
+                    continue
+                if pinned_index is not None and piece.color != color \
+                        and (type(piece) == slider or type(piece) == Pieces.Queen):
+                    pins[pinned_index] = direction
+                break
+        return pins
+
+    def is_king_exposed_by_en_passant(self, king_index, color, origin_index, captured_index, destination_index):
+        # en passant takes two pawns off the same row at once, so check every slider line to the king by hand
+        board = self.board
+        empty = self.EMPTY_SQUARE
+        for direction in Squares.ALL_DIRECTIONS:
+            if direction[0] == 0 or direction[1] == 0:
+                slider = Pieces.Rook
+            else:
+                slider = Pieces.Bishop
+            for index in Squares.RAYS[direction][king_index]:
+                if index == origin_index or index == captured_index:
+                    continue
+                if index == destination_index:
+                    break
+                piece = board[index]
+                if piece == empty:
+                    continue
+                if piece.color != color and (type(piece) == slider or type(piece) == Pieces.Queen):
+                    return True
+                break
+        return False
 
-        return row_inc, col_inc
+    def is_pseudo_legal_move_safe(self, origin_index, destination_index, king_index, color, checkers, pins):
+        # whether a move that follows the piece movement rules keeps the own king out of check,
+        # decided from the checkers and pins of the position without making the move
+        opponent_color = Pieces.Piece.BLACK if color == Pieces.Piece.WHITE else Pieces.Piece.WHITE
+        if origin_index == king_index:
+            return not self.is_index_attacked_without_king(destination_index, opponent_color, king_index)
+
+        if len(checkers) > 1:
+            return False  # double check, only the king can move
+
+        if destination_index == self.en_passant_index and type(self.board[origin_index]) == Pieces.Pawn:
+            captured_index = Squares.get_index(Squares.get_row(origin_index), Squares.get_col(destination_index))
+            for checker in checkers:
+                # a checking knight or pawn has to be the pawn captured, sliders are covered by the ray check
+                if checker != captured_index and type(self.board[checker]) not in (
+                        Pieces.Bishop, Pieces.Rook, Pieces.Queen):
+                    return False
+            return not self.is_king_exposed_by_en_passant(
+                king_index, color, origin_index, captured_index, destination_index)
 
-    @staticmethod
-    def get_coordinates_after_applying_traversal_incrementer(coordinates, incrementer):
-        return coordinates[0] + incrementer[0], coordinates[1] + incrementer[1]
-
-    def get_next_piece_along_path(self, start_sq, middle_sq):
-        traversal_incrementer = self.get_path_traversal_incrementer(start_sq, middle_sq)
-        next_pos_coordinates = self.get_coordinates_after_applying_traversal_incrementer(
-            self.get_row_and_col_coordinates_from_square(middle_sq), traversal_incrementer)
-        while self.is_coordinate_on_board(next_pos_coordinates[0], next_pos_coordinates[1]):
-            if self.is_square_empty(
-                    self.get_square_from_row_and_col_coordinates(next_pos_coordinates[0], next_pos_coordinates[1])):
-                next_pos_coordinates = self.get_coordinates_after_applying_traversal_incrementer(
-                    next_pos_coordinates, traversal_incrementer)
-            else:
-                return self.get_contents_of_square(
-                    self.get_square_from_row_and_col_coordinates(next_pos_coordinates[0], next_pos_coordinates[1]))
-        return self.EMPTY_SQUARE  # this signifies that nothing is along path and the end of the board has been reached
+        if checkers:
+            checker = checkers[0]
+            # capture the checking piece or step in between it and the king
+            if destination_index != checker and destination_index not in Squares.SQUARES_BETWEEN[king_index][checker]:
+                return False
 
-    def update_squares_attacking_king(self, last_moved_piece_origin_square, last_moved_piece_current_square):
-        squares_from_which_check_is_being_delivered = []
+        if origin_index in pins:
+            # a pinned piece may only move along the line of the pin
+            return Squares.DIRECTION_BETWEEN[king_index][destination_index] == pins[origin_index]
+        return True
 
-        last_moved_piece = self.get_contents_of_square(last_moved_piece_current_square)
-        if last_moved_piece.is_white_piece():
-            opponent_king = self.blackKing
-        else:
-            opponent_king = self.whiteKing
+    def is_own_king_safe_after_move(self, origin_index, destination_index):
+        piece = self.board[origin_index]
+        king_index = self.get_king(piece.color).index
+        return self.is_pseudo_legal_move_safe(
+            origin_index, destination_index, king_index, piece.color,
+            self.get_attackers_of_index(king_index, piece.get_color_of_opponent_side()),
+            self.get_pinned_pieces(king_index, piece.color))
 
-        # regular check: is the king square a valid move from the lastMovedPieceCurrentSquare?
-        if last_moved_piece.is_legal_move(self, opponent_king.current_square):
-            squares_from_which_check_is_being_delivered.append(last_moved_piece_current_square)
-
-        # discover check?
-        if self.is_empty_diagonal_from(opponent_king.current_square, last_moved_piece_origin_square):
-            pos_piece_along_path = self.get_next_piece_along_path(
-                opponent_king.current_square, last_moved_piece_origin_square)
-            if pos_piece_along_path != self.EMPTY_SQUARE \
-                    and pos_piece_along_path.color != opponent_king.color \
-                    and (type(pos_piece_along_path) == Pieces.Queen or type(pos_piece_along_path) == Pieces.Bishop):
-                squares_from_which_check_is_being_delivered.append(pos_piece_along_path.current_square)
-        elif self.is_empty_orthogonal_from(opponent_king.current_square, last_moved_piece_origin_square):
-            pos_piece_along_path = self.get_next_piece_along_path(
-                opponent_king.current_square, last_moved_piece_origin_square)
-            if pos_piece_along_path != self.EMPTY_SQUARE \
-                    and pos_piece_along_path.color != opponent_king.color \
-                    and (type(pos_piece_along_path) == Pieces.Queen or type(pos_piece_along_path) == Pieces.Rook):
-                squares_from_which_check_is_being_delivered.append(pos_piece_along_path.current_square)
+    def is_square_defended_by_opponent(self, square, color_of_attacking_side):
+        # square in algebraic notation
+        return self.is_index_attacked_by(Squares.get_index_from_square(square), color_of_attacking_side)
 
-        if self.is_whites_turn():
-            self.squaresAttackingBlackKing = squares_from_which_check_is_being_delivered
-            self.squaresAttackingWhiteKing = []  # if we made it this far, the king wasn't in check, so reset
-        else:
-            self.squaresAttackingWhiteKing = squares_from_which_check_is_being_delivered
-            self.squaresAttackingBlackKing = []
+    def update_squares_attacking_king(self):
+        self.squaresAttackingWhiteKing = self.get_attackers_of_index(self.whiteKing.index, Pieces.Piece.BLACK)
+        self.squaresAttackingBlackKing = self.get_attackers_of_index(self.blackKing.index, Pieces.Piece.WHITE)
 
     def is_king_in_check(self, king):
         if king.is_white_piece():
             return len(self.squaresAttackingWhiteKing) != 0
         return len(self.squaresAttackingBlackKing) != 0
 
+    def is_side_to_move_in_check(self):
+        # worked out from the position, unlike is_king_in_check which reads the lists kept by execute_move
+        king = self.get_king_of_side_that_is_moving()
+        return self.is_index_attacked_by(king.index, king.get_color_of_opponent_side())
+
     def update_side_to_move(self):
         self.sideToMove ^= 1
+        self.zobrist_key ^= Zobrist.BLACK_TO_MOVE_KEY
 
-    def adjust_fifty_move_counter(self, origin_square, destination_square):
-        if self.is_non_reversible_move(origin_square, destination_square):
+    def adjust_fifty_move_counter(self, origin_index, destination_index):
+        if self.is_non_reversible_move(origin_index, destination_index):
             self.fifty_move_counter = 0
         else:
             self.fifty_move_counter += .5  # half move
 
     def execute_move(self, origin_square, destination_square):
-        if self.is_valid_move(origin_square, destination_square):
-            self.make_move(origin_square, destination_square)
+        # squares in algebraic notation
+        origin_index = Squares.get_index_from_square(origin_square)
+        destination_index = Squares.get_index_from_square(destination_square)
+        if self.is_valid_move_between_indices(origin_index, destination_index):
+            self.make_move(origin_index, destination_index)
             # game state related housekeeping
             self.update_past_game_states()
-            self.update_squares_attacking_king(origin_square, destination_square)
+            self.update_squares_attacking_king()
             if self.is_ending_condition():
                 self.is_game_over = True
             else:
@@ -375,34 +610,120 @@ class ChessBoard:
             return True
         return False
 
-    def make_move(self, origin_square, destination_square):
+    def revoke_castling_rights_if_rook_is_captured(self, destination_index):
+        # a rook taken on its starting square can no longer castle (a rook that moved away already lost the right)
+        if destination_index == Squares.A1:
+            self.canWhiteCastleLong = False
+        elif destination_index == Squares.H1:
+            self.canWhiteCastleShort = False
+        elif destination_index == Squares.A8:
+            self.canBlackCastleLong = False
+        elif destination_index == Squares.H8:
+            self.canBlackCastleShort = False
+
+    def make_move(self, origin_index, destination_index):
         # blindly makes move without regard to validation
-        self.adjust_fifty_move_counter(origin_square, destination_square)
-        origin_piece = self.get_contents_of_square(origin_square)
-        origin_piece.execute_move(self, destination_square)
+        self.adjust_fifty_move_counter(origin_index, destination_index)
+        if self.board[origin_index].color == Pieces.Piece.BLACK:
+            self.fullmove_number += 1
+        self.revoke_castling_rights_if_rook_is_captured(destination_index)
+        origin_piece = self.board[origin_index]
+        origin_piece.execute_move(self, destination_index)
         self.reset_en_passant_target_square_if_needed()
 
+    def push(self, move):
+        # makes move (origin_index, destination_index[, promotion]) in place without validation.
+        # Everything needed to take it back is kept on move_stack so pop() can restore the position exactly
+        origin_index, destination_index = move[0], move[1]
+        promotion = move[2] if len(move) > 2 else None
+
+        origin_piece = self.board[origin_index]
+        record = MoveUndoRecord(self, move, origin_piece)
+
+        if self.board[destination_index] != self.EMPTY_SQUARE:
+            record.captured_piece = self.board[destination_index]
+            record.captured_index = destination_index
+
+        if type(origin_piece) == Pieces.Pawn:
+            if destination_index == self.en_passant_index:
+                record.captured_index = Squares.get_index(Squares.get_row(origin_index),
+                                                          Squares.get_col(destination_index))
+                record.captured_piece = self.board[record.captured_index]
+            elif origin_piece.is_pawn_on_final_row(destination_index):
+                record.is_promotion = True
+
+        if type(origin_piece) == Pieces.King and origin_piece.isFirstMove \
+                and destination_index in Pieces.King.CASTLING_ROOK_SQUARES:
+            record.save_castling_rook(self, Pieces.King.get_old_rook_index(destination_index),
+                                      Pieces.King.get_index_king_passes_over_when_castling(destination_index))
+
+        if record.captured_piece is not None or record.is_promotion:
+            record.save_piece_lists(self)
+
+        self.promotePawnTo = promotion
+        self.make_move(origin_index, destination_index)
+        self.promotePawnTo = record.promote_pawn_to
+        self.update_side_to_move()
+        self.move_stack.append(record)
+
+    def push_null(self):
+        # passes the turn to the other side without moving, for null move pruning in the search. Never legal in a
+        # game and not allowed in check. Taken back by pop like any other move
+        self.move_stack.append(NullMoveUndoRecord(self))
+        self.update_en_passant_index(None)
+        self.resetEnPassantTargetSquare = False
+        self.update_side_to_move()
+
+    def pop(self):
+        # takes back the most recent move made with push (or push_null) and returns it, None for a null move
+        record = self.move_stack.pop()
+        record.restore(self)
+        return record.move
+
+    def has_non_pawn_material(self, color):
+        pieces = self.white_pieces_on_the_board if color == Pieces.Piece.WHITE else self.black_pieces_on_the_board
+        for piece in pieces:
+            if type(piece) != Pieces.Pawn and type(piece) != Pieces.King:
+                return True
+        return False
+
+    @staticmethod
+    def parse_move(move):
+        # move is of the form e2e4 or e7e8q, returns the (origin_index, destination_index[, promotion]) tuple
+        # used internally or None if it isn't well formed
+        if type(move) != str or len(move) < 4 or len(move) > 5:
+            return None
+        origin_square = move[:2]
+        destination_square = move[2:4]
+        if not Squares.is_valid_square(origin_square) or not Squares.is_valid_square(destination_square):
+            return None
+        parsed_move = (Squares.get_index_from_square(origin_square), Squares.get_index_from_square(destination_square))
+        if len(move) == 5:
+            parsed_move += (move[-1],)
+        return parsed_move
+
+    @staticmethod
+    def get_move_notation(move):
+        # inverse of parse_move, e.g. (12, 28) -> 'e2e4'
+        notation = Squares.get_square_from_index(move[0]) + Squares.get_square_from_index(move[1])
+        if len(move) > 2 and move[2]:
+            notation += move[2]
+        return notation
+
     def attempt_to_make_move(self, move):
         # move is of the form e2e4 or e7e8q
         if move == 'resign':
             self.most_resent_player_has_resigned = True
             return True
 
-        if type(move) != str:
-            return False
-
-        if len(move) < 4 or len(move) > 5:
+        parsed_move = self.parse_move(move)
+        if parsed_move is None:
             return False
 
-        origin_square = move[:2]
-        destination_square = move[2:4]
-        if len(move) == 5:
-            self.promotePawnTo = move[-1]
+        if len(parsed_move) == 3:
+            self.promotePawnTo = parsed_move[2]
 
-        if not self.is_valid_square(origin_square) or not self.is_valid_square(destination_square):
-            return False
-
-        if not self.execute_move(origin_square, destination_square):
+        if not self.execute_move(move[:2], move[2:4]):
             return False
 
         self.promotePawnTo = None
@@ -414,60 +735,118 @@ class ChessBoard:
         self.execute_move(origin_square, destination_square)
         self.promotePawnTo = None
 
-    def get_squares_along_path(self, start_sq, end_sq):
-        squares = []
-        incrementer = self.get_path_traversal_incrementer(start_sq, end_sq)
-        starting_coords = self.get_row_and_col_coordinates_from_square(start_sq)
-        ending_coords = self.get_row_and_col_coordinates_from_square(end_sq)
-        pos_coords = self.get_coordinates_after_applying_traversal_incrementer(starting_coords, incrementer)
-        while pos_coords != ending_coords:
-            assert self.is_coordinate_empty(pos_coords[0], pos_coords[1])
-            squares.append(self.get_square_from_row_and_col_coordinates(pos_coords[0], pos_coords[1]))
-            pos_coords = self.get_coordinates_after_applying_traversal_incrementer(pos_coords, incrementer)
-        return squares
-
-    def can_capture_attacking_piece(self, square_of_attacking_piece, king_under_attack):
-        if self.is_square_under_attack_from_non_king_piece(square_of_attacking_piece, king_under_attack.color):
-            return True
+    def get_color_to_move(self):
+        if self.is_whites_turn():
+            return Pieces.Piece.WHITE
+        return Pieces.Piece.BLACK
+
+    def append_move(self, moves, piece, origin_index, destination_index):
+        # pawns reaching the final row get one move per promotion choice
+        if type(piece) == Pieces.Pawn and piece.is_pawn_on_final_row(destination_index):
+            for promotion in self.PROMOTION_PIECES:
+                moves.append((origin_index, destination_index, promotion))
+        else:
+            moves.append((origin_index, destination_index))
 
-    def can_block_path_of_attacking_piece(self, square_of_attacking_piece, king_under_attack):
-        attacking_piece = self.get_contents_of_square(square_of_attacking_piece)
-        if type(attacking_piece) == Pieces.Queen \
-                or type(attacking_piece) == Pieces.Bishop \
-                or type(attacking_piece) == Pieces.Rook:
-            squares_along_path = self.get_squares_along_path(
-                king_under_attack.current_square, square_of_attacking_piece)
-            for sq in squares_along_path:
-                if self.can_move_to_square_with_non_king_piece(sq, king_under_attack.color):
-                    return True
-        return False
+    def generate_pseudo_legal_moves(self, color=None):
+        # moves that follow the movement rules of each piece but may leave the own king in check
+        if color is None:
+            color = self.get_color_to_move()
+        if color == Pieces.Piece.WHITE:
+            piece_list = self.white_pieces_on_the_board
+        else:
+            piece_list = self.black_pieces_on_the_board
 
-    def get_squares_attacking_king(self, king):
-        if king.is_white_piece():
-            return self.squaresAttackingWhiteKing
-        return self.squaresAttackingBlackKing
+        moves = []
+        for piece in piece_list:
+            for destination_index in piece.get_possible_indices_to_move_to(self):
+                if piece.can_move_to_index(self, destination_index, False):
+                    self.append_move(moves, piece, piece.index, destination_index)
+        return moves
+
+    def generate_pseudo_legal_captures(self, color=None):
+        # captures (en passant included) and promotions, found from the attack tables without looking at any
+        # quiet move. May leave the own king in check like generate_pseudo_legal_moves
+        if color is None:
+            color = self.get_color_to_move()
+        if color == Pieces.Piece.WHITE:
+            piece_list = self.white_pieces_on_the_board
+            forward = 8
+        else:
+            piece_list = self.black_pieces_on_the_board
+            forward = -8
+        board = self.board
+        empty = self.EMPTY_SQUARE
+
+        moves = []
+        for piece in piece_list:
+            origin_index = piece.index
+            piece_type = type(piece)
+            if piece_type == Pieces.Pawn:
+                for destination_index in Squares.PAWN_ATTACKS[color][origin_index]:
+                    target = board[destination_index]
+                    if (target != empty and target.color != color) or destination_index == self.en_passant_index:
+                        self.append_move(moves, piece, origin_index, destination_index)
+                destination_index = origin_index + forward
+                if piece.is_pawn_on_final_row(destination_index) and board[destination_index] == empty:
+                    self.append_move(moves, piece, origin_index, destination_index)
+            elif piece_type == Pieces.Knight or piece_type == Pieces.King:
+                if piece_type == Pieces.Knight:
+                    targets = Squares.KNIGHT_TARGETS[origin_index]
+                else:
+                    targets = Squares.KING_TARGETS[origin_index]
+                for destination_index in targets:
+                    target = board[destination_index]
+                    if target != empty and target.color != color:
+                        moves.append((origin_index, destination_index))
+            else:
+                for direction in self.SLIDER_DIRECTIONS[piece_type]:
+                    for destination_index in Squares.RAYS[direction][origin_index]:
+                        target = board[destination_index]
+                        if target == empty:
+                            continue
+                        if target.color != color:
+                            moves.append((origin_index, destination_index))
+                        break
+        return moves
+
+    def generate_legal_captures(self, color=None):
+        # the captures and promotions of generate_legal_moves, for quiescence search
+        if color is None:
+            color = self.get_color_to_move()
+        king = self.get_king(color)
+        king_index = king.index
+        checkers = self.get_attackers_of_index(king_index, king.get_color_of_opponent_side())
+        pins = self.get_pinned_pieces(king_index, color)
+        return [move for move in self.generate_pseudo_legal_captures(color)
+                if self.is_pseudo_legal_move_safe(move[0], move[1], king_index, color, checkers, pins)]
+
+    def get_king(self, color):
+        if color == Pieces.Piece.WHITE:
+            return self.whiteKing
+        return self.blackKing
+
+    def generate_legal_moves(self, color=None):
+        # checkers and pins are worked out once, then each pseudo legal move is kept or dropped without making it
+        if color is None:
+            color = self.get_color_to_move()
+        king = self.get_king(color)
+        king_index = king.index
+        checkers = self.get_attackers_of_index(king_index, king.get_color_of_opponent_side())
+        pins = self.get_pinned_pieces(king_index, color)
+        return [move for move in self.generate_pseudo_legal_moves(color)
+                if self.is_pseudo_legal_move_safe(move[0], move[1], king_index, color, checkers, pins)]
+
+    def has_legal_move(self, color):
+        return len(self.generate_legal_moves(color)) != 0
 
     def is_checkmate(self, king):
         if not self.is_king_in_check(king):
             return False
 
-        squares_attacking_king = self.get_squares_attacking_king(king)
-
-        # King move (for single check and double check)
-        if king.all_legal_squares_to_move_to(self):
+        if self.has_legal_move(king.color):
             return False
 
-        if len(squares_attacking_king) == 1:
-            square_of_attacking_piece = squares_attacking_king[0]
-
-            if self.can_capture_attacking_piece(square_of_attacking_piece, king):
-                return False
-
-            if self.can_block_path_of_attacking_piece(square_of_attacking_piece, king):
-                return False
-
-        # if len > 1, that's double check and would have needed to be a king move which was already determined
-
         if self.is_whites_turn():
             self.outcome = "Checkmate!! White Wins"
         else:
@@ -478,15 +857,9 @@ class ChessBoard:
         if self.is_king_in_check(king):
             return False
 
-        if king.is_white_piece():
-            piece_list = self.white_pieces_on_the_board
-        else:
-            piece_list = self.black_pieces_on_the_board
-
         # no legal moves
-        for piece in piece_list:
-            if piece.all_legal_squares_to_move_to(self):
-                return False
+        if self.has_legal_move(king.color):
+            return False
 
         self.outcome = "Stalemate! Draw"
         return True
@@ -498,9 +871,7 @@ class ChessBoard:
         return False
 
     def is_three_fold_repetition(self):
-        if str(self) not in self.past_game_states:
-            return False
-        if self.past_game_states[str(self)] == 3:
+        if self.past_game_states.get(self.get_game_state_after_move(), 0) == 3:
             self.outcome = "Three Fold Repetition! Draw"
             return True
         return False
@@ -537,61 +908,97 @@ class ChessBoard:
     def is_blacks_turn(self):
         return self.sideToMove == 1
 
-    def is_square_defended_by_opponent(self, square, color_of_attacking_side):
-        if color_of_attacking_side == Pieces.Piece.WHITE:
-            piece_list = self.white_pieces_on_the_board
-        else:
-            piece_list = self.black_pieces_on_the_board
-        for piece in piece_list:
-            if type(piece) == Pieces.Pawn:
-                if piece.is_valid_square_to_attack(self, square) and piece.is_defending_square(self, square):
-                    return True
-            else:
-                if piece.is_defending_square(self, square):
-                    return True
-        return False
-
-    def is_square_under_attack(self, square, color_of_attacking_side, include_king=True):
-        if color_of_attacking_side == Pieces.Piece.WHITE:
-            piece_list = self.white_pieces_on_the_board
-        else:
-            piece_list = self.black_pieces_on_the_board
-        for piece in piece_list:
-            if not include_king and type(piece) == Pieces.King:
-                continue
-            if type(piece) == Pieces.Pawn:
-                if piece.is_valid_square_to_attack(self, square) and piece.is_legal_move(self, square):
-                    return True
-            else:
-                if piece.is_legal_move(self, square):
-                    return True
-        return False
-
-    def is_square_under_attack_from_non_king_piece(self, square, color_of_attacking_side):
-        return self.is_square_under_attack(square, color_of_attacking_side, False)
-
-    def can_move_to_square_with_non_king_piece(self, square, color_to_move):
-        if color_to_move == Pieces.Piece.WHITE:
-            piece_list = self.white_pieces_on_the_board
-            king_to_validate = self.whiteKing
-        else:
-            piece_list = self.black_pieces_on_the_board
-            king_to_validate = self.blackKing
-        for piece in piece_list:
-            if type(piece) == Pieces.King:
-                continue
-            if piece.is_legal_move(self, square) \
-                    and not self.is_king_in_check_after_simulating_move(piece.current_square, square, king_to_validate):
-                return True
-        return False
-
     def __str__(self):
         board_as_str = ''
-        for i, row in enumerate(self.board[::-1]):
-            board_as_str += str(8 - i) + ' | ' + ' '.join(map(str, row))
+        for row in range(7, -1, -1):
+            board_as_str += str(row + 1) + ' | ' + ' '.join(map(str, self.board[row * 8:row * 8 + 8]))
             board_as_str += '\n'
         board_as_str += '   ' + '-' * 16 + '\n'
         board_as_str += '    '  # position forthcoming column labels
         for col in self.ALL_COLS:
             board_as_str += col + ' '
         return board_as_str[:-1]
+
+
+class MoveUndoRecord:
+    # everything ChessBoard.push changes that cannot be recomputed from the move itself
+
+    def __init__(self, board, move, origin_piece):
+        self.move = move
+        self.origin_index = move[0]
+        self.destination_index = move[1]
+        self.origin_piece = origin_piece
+        self.origin_piece_is_first_move = origin_piece.isFirstMove if hasattr(origin_piece, 'isFirstMove') else None
+        self.captured_piece = None
+        self.captured_index = None
+        self.is_promotion = False
+        self.rook = None
+        self.rook_squares = None
+        self.piece_lists = None
+
+        self.en_passant_index = board.en_passant_index
+        self.reset_en_passant_target_square = board.resetEnPassantTargetSquare
+        self.castling_rights = (board.canWhiteCastleShort, board.canWhiteCastleLong,
+                                board.canBlackCastleShort, board.canBlackCastleLong)
+        self.fifty_move_counter = board.fifty_move_counter
+        self.fullmove_number = board.fullmove_number
+        self.promote_pawn_to = board.promotePawnTo
+
+    def save_castling_rook(self, board, old_rook_index, new_rook_index):
+        self.rook_squares = (old_rook_index, board.board[old_rook_index],
+                             new_rook_index, board.board[new_rook_index])
+        rook = self.rook_squares[1]
+        if rook != board.EMPTY_SQUARE:
+            self.rook = rook
+
+    def save_piece_lists(self, board):
+        # only captures and promotions change the piece lists
+        self.piece_lists = (list(board.white_pieces_on_the_board),
+                            list(board.black_pieces_on_the_board),
+                            len(board.pieces_off_the_board))
+
+    def restore(self, board):
+        board.update_side_to_move()
+
+        if self.rook_squares is not None:
+            old_rook_index, old_rook_index_contents, new_rook_index, new_rook_index_contents = self.rook_squares
+            board.assign_value_to_index(old_rook_index_contents, old_rook_index)
+            board.assign_value_to_index(new_rook_index_contents, new_rook_index)
+            if self.rook is not None:
+                self.rook.index = old_rook_index
+
+        board.assign_value_to_index(board.EMPTY_SQUARE, self.destination_index)
+        board.assign_value_to_index(self.origin_piece, self.origin_index)
+        self.origin_piece.index = self.origin_index
+        if self.origin_piece_is_first_move is not None:
+            self.origin_piece.isFirstMove = self.origin_piece_is_first_move
+
+        if self.captured_piece is not None:
+            board.assign_value_to_index(self.captured_piece, self.captured_index)
+
+        if self.piece_lists is not None:
+            white_pieces, black_pieces, number_of_pieces_off_the_board = self.piece_lists
+            board.white_pieces_on_the_board[:] = white_pieces
+            board.black_pieces_on_the_board[:] = black_pieces
+            del board.pieces_off_the_board[number_of_pieces_off_the_board:]
+
+        board.en_passant_index = self.en_passant_index
+        board.resetEnPassantTargetSquare = self.reset_en_passant_target_square
+        board.canWhiteCastleShort, board.canWhiteCastleLong, \
+            board.canBlackCastleShort, board.canBlackCastleLong = self.castling_rights
+        board.fifty_move_counter = self.fifty_move_counter
+        board.fullmove_number = self.fullmove_number
+
+
+class NullMoveUndoRecord:
+    # what ChessBoard.push_null changes: only the side to move and the en passant square
+
+    def __init__(self, board):
+        self.move = None
+        self.en_passant_index = board.en_passant_index
+        self.reset_en_passant_target_square = board.resetEnPassantTargetSquare
+
+    def restore(self, board):
+        board.update_side_to_move()
+        board.en_passant_index = self.en_passant_index
+        board.resetEnPassantTargetSquare = self.reset_en_passant_target_square
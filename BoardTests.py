@@ -1,11 +1,17 @@
 import unittest
+import Bitboard
 import Board
+import Perft
+import PieceSquareTables
 import Pieces
+import Zobrist
 
 
 class Tests(unittest.TestCase):
+    board_class = Board.ChessBoard  # overridden to run the same tests against other board backends
+
     def setUp(self):
-        self.board = Board.ChessBoard()
+        self.board = self.board_class()
         self.longMessage = True
 
     def tearDown(self):
@@ -47,7 +53,7 @@ class Tests(unittest.TestCase):
 
 class MaintenanceTests(Tests):
     def setUp(self):
-        self.board = Board.ChessBoard()
+        self.board = self.board_class()
         self.board.ignore_move_order = True
         self.longMessage = True
 
@@ -64,6 +70,14 @@ class MaintenanceTests(Tests):
                 self.assertEquals(expected_coordinates, actual_coordinates,
                                   "Incorrect conversion from algebraic notation to numeric coordinates")
 
+    def test_converting_between_algebraic_moves_and_board_indices(self):
+        self.assertEqual((12, 28), self.board.parse_move('e2e4'))
+        self.assertEqual((52, 60, 'n'), self.board.parse_move('e7e8n'))
+        self.assertEqual('a1h8', self.board.get_move_notation((0, 63)))
+        self.assertEqual('e7e8q', self.board.get_move_notation(self.board.parse_move('e7e8q')))
+        self.assertIsNone(self.board.parse_move('e2e9'))
+        self.assertIsNone(self.board.parse_move('e2'))
+
     def test_printing_of_initial_piece_setup(self):
         expected_board_printout = "8 | r n b q k b n r" + "\n" \
                                   "7 | p p p p p p p p" + "\n" \
@@ -159,7 +173,7 @@ class MaintenanceTests(Tests):
 
 class MoveSpecificTests(Tests):
     def setUp(self):
-        self.board = Board.ChessBoard()
+        self.board = self.board_class()
         self.board.ignore_move_order = True
         self.longMessage = True
 
@@ -617,6 +631,43 @@ class MoveSpecificTests(Tests):
         # rook already moved
         self.verify_illegal_move_is_not_made(Pieces.King, 'e8', 'g8')
 
+    def test_illegal_castling_through_square_attacked_by_pawn(self):
+        self.board = self.board_class.from_fen('rnbqkbnr/ppppppp1/8/8/8/3BPN2/PPPP1PpP/RNBQK2R w KQkq - 0 5')
+        # the black pawn on g2 attacks f1, which the king would pass over
+        self.verify_illegal_move_is_not_made(Pieces.King, 'e1', 'g1')
+        self.verify_illegal_move_is_not_made(Pieces.King, 'e1', 'f1')
+        self.verify_legal_move(Pieces.King, 'e1', 'e2')
+
+    def test_long_castling_needs_every_square_up_to_the_rook_empty(self):
+        self.board.execute_move('d2', 'd3')
+        self.board.execute_move('c1', 'e3')
+        self.board.execute_move('d1', 'd2')
+        # the knight on b1 is still in the way of the rook
+        self.verify_illegal_move_is_not_made(Pieces.King, 'e1', 'c1')
+        self.board.execute_move('b1', 'c3')
+        self.verify_legal_move(Pieces.King, 'e1', 'c1')
+        self.assertIsInstance(self.board.get_contents_of_square('d1'), Pieces.Rook)
+
+    def test_capturing_a_rook_on_its_starting_square_revokes_castling(self):
+        self.board.execute_move('g7', 'g6')
+        self.board.execute_move('f8', 'g7')
+        self.board.execute_move('g7', 'b2')
+        self.assertTrue(self.board.canWhiteCastleLong)
+        self.board.execute_move('b2', 'a1')
+        self.assertFalse(self.board.canWhiteCastleLong)
+        self.assertTrue(self.board.canWhiteCastleShort)
+
+    def test_pinned_piece_can_only_move_along_the_pin(self):
+        self.board.execute_move('e2', 'e4')
+        self.board.execute_move('e7', 'e6')
+        self.board.execute_move('f8', 'b4')
+        # b4 - c3 - d2 - e1: the d2 pawn is pinned
+        self.verify_illegal_move_is_not_made(Pieces.Pawn, 'd2', 'd3')
+        self.verify_illegal_move_is_not_made(Pieces.Pawn, 'd2', 'd4')
+        self.assertEqual([], self.board.get_contents_of_square('d2').all_legal_indices_to_move_to(self.board))
+        self.board.execute_move('c2', 'c3')  # blocks the pin
+        self.verify_legal_move(Pieces.Pawn, 'd2', 'd4')
+
     def test_pawn_promotion(self):
         self.board.execute_move('a2', 'a4')
         self.board.execute_move('a4', 'a5')
@@ -1345,3 +1396,420 @@ class FullGameTests(Tests):
         self.assertTrue(self.board.is_game_over)
         self.assertAlmostEquals(50.0, self.board.fifty_move_counter)
         self.assertEquals("Fifty Moves without pawn move or capture! Draw", self.board.outcome)
+
+
+class PushPopTests(Tests):
+    def get_position_snapshot(self):
+        return (str(self.board),
+                self.board.sideToMove,
+                self.board.enPassantTargetSquare,
+                self.board.resetEnPassantTargetSquare,
+                self.board.fifty_move_counter,
+                (self.board.canWhiteCastleShort, self.board.canWhiteCastleLong,
+                 self.board.canBlackCastleShort, self.board.canBlackCastleLong),
+                [(piece, piece.current_square) for piece in self.board.white_pieces_on_the_board],
+                [(piece, piece.current_square) for piece in self.board.black_pieces_on_the_board],
+                list(self.board.pieces_off_the_board))
+
+    def verify_push_and_pop_restores_position(self, notation):
+        move = self.board.parse_move(notation)
+        snapshot = self.get_position_snapshot()
+        self.board.push(move)
+        self.assertNotEqual(snapshot[0], str(self.board))
+        self.assertEqual(move, self.board.pop())
+        self.assertEqual(snapshot, self.get_position_snapshot())
+
+    def test_push_and_pop_quiet_moves(self):
+        self.verify_push_and_pop_restores_position('e2e4')
+        self.verify_push_and_pop_restores_position('g1f3')
+
+    def test_push_changes_side_to_move(self):
+        self.board.push(self.board.parse_move('e2e4'))
+        self.assertTrue(self.board.is_blacks_turn())
+        self.assertEqual('e3', self.board.enPassantTargetSquare)
+        self.board.push(self.board.parse_move('e7e5'))
+        self.assertTrue(self.board.is_whites_turn())
+        self.board.pop()
+        self.board.pop()
+        self.assertEqual([], self.board.move_stack)
+
+    def test_push_and_pop_capture(self):
+        self.board.execute_move('e2', 'e4')
+        self.board.execute_move('d7', 'd5')
+        self.verify_push_and_pop_restores_position('e4d5')
+
+    def test_push_and_pop_en_passant(self):
+        self.board.execute_move('e2', 'e4')
+        self.board.execute_move('a7', 'a6')
+        self.board.execute_move('e4', 'e5')
+        self.board.execute_move('d7', 'd5')
+        self.verify_push_and_pop_restores_position('e5d6')
+
+    def test_push_and_pop_castling(self):
+        self.board.execute_move('e2', 'e4')
+        self.board.execute_move('e7', 'e5')
+        self.board.execute_move('g1', 'f3')
+        self.board.execute_move('b8', 'c6')
+        self.board.execute_move('f1', 'c4')
+        self.board.execute_move('g8', 'f6')
+        rook = self.board.get_contents_of_square('h1')
+        self.verify_push_and_pop_restores_position('e1g1')
+        self.assertTrue(self.board.get_contents_of_square('e1').isFirstMove)
+        self.assertEqual('h1', rook.current_square)
+        self.assertTrue(self.board.execute_move('e1', 'g1'))
+        self.assertEqual(rook, self.board.get_contents_of_square('f1'))
+
+    def test_push_and_pop_promotion_with_capture(self):
+        self.board.ignore_move_order = True
+        self.board.execute_move('b2', 'b4')
+        self.board.execute_move('b4', 'b5')
+        self.board.execute_move('b5', 'b6')
+        self.board.execute_move('b6', 'a7')
+        for promotion in ('q', 'r', 'b', 'n'):
+            self.verify_push_and_pop_restores_position('a7b8' + promotion)
+        self.board.push(self.board.parse_move('a7b8n'))
+        self.assertEqual(Pieces.Knight, type(self.board.get_contents_of_square('b8')))
+        self.board.pop()
+        self.assertEqual(Pieces.Pawn, type(self.board.get_contents_of_square('a7')))
+
+    def test_push_null_passes_the_turn(self):
+        self.board.push(self.board.parse_move('e2e4'))
+        snapshot = self.get_position_snapshot()
+        position_hash = self.board.hash
+        self.board.push_null()
+        self.assertTrue(self.board.is_whites_turn())
+        self.assertIsNone(self.board.en_passant_index)
+        self.assertNotEqual(position_hash, self.board.hash)
+        self.assertIn(self.board.parse_move('d2d4'), self.board.generate_legal_moves())
+        self.assertIsNone(self.board.pop())
+        self.assertEqual(snapshot, self.get_position_snapshot())
+        self.assertEqual(position_hash, self.board.hash)
+
+    def test_non_pawn_material(self):
+        self.assertTrue(self.board.has_non_pawn_material(Pieces.Piece.WHITE))
+        self.board = self.board_class.from_fen('4k3/pp6/8/8/8/8/PP6/4K2N w - - 0 1')
+        self.assertTrue(self.board.has_non_pawn_material(Pieces.Piece.WHITE))
+        self.assertFalse(self.board.has_non_pawn_material(Pieces.Piece.BLACK))
+
+    def test_legality_checks_leave_position_unchanged(self):
+        self.board.execute_move('e2', 'e4')
+        self.board.execute_move('f7', 'f6')
+        self.board.execute_move('d1', 'h5')
+        snapshot = self.get_position_snapshot()
+        self.assertFalse(self.board.is_valid_move('a7', 'a6'))
+        self.assertTrue(self.board.is_valid_move('g7', 'g6'))
+        self.assertEqual(snapshot, self.get_position_snapshot())
+
+
+class ZobristHashTests(Tests):
+    def compute_hash_from_scratch(self):
+        key = 0
+        for piece in self.board.white_pieces_on_the_board + self.board.black_pieces_on_the_board:
+            row, col = self.board.get_row_and_col_coordinates_from_square(piece.current_square)
+            key ^= Zobrist.PIECE_SQUARE_KEYS[str(piece)][row * 8 + col]
+        if self.board.is_blacks_turn():
+            key ^= Zobrist.BLACK_TO_MOVE_KEY
+        key ^= Zobrist.CASTLING_KEYS[self.board.get_castling_rights_mask()]
+        if self.board.enPassantTargetSquare != '' and self.board.is_en_passant_capture_possible():
+            key ^= Zobrist.EN_PASSANT_FILE_KEYS[self.board.get_col_number_from_square(self.board.enPassantTargetSquare)]
+        return key
+
+    def test_incremental_hash_matches_hash_computed_from_scratch(self):
+        for move in [('e2', 'e4'), ('d7', 'd5'), ('e4', 'd5'), ('g8', 'f6'), ('f1', 'b5'), ('c7', 'c6'),
+                     ('g1', 'f3'), ('c6', 'b5'), ('e1', 'g1'), ('e7', 'e5'), ('d5', 'e6')]:
+            self.board.execute_move(move[0], move[1])
+            self.assertEqual(self.compute_hash_from_scratch(), self.board.hash)
+
+    def test_transpositions_have_equal_hash(self):
+        other_board = self.board_class()
+        for move in [('g1', 'f3'), ('g8', 'f6'), ('b1', 'c3')]:
+            self.board.execute_move(move[0], move[1])
+        for move in [('b1', 'c3'), ('g8', 'f6'), ('g1', 'f3')]:
+            other_board.execute_move(move[0], move[1])
+        self.assertEqual(other_board.hash, self.board.hash)
+
+    def test_hash_includes_side_to_move(self):
+        initial_hash = self.board.hash
+        self.board.update_side_to_move()
+        self.assertNotEqual(initial_hash, self.board.hash)
+
+    def test_hash_includes_castling_rights(self):
+        for move in [('e2', 'e4'), ('e7', 'e5'), ('e1', 'e2'), ('e8', 'e7'), ('e2', 'e1'), ('e7', 'e8')]:
+            self.board.execute_move(move[0], move[1])
+        board_with_castling_rights = self.board_class()
+        for move in [('e2', 'e4'), ('e7', 'e5')]:
+            board_with_castling_rights.execute_move(move[0], move[1])
+        self.assertEqual(str(board_with_castling_rights), str(self.board))
+        self.assertNotEqual(board_with_castling_rights.hash, self.board.hash)
+
+    def test_en_passant_only_hashed_when_capture_is_possible(self):
+        self.board.execute_move('e2', 'e4')
+        self.assertFalse(self.board.is_en_passant_capture_possible())
+        self.assertEqual(self.compute_hash_from_scratch(), self.board.hash)
+
+    def test_game_history_is_keyed_by_hash(self):
+        self.board.execute_move('g1', 'f3')
+        position_hash = self.board.hash
+        self.assertIn(position_hash, self.board.past_game_states)
+        for move in [('g8', 'f6'), ('f3', 'g1'), ('f6', 'g8'), ('g1', 'f3')]:
+            self.board.execute_move(move[0], move[1])
+        self.assertEqual(position_hash, self.board.hash)
+        self.assertEqual(2, self.board.past_game_states[self.board.hash])
+
+    def test_pop_restores_hash(self):
+        initial_hash = self.board.hash
+        self.board.push(self.board.parse_move('e2e4'))
+        self.assertNotEqual(initial_hash, self.board.hash)
+        self.board.pop()
+        self.assertEqual(initial_hash, self.board.hash)
+
+
+class EvaluationTotalsTests(Tests):
+    def verify_totals_match_pieces_on_the_board(self):
+        for color, pieces in [(Pieces.Piece.WHITE, self.board.white_pieces_on_the_board),
+                              (Pieces.Piece.BLACK, self.board.black_pieces_on_the_board)]:
+            self.assertEqual(sum(PieceSquareTables.MATERIAL_VALUES[piece.symbol] for piece in pieces),
+                             self.board.material[color], self.board.to_fen())
+            self.assertEqual(sum(PieceSquareTables.PIECE_SQUARE_VALUES[piece.symbol][piece.index] for piece in pieces),
+                             self.board.piece_square_score[color], self.board.to_fen())
+
+    def test_starting_position_totals(self):
+        self.assertEqual(self.board.material[Pieces.Piece.WHITE], self.board.material[Pieces.Piece.BLACK])
+        self.assertEqual(self.board.piece_square_score[Pieces.Piece.WHITE],
+                         self.board.piece_square_score[Pieces.Piece.BLACK])
+        self.verify_totals_match_pieces_on_the_board()
+
+    def test_totals_follow_captures_castling_en_passant_and_promotions(self):
+        # every kind of move appears within two plies of these positions
+        for _, fen, _ in Perft.REFERENCE_POSITIONS[1:4]:
+            self.board = self.board_class.from_fen(fen)
+            self.verify_totals_match_pieces_on_the_board()
+            for move in self.board.generate_legal_moves():
+                self.board.push(move)
+                self.verify_totals_match_pieces_on_the_board()
+                for reply in self.board.generate_legal_moves():
+                    self.board.push(reply)
+                    self.verify_totals_match_pieces_on_the_board()
+                    self.board.pop()
+                self.board.pop()
+            self.verify_totals_match_pieces_on_the_board()
+
+    def test_mirrored_positions_have_mirrored_totals(self):
+        self.board = self.board_class.from_fen('r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1')
+        mirrored_board = self.board_class.from_fen(
+            'r3k2r/pppbbppp/2n2q1P/1P2p3/3pn3/BN2PNP1/P1PPQPB1/R3K2R b KQkq - 0 1')
+        self.assertEqual(self.board.piece_square_score[Pieces.Piece.WHITE],
+                         mirrored_board.piece_square_score[Pieces.Piece.BLACK])
+        self.assertEqual(self.board.piece_square_score[Pieces.Piece.BLACK],
+                         mirrored_board.piece_square_score[Pieces.Piece.WHITE])
+
+
+class PerftTests(Tests):
+    def test_reference_positions(self):
+        report = []
+        self.assertTrue(Perft.run_reference_positions(10000, self.board_class, report.append), '\n'.join(report))
+
+    def test_divide_adds_up_to_perft(self):
+        self.board = self.board_class.from_fen(Perft.REFERENCE_POSITIONS[1][1])
+        counts = Perft.divide(self.board, 2)
+        self.assertEqual(48, len(counts))
+        self.assertEqual(2039, sum(nodes for _, nodes in counts))
+        self.assertIn(('e1g1', 43), counts)
+
+    def test_perft_to_depth_zero_counts_the_position_itself(self):
+        self.assertEqual(1, Perft.perft(self.board, 0))
+        self.assertEqual(1, Perft.hashed_perft(self.board, 0, Perft.PerftHashTable(0.001)))
+
+    def test_perft_leaves_the_position_unchanged(self):
+        self.board = self.board_class.from_fen(Perft.REFERENCE_POSITIONS[3][1])
+        position, position_hash = str(self.board), self.board.hash
+        Perft.perft(self.board, 3)
+        self.assertEqual(position, str(self.board))
+        self.assertEqual(position_hash, self.board.hash)
+
+    def test_parallel_divide_matches_divide(self):
+        fen = Perft.REFERENCE_POSITIONS[1][1]
+        self.board = self.board_class.from_fen(fen)
+        backend = [name for name, board_class in Perft.BOARD_BACKENDS.items() if board_class is self.board_class][0]
+        expected_counts = Perft.divide(self.board, 3)
+        self.assertEqual((expected_counts, 0, 0), Perft.parallel_divide(fen, 3, 2, 1, backend))
+        self.assertEqual((expected_counts, 0, 0), Perft.parallel_divide(fen, 3, 2, 2, backend))
+        counts, hash_probes, hash_hits = Perft.parallel_divide(fen, 3, 2, 1, backend, 1)
+        self.assertEqual(expected_counts, counts)
+        self.assertEqual(len(expected_counts), hash_probes)  # one per task, at the depth 2 subtree of its root move
+        self.assertLessEqual(hash_hits, hash_probes)
+
+    def test_hashed_perft_matches_perft(self):
+        self.board = self.board_class.from_fen(Perft.REFERENCE_POSITIONS[2][1])
+        for megabytes in [0.001, 1]:
+            table = Perft.PerftHashTable(megabytes)
+            self.assertEqual(43238, Perft.hashed_perft(self.board, 4, table))
+            self.assertEqual(43238, sum(nodes for _, nodes in Perft.divide(self.board, 4, table)))
+            self.assertGreater(table.get_hit_rate(), 0)
+        self.assertEqual(1024 * 1024 // Perft.PerftHashTable.BYTES_PER_ENTRY, table.size)
+
+
+class FenTests(Tests):
+    def test_starting_position_fen_matches_new_board(self):
+        board_from_fen = self.board_class.from_fen(Board.ChessBoard.STARTING_POSITION_FEN)
+        self.assertEqual(str(self.board), str(board_from_fen))
+        self.assertEqual(self.board.hash, board_from_fen.hash)
+
+    def test_loading_side_castling_and_en_passant(self):
+        self.board = self.board_class.from_fen('rnbqkbnr/pppp1ppp/8/8/3pP3/8/PPP2PPP/RNBQKB1R b Kq e3 0 3')
+        self.assertTrue(self.board.is_blacks_turn())
+        self.assertEqual('e3', self.board.enPassantTargetSquare)
+        self.assertEqual((True, False, False, True),
+                         (self.board.canWhiteCastleShort, self.board.canWhiteCastleLong,
+                          self.board.canBlackCastleShort, self.board.canBlackCastleLong))
+        self.assertTrue(self.board.execute_move('d4', 'e3'))  # en passant
+        self.assertTrue(self.board.is_square_empty('e4'))
+
+    def test_loaded_position_plays_to_checkmate(self):
+        self.board = self.board_class.from_fen('6k1/5ppp/8/8/8/8/8/R5K1 w - - 0 1')
+        self.assertTrue(self.board.execute_move('a1', 'a8'))
+        self.assertTrue(self.board.is_game_over)
+        self.assertEqual("Checkmate!! White Wins", self.board.outcome)
+
+    def test_fen_round_trip(self):
+        for _, fen, _ in Perft.REFERENCE_POSITIONS:
+            self.assertEqual(fen, self.board_class.from_fen(fen).to_fen())
+        self.assertEqual(Board.ChessBoard.STARTING_POSITION_FEN, self.board.to_fen())
+
+    def test_fen_follows_moves_and_counters(self):
+        self.board.execute_move('e2', 'e4')
+        self.assertEqual('rnbqkbnr/pppppppp/8/8/4P3/8/PPPP1PPP/RNBQKBNR b KQkq e3 0 1', self.board.to_fen())
+        self.board.execute_move('g8', 'f6')
+        self.board.execute_move('e1', 'e2')
+        self.assertEqual('rnbqkb1r/pppppppp/5n2/8/4P3/8/PPPPKPPP/RNBQ1BNR b kq - 2 2', self.board.to_fen())
+        self.board.push(self.board.parse_move('f6e4'))
+        self.assertEqual('rnbqkb1r/pppppppp/8/8/4n3/8/PPPPKPPP/RNBQ1BNR w kq - 0 3', self.board.to_fen())
+        self.board.pop()
+        self.assertEqual('rnbqkb1r/pppppppp/5n2/8/4P3/8/PPPPKPPP/RNBQ1BNR b kq - 2 2', self.board.to_fen())
+
+    def test_missing_counters_default_to_start_of_game(self):
+        self.board = self.board_class.from_fen('4k3/8/8/8/8/8/8/4K3 b - -')
+        self.assertEqual('4k3/8/8/8/8/8/8/4K3 b - - 0 1', self.board.to_fen())
+
+    def test_invalid_fen_raises_value_error(self):
+        for fen in ['', 'rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP w KQkq - 0 1',
+                    'rnbqkbnr/pppppppp/9/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1',
+                    'rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR x KQkq - 0 1',
+                    'rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkx - 0 1',
+                    'rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQ1BNR w - - 0 1',
+                    'rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 0']:
+            self.assertRaises(ValueError, self.board_class.from_fen, fen)
+
+
+class StaticExchangeTests(Tests):
+    def get_see(self, fen, notation):
+        self.board = self.board_class.from_fen(fen)
+        position_hash = self.board.hash
+        see = self.board.see(self.board.parse_move(notation))
+        self.assertEqual(fen, self.board.to_fen(), "see must not change the position")
+        self.assertEqual(position_hash, self.board.hash)
+        return see
+
+    def test_exchanges(self):
+        for fen, notation, expected_see in [
+                ('4k3/8/8/3p4/4P3/8/8/4K3 w - - 0 1', 'e4d5', 100),  # undefended pawn
+                ('4k3/8/2p5/3p4/4P3/8/8/4K3 w - - 0 1', 'e4d5', 0),  # pawn for pawn
+                ('4k3/8/2p5/3p4/8/8/8/3QK3 w - - 0 1', 'd1d5', -800),  # queen for pawn
+                ('1k1r4/1pp4p/p7/4p3/8/P5P1/1PP4P/2K1R3 w - - 0 1', 'e1e5', 100),
+                ('4k3/8/8/4p3/8/8/8/3QK3 w - - 0 1', 'd1d4', -900),  # a quiet move can lose material too
+                ('4k3/3r4/8/3p4/8/8/3R4/3RK3 w - - 0 1', 'd2d5', 100)]:  # the second rook backs up the first
+            self.assertEqual(expected_see, self.get_see(fen, notation), (fen, notation))
+
+    def test_x_ray_attackers_join_in(self):
+        # knight for pawn, then rook and queen recapture through the rook, bishop and queen through the bishop
+        self.assertEqual(-220, self.get_see('1k1r3q/1ppn3p/p4b2/4p3/8/P2N2P1/1PP1R1BP/2K1Q3 w - - 0 1', 'd3e5'))
+        # the queen behind the bishop's square on the diagonal recaptures the bishop: rook for pawn and bishop
+        self.assertEqual(-70, self.get_see('4k3/8/2b5/3p4/8/8/8/3RK2Q w - - 0 1', 'd1d5'))
+
+    def test_en_passant_opens_the_file(self):
+        # taking the d5 pawn en passant lets the d1 rook recapture on d6
+        self.assertEqual(100, self.get_see('k2r4/8/8/3pP3/8/8/8/K2R4 w - d6 0 1', 'e5d6'))
+
+    def test_promotions(self):
+        self.assertEqual(800, self.get_see('4k3/1P6/8/8/8/8/8/4K3 w - - 0 1', 'b7b8q'))
+        self.assertEqual(400, self.get_see('1rk5/P7/8/8/8/8/8/4K3 w - - 0 1', 'a7b8q'))
+
+    def test_king_only_takes_undefended_pieces(self):
+        self.assertEqual(500, self.get_see('4k3/8/8/3r4/4K3/8/8/8 w - - 0 1', 'e4d5'))
+        self.assertLess(self.get_see('4k3/3r4/8/3r4/4K3/8/8/8 w - - 0 1', 'e4d5'), -10000)
+
+
+class BitboardTests(Tests):
+    board_class = Bitboard.BitboardChessBoard
+
+    def verify_bitboards_match_board(self):
+        for symbol, bitboard in self.board.piece_bitboards.items():
+            expected_bitboard = 0
+            for index, contents in enumerate(self.board.board):
+                if contents != self.board.EMPTY_SQUARE and contents.symbol == symbol:
+                    expected_bitboard |= 1 << index
+            self.assertEqual(expected_bitboard, bitboard, symbol)
+        self.assertEqual(self.board.color_occupancy['w'] | self.board.color_occupancy['b'], self.board.occupied)
+
+    def test_bitboards_follow_moves_and_take_backs(self):
+        self.verify_bitboards_match_board()
+        self.assertEqual(0xffff, self.board.color_occupancy['w'])
+        self.assertEqual(0xffff << 48, self.board.color_occupancy['b'])
+        for move in [('e2', 'e4'), ('d7', 'd5'), ('e4', 'd5'), ('g8', 'f6'), ('f1', 'b5'), ('c7', 'c6'),
+                     ('g1', 'f3'), ('c6', 'b5'), ('e1', 'g1'), ('e7', 'e5'), ('d5', 'e6')]:
+            self.board.execute_move(move[0], move[1])
+            self.verify_bitboards_match_board()
+        self.board.push(self.board.parse_move('f8c5'))
+        self.verify_bitboards_match_board()
+        self.board.pop()
+        self.verify_bitboards_match_board()
+
+    def test_same_moves_and_attacks_as_mailbox_board(self):
+        mailbox_board = Board.ChessBoard()
+        for move in [('e2', 'e4'), ('d7', 'd5'), ('e4', 'd5'), ('d8', 'd5'), ('b1', 'c3'), ('d5', 'e5'),
+                     ('f1', 'e2'), ('e5', 'g5'), ('g1', 'f3'), ('g5', 'g2')]:
+            self.board.execute_move(move[0], move[1])
+            mailbox_board.execute_move(move[0], move[1])
+            self.assertEqual(sorted(mailbox_board.generate_legal_moves(), key=str),
+                             sorted(self.board.generate_legal_moves(), key=str))
+            for index in range(64):
+                for color in ('w', 'b'):
+                    self.assertEqual(sorted(mailbox_board.get_attackers_of_index(index, color)),
+                                     sorted(self.board.get_attackers_of_index(index, color)))
+
+
+# the whole suite again, on the bitboard backend
+class BitboardMaintenanceTests(MaintenanceTests):
+    board_class = Bitboard.BitboardChessBoard
+
+
+class BitboardMoveSpecificTests(MoveSpecificTests):
+    board_class = Bitboard.BitboardChessBoard
+
+
+class BitboardFullGameTests(FullGameTests):
+    board_class = Bitboard.BitboardChessBoard
+
+
+class BitboardPushPopTests(PushPopTests):
+    board_class = Bitboard.BitboardChessBoard
+
+
+class BitboardZobristHashTests(ZobristHashTests):
+    board_class = Bitboard.BitboardChessBoard
+
+
+class BitboardPerftTests(PerftTests):
+    board_class = Bitboard.BitboardChessBoard
+
+
+class BitboardFenTests(FenTests):
+    board_class = Bitboard.BitboardChessBoard
+
+
+class BitboardEvaluationTotalsTests(EvaluationTotalsTests):
+    board_class = Bitboard.BitboardChessBoard
+
+
+class BitboardStaticExchangeTests(StaticExchangeTests):
+    board_class = Bitboard.BitboardChessBoard
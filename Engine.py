@@ -1,41 +1,165 @@
 # engine
+import concurrent.futures
+import multiprocessing
+import os
+import queue
 import random
-from copy import deepcopy
+import time
 
+import MoveOrdering
+import PieceSquareTables
+import Pieces
+import TranspositionTable
 
-class Engine:
+
+class SearchStopped(Exception):
+    # raised inside the search when a limit is reached, Engine.search catches it and unwinds the board
+    pass
+
+
+class SearchResult:
+    # what Engine.search found: the best move with its score (centipawns, from the side to move's view),
+    # the principal variation starting with that move, and how much work it took
+    def __init__(self, best_move=None, score=0, pv=None, depth=0, nodes=0, seconds=0.0, statistics=None, lines=None):
+        self.best_move = best_move
+        self.score = score
+        self.pv = pv or []
+        self.depth = depth
+        self.nodes = nodes
+        self.seconds = seconds
+        self.statistics = statistics  # SearchStatistics of the search up to this result
+        # multi-PV search: a SearchResult per line, best first, nodes counting the nodes searched for that line
+        # in the last iteration. The first line is this result's best move, score and pv
+        self.lines = lines or []
+
+    def get_nodes_per_second(self):
+        return int(self.nodes / self.seconds) if self.seconds > 0 else 0
+
+
+class SearchStatistics:
+    # counters of one search, for tuning and for watching the engine's performance in production.
+    # iteration_seconds and iteration_nodes: time and nodes spent on each completed iteration, from the first
     def __init__(self):
-        self.piece_values = {'p': 1, 'b': 3, 'n': 3, 'r': 5, 'q': 9, 'k': 10000,
-                             'P': 1, 'B': 3, 'N': 3, 'R': 5, 'Q': 9, 'K': 10000}
+        self.nodes = 0
+        self.quiescence_nodes = 0
+        self.seconds = 0.0
+        self.depth = 0  # of the last completed iteration
+        self.selective_depth = 0  # deepest ply reached, quiescence included
+        self.iteration_seconds = []
+        self.iteration_nodes = []
+        self.transposition_table_probes = 0
+        self.transposition_table_hits = 0
+        self.transposition_table_stores = 0
+        self.transposition_table_collisions = 0
+        self.beta_cutoffs = 0
+        self.first_move_beta_cutoffs = 0
+        self.principal_variation_researches = 0
+        self.aspiration_researches = 0
+
+    def get_nodes_per_second(self):
+        return int(self.nodes / self.seconds) if self.seconds > 0 else 0
+
+    def get_effective_branching_factor(self):
+        # how many times the nodes grew from one iteration to the next, over the last two iterations
+        if len(self.iteration_nodes) >= 2 and self.iteration_nodes[-2] > 0:
+            return self.iteration_nodes[-1] / self.iteration_nodes[-2]
+        return float(self.iteration_nodes[0]) if self.iteration_nodes else 0.0
+
+    def get_first_move_cutoff_rate(self):
+        return self.first_move_beta_cutoffs / self.beta_cutoffs if self.beta_cutoffs else 0.0
+
+    def get_transposition_table_hit_rate(self):
+        return self.transposition_table_hits / self.transposition_table_probes \
+            if self.transposition_table_probes else 0.0
+
+    def add_counters(self, other):
+        # adds the work of another search of the same position, e.g. another process of a parallel search
+        for name in ('nodes', 'quiescence_nodes', 'transposition_table_probes', 'transposition_table_hits',
+                     'transposition_table_stores', 'transposition_table_collisions', 'beta_cutoffs',
+                     'first_move_beta_cutoffs', 'principal_variation_researches', 'aspiration_researches'):
+            setattr(self, name, getattr(self, name) + getattr(other, name))
+        self.selective_depth = max(self.selective_depth, other.selective_depth)
+
+    def as_dict(self):
+        # flat {name: number} with the derived rates, e.g. to log one line per search
+        values = dict(vars(self))
+        values['nodes_per_second'] = self.get_nodes_per_second()
+        values['effective_branching_factor'] = self.get_effective_branching_factor()
+        values['first_move_cutoff_rate'] = self.get_first_move_cutoff_rate()
+        values['transposition_table_hit_rate'] = self.get_transposition_table_hit_rate()
+        return values
+
+
+class Engine:
+    # search scores are centipawns from the point of view of the side to move
+    CENTIPAWN_VALUES = PieceSquareTables.MATERIAL_VALUES
+    MATE_SCORE = 100000  # mate in n plies scores MATE_SCORE - n
+    KING_VALUE = 1000000  # centipawns a king counts for in get_material_score
+    INFINITE_SCORE = 1000000
+    MAX_PLY = 128
+    NODES_BETWEEN_LIMIT_CHECKS = 256  # the clock is only read this often, about every 10ms
+    DEFAULT_MOVES_TO_GO = 30  # moves the remaining clock time is spread over when the time control doesn't say
+    TIME_SAFETY_MARGIN = 0.05  # seconds kept back from every allocation for the overhead around the search
+    DELTA_MARGIN = 200  # captures that can't get within this of alpha even when winning the piece aren't searched
+    NULL_MOVE_REDUCTION = 2  # plies the search after a null move is shallower than after a real move, on top of 1
+    NULL_MOVE_MIN_DEPTH = 3
+    LATE_MOVE_REDUCTION_MIN_DEPTH = 3
+    LATE_MOVE_REDUCTION_MIN_MOVES = 3  # moves searched at full depth before quiet ones start being reduced
+    FUTILITY_MARGINS = (0, 200, 400)  # FUTILITY_MARGINS[depth]: most a quiet move is expected to gain
+    RAZORING_MARGINS = (0, 300, 550)  # RAZORING_MARGINS[depth]: below alpha by more than this, only captures help
+    ASPIRATION_MIN_DEPTH = 3  # iterations from this depth on start with an aspiration window
+    ASPIRATION_WINDOW = 50  # centipawns either side of the previous iteration's score
+    ASPIRATION_MAX_WINDOW = 1000  # once widening goes past this the full window is searched
+    SELECTIVE_SEARCH_SWITCHES = ('use_null_move_pruning', 'use_late_move_reductions', 'use_futility_pruning',
+                                 'use_razoring')
+    SEARCH_SWITCHES = SELECTIVE_SEARCH_SWITCHES + ('use_principal_variation_search', 'use_aspiration_windows')
+
+    def __init__(self, hash_megabytes=16):
+        self.nodes = 0
+        self.quiescence_nodes = 0  # part of nodes searched in quiescence
+        self.selective_depth = 0  # deepest ply reached in the current search
+        self.iteration_seconds = []  # per completed iteration of the current search, see SearchStatistics
+        self.iteration_nodes = []
+        self.pv_table = []  # pv_table[ply]: best line found from the node at ply
+        self.search_path = []  # hashes of the positions from the root to the current node, for repetitions
+        self.null_moves_on_path = 0  # null moves between the root and the current node, see is_draw
+        self.transposition_table = TranspositionTable.TranspositionTable(hash_megabytes)
+        self.move_orderer = MoveOrdering.MoveOrderer()
+        self.beta_cutoffs = 0
+        self.first_move_beta_cutoffs = 0  # cutoffs by the first move tried, the share of these measures ordering
+        self.principal_variation_researches = 0  # null window searches that failed high and were searched again
+        self.aspiration_researches = 0  # root searches that fell outside the aspiration window
+        self.deadline = None  # time.perf_counter() value to stop at, None for no time limit
+        self.node_limit = None
+        self.next_limit_check = 0
+        self.stop_requested = False  # may be set from another thread through stop()
+        self.root_moves = None  # moves searched at the root, None for all
+        self.stop_event = None  # Event that stops the search from another thread or process (search_parallel, Uci)
+        # selective search, each can be switched off to measure what it gains (see SearchBenchmark):
+        self.use_null_move_pruning = True  # give the opponent a free move, if still >= beta the node is cut
+        self.use_late_move_reductions = True  # search quiet moves late in the order less deep, unless they surprise
+        self.use_futility_pruning = True  # skip quiet moves at frontier nodes far below alpha
+        self.use_razoring = True  # at frontier nodes far below alpha, trust quiescence instead of a full search
+        self.use_principal_variation_search = True  # null windows for every move but the first, see negamax
+        self.use_aspiration_windows = True  # iterations start with a window around the previous score
 
     @staticmethod
     def get_all_moves(board):
-        moves = []
-        if board.is_whites_turn():
-            pieces = board.white_pieces_on_the_board
-        else:
-            pieces = board.black_pieces_on_the_board
-        for piece in pieces:
-            for move in piece.all_legal_squares_to_move_to(board):
-                moves.append((piece.current_square, move))
-        return moves
+        return board.generate_legal_moves()
 
     def get_random_move(self, board):
         return random.choice(self.get_all_moves(board))
 
     def get_material_score(self, board):
+        # the side to move's material over the opponent's, from the board's running totals.
+        # MATERIAL_VALUES counts kings as 0, here they count as KING_VALUE so the opponent's total is never 0
         if board.is_whites_turn():
-            own_pieces = board.white_pieces_on_the_board
-            opponent_pieces = board.black_pieces_on_the_board
+            own_color, opponent_color = Pieces.Piece.WHITE, Pieces.Piece.BLACK
         else:
-            own_pieces = board.black_pieces_on_the_board
-            opponent_pieces = board.white_pieces_on_the_board
-
-        own_total = sum(self.piece_values[str(piece)] for piece in own_pieces)
-        opp_total = sum(self.piece_values[str(piece)] for piece in opponent_pieces)
-
-        score = float(own_total)/opp_total
-        return score
+            own_color, opponent_color = Pieces.Piece.BLACK, Pieces.Piece.WHITE
+        own_total = board.material[own_color] + self.KING_VALUE
+        opp_total = board.material[opponent_color] + self.KING_VALUE
+        return float(own_total) / opp_total
 
     def get_one_ply_materialistic_move_and_score(self, board):
         moves = self.get_all_moves(board)
@@ -43,9 +167,10 @@ class Engine:
         best_move = moves[0]
         best_score = -100000
         for move in moves:
-            copy_board = deepcopy(board)
-            copy_board.make_move(move[0], move[1])
-            pos_new_score = self.get_material_score(copy_board)
+            board.push(move)
+            # after the push it's the opponent's turn, so invert to get the score of the side that moved
+            pos_new_score = 1 / self.get_material_score(board)
+            board.pop()
             if pos_new_score > best_score:
                 best_move = move
                 best_score = pos_new_score
@@ -53,3 +178,540 @@ class Engine:
 
     def get_one_ply_materialistic_move(self, board):
         return self.get_one_ply_materialistic_move_and_score(board)[0]
+
+    @staticmethod
+    def evaluate(board):
+        # material and piece-square balance in centipawns for the side to move, from the board's running totals
+        material, piece_square_score = board.material, board.piece_square_score
+        white_total = material[Pieces.Piece.WHITE] + piece_square_score[Pieces.Piece.WHITE]
+        black_total = material[Pieces.Piece.BLACK] + piece_square_score[Pieces.Piece.BLACK]
+        if board.sideToMove == 0:
+            return white_total - black_total
+        return black_total - white_total
+
+    @classmethod
+    def is_mate_score(cls, score):
+        return abs(score) >= cls.MATE_SCORE - cls.MAX_PLY
+
+    @classmethod
+    def get_score_for_table(cls, score, ply):
+        # mate scores count plies from the root, the table stores them counted from the position itself
+        if score >= cls.MATE_SCORE - cls.MAX_PLY:
+            return score + ply
+        if score <= -(cls.MATE_SCORE - cls.MAX_PLY):
+            return score - ply
+        return score
+
+    @classmethod
+    def get_score_from_table(cls, score, ply):
+        if score >= cls.MATE_SCORE - cls.MAX_PLY:
+            return score - ply
+        if score <= -(cls.MATE_SCORE - cls.MAX_PLY):
+            return score + ply
+        return score
+
+    def is_draw(self, board, position_hash):
+        # fifty move rule, or a repetition of a position from the game or from the current line.
+        # A single repetition is scored as a draw, the side that could avoid it would have to deviate anyway
+        # After a null move only positions since the pass count: no real line repeats one from before it
+        if board.fifty_move_counter >= 50:
+            return True
+        if self.null_moves_on_path:
+            return position_hash in self.search_path
+        return position_hash in board.past_game_states or position_hash in self.search_path
+
+    def search(self, board, depth=None, seconds=None, nodes=None, soft_seconds=None, first_depth=1, root_moves=None,
+               report=None, multipv=1):
+        # iterative deepening alpha-beta search, made in place with push/pop, until one of the limits is reached:
+        #     depth: plies, seconds: hard wall clock limit, nodes: nodes searched (None for no limit).
+        #     soft_seconds: no new iteration is started after this long, as the next would rarely finish in time
+        # A search stopped by a limit returns the result of the last completed iteration.
+        # Every iteration starts with the principal variation of the previous one.
+        # first_depth: depth of the first iteration, the helpers of search_parallel start deeper than the others.
+        # root_moves: only these moves are searched at the root (None for all), see analyse_root_moves.
+        #     Moves that aren't legal are left out, if none is left every move is searched.
+        # report: called with the SearchResult of every completed iteration, its statistics so far included.
+        # multipv: number of best lines to find. Every iteration searches the root once per line, each time without
+        # the first moves of the lines before it, sharing the transposition table and move ordering between them.
+        # The returned result's statistics cover the whole search, a stopped last iteration included
+        start = time.perf_counter()
+        self.nodes = 0
+        self.quiescence_nodes = 0
+        self.selective_depth = 0
+        self.iteration_seconds = []
+        self.iteration_nodes = []
+        self.transposition_table.reset_stats()
+        self.search_path = []
+        self.null_moves_on_path = 0
+        self.transposition_table.new_search()
+        self.move_orderer.new_search()
+        self.beta_cutoffs = 0
+        self.first_move_beta_cutoffs = 0
+        self.principal_variation_researches = 0
+        self.aspiration_researches = 0
+        self.deadline = start + seconds if seconds is not None else None
+        self.node_limit = nodes
+        self.next_limit_check = 0  # the first node sets up the real check point
+        self.stop_requested = False
+        if root_moves is not None:
+            root_moves = [move for move in self.get_all_moves(board) if move in root_moves] or None
+        self.root_moves = root_moves
+        move_stack_length = len(board.move_stack)
+
+        result = SearchResult()
+        previous_lines = []  # the lines of the last completed iteration in the order they were searched
+        for iteration_depth in range(first_depth, (depth if depth is not None else self.MAX_PLY) + 1):
+            lines = []
+            try:
+                for line_number in range(max(1, multipv)):
+                    excluded_moves = [line.best_move for line in lines]
+                    if line_number > 0:
+                        self.root_moves = [move for move in self.get_all_moves(board) if move not in excluded_moves
+                                           and (root_moves is None or move in root_moves)]
+                        if not self.root_moves:
+                            break  # fewer moves than lines
+                    # the window and move order come from the first line of the last iteration this pass may
+                    # still play, lines can change places from one iteration to the next
+                    previous_line = next((line for line in previous_lines if line.best_move not in excluded_moves),
+                                         None)
+                    nodes_before_line = self.nodes
+                    score = self.search_root(board, iteration_depth, previous_line)
+                    pv = self.pv_table[0]
+                    lines.append(SearchResult(pv[0] if pv else None, score, list(pv), iteration_depth,
+                                              self.nodes - nodes_before_line, time.perf_counter() - start))
+            except SearchStopped:
+                while len(board.move_stack) > move_stack_length:
+                    board.pop()
+                self.search_path = []
+                self.null_moves_on_path = 0
+                self.root_moves = root_moves
+                if result.best_move is None:
+                    # the lines the first iteration completed, if any
+                    result = self.get_iteration_result(lines, start) if lines \
+                        else self.get_result_of_unfinished_first_iteration(board, start)
+                break
+            self.root_moves = root_moves
+            seconds_so_far = time.perf_counter() - start
+            self.iteration_seconds.append(seconds_so_far - sum(self.iteration_seconds))
+            self.iteration_nodes.append(self.nodes - sum(self.iteration_nodes))
+            previous_lines = lines
+            result = self.get_iteration_result(lines, start)
+            if report is not None:
+                report(result)
+            if all(self.is_mate_score(line.score) and self.MATE_SCORE - abs(line.score) <= iteration_depth
+                   for line in lines):
+                break  # a shorter mate can't exist, deeper iterations would only find the same ones
+            if soft_seconds is not None and time.perf_counter() - start >= soft_seconds:
+                break
+        self.deadline = None
+        self.node_limit = None
+        result.statistics = self.get_statistics(result.depth, time.perf_counter() - start)
+        return result
+
+    def search_root(self, board, depth, previous_result):
+        # one search of the root, with an aspiration window around the score of previous_result (the same line
+        # one iteration less deep, None for none) where it is worth it. Leaves the line in pv_table[0]
+        self.pv_table = [[] for _ in range(self.MAX_PLY + 1)]
+        if self.use_aspiration_windows and depth >= self.ASPIRATION_MIN_DEPTH and previous_result is not None \
+                and previous_result.depth > 0 and not self.is_mate_score(previous_result.score):
+            return self.search_with_aspiration_window(board, depth, previous_result)
+        return self.negamax(board, depth, -self.INFINITE_SCORE, self.INFINITE_SCORE, 0,
+                            previous_result.pv if previous_result is not None else None)
+
+    def get_iteration_result(self, lines, start):
+        # the result of an iteration from its lines, ranked by score: a later line can score a little higher than
+        # an earlier one when the search is unstable
+        lines = sorted(lines, key=lambda line: line.score, reverse=True)
+        best_line = lines[0]
+        seconds = time.perf_counter() - start
+        return SearchResult(best_line.best_move, best_line.score, list(best_line.pv), best_line.depth, self.nodes,
+                            seconds, self.get_statistics(best_line.depth, seconds), lines)
+
+    def get_statistics(self, depth, seconds):
+        statistics = SearchStatistics()
+        statistics.nodes = self.nodes
+        statistics.quiescence_nodes = self.quiescence_nodes
+        statistics.seconds = seconds
+        statistics.depth = depth
+        statistics.selective_depth = self.selective_depth
+        statistics.iteration_seconds = list(self.iteration_seconds)
+        statistics.iteration_nodes = list(self.iteration_nodes)
+        table = self.transposition_table
+        statistics.transposition_table_probes = table.probes
+        statistics.transposition_table_hits = table.hits
+        statistics.transposition_table_stores = table.stores
+        statistics.transposition_table_collisions = table.collisions
+        statistics.beta_cutoffs = self.beta_cutoffs
+        statistics.first_move_beta_cutoffs = self.first_move_beta_cutoffs
+        statistics.principal_variation_researches = self.principal_variation_researches
+        statistics.aspiration_researches = self.aspiration_researches
+        return statistics
+
+    def search_with_aspiration_window(self, board, depth, previous_result):
+        # the score rarely moves far from the previous iteration's, and a narrow window around it cuts more.
+        # A score outside the window is only a bound: the iteration is searched again with the window widened
+        # on that side, four times as far each time, until it becomes the full window
+        window = self.ASPIRATION_WINDOW
+        alpha = previous_result.score - window
+        beta = previous_result.score + window
+        while True:
+            score = self.negamax(board, depth, alpha, beta, 0, previous_result.pv)
+            if alpha < score < beta:
+                return score
+            self.aspiration_researches += 1
+            window *= 4
+            if window > self.ASPIRATION_MAX_WINDOW:
+                alpha, beta = -self.INFINITE_SCORE, self.INFINITE_SCORE
+            elif score <= alpha:
+                alpha = max(score - window, -self.INFINITE_SCORE)
+            else:
+                beta = min(score + window, self.INFINITE_SCORE)
+
+    def get_result_of_unfinished_first_iteration(self, board, start):
+        # a limit hit before depth 1 completed still has to give a move: the best one found so far,
+        # otherwise the first one in move order
+        pv = self.pv_table[0]
+        if pv:
+            best_move = pv[0]
+        else:
+            moves = self.get_root_moves(board)
+            best_move = self.move_orderer.order_moves(board, moves)[0] if moves else None
+        return SearchResult(best_move, 0, list(pv) or ([best_move] if best_move else []), 0, self.nodes,
+                            time.perf_counter() - start)
+
+    def get_root_moves(self, board):
+        moves = self.get_all_moves(board)
+        if self.root_moves is not None:
+            moves = [move for move in moves if move in self.root_moves]
+        return moves
+
+    def search_with_clock(self, board, remaining_seconds, increment_seconds=0.0, moves_to_go=None, depth=None):
+        # search for a game played on a clock: remaining_seconds left for the side to move, gaining
+        # increment_seconds per move, with moves_to_go moves until the next time control (None if there is none)
+        seconds, soft_seconds = self.allocate_time(remaining_seconds, increment_seconds, moves_to_go)
+        return self.search(board, depth, seconds, soft_seconds=soft_seconds)
+
+    @classmethod
+    def allocate_time(cls, remaining_seconds, increment_seconds=0.0, moves_to_go=None):
+        # (hard, soft) limits for one move: an even share of the remaining time plus most of the increment.
+        # The hard limit may stretch to three shares when an iteration is running long, never past the clock
+        moves_to_go = max(1, moves_to_go if moves_to_go is not None else cls.DEFAULT_MOVES_TO_GO)
+        available_seconds = max(0.0, remaining_seconds - cls.TIME_SAFETY_MARGIN)
+        share = available_seconds / moves_to_go + increment_seconds * 0.75
+        hard_seconds = min(share * 3, available_seconds * 0.5 if moves_to_go > 1 else available_seconds)
+        soft_seconds = min(share, hard_seconds)
+        return hard_seconds, soft_seconds
+
+    def stop(self):
+        # ends a running search at its next limit check, from another thread
+        self.stop_requested = True
+
+    def check_limits(self):
+        self.next_limit_check = self.nodes + self.NODES_BETWEEN_LIMIT_CHECKS
+        if self.node_limit is not None:
+            if self.nodes >= self.node_limit:
+                raise SearchStopped()
+            self.next_limit_check = min(self.next_limit_check, self.node_limit)
+        if self.stop_requested or (self.stop_event is not None and self.stop_event.is_set()) \
+                or (self.deadline is not None and time.perf_counter() >= self.deadline):
+            raise SearchStopped()
+
+    def search_parallel(self, board, workers=None, depth=None, seconds=None, nodes=None, soft_seconds=None):
+        # Lazy SMP: workers processes (default one per core) search the same position, sharing their results
+        # through a SharedTranspositionTable of the size of this engine's table. Half of them start one iteration
+        # deeper, so the processes spread over depths and fill the table for each other.
+        # Returns the deepest completed result, nodes counts the nodes of every process. The first process to
+        # complete the depth limit stops the others, as does stop() on this engine.
+        # nodes is the limit for every process. Lines played before board are known to the workers for repetitions
+        # only through board.past_game_states
+        workers = workers or os.cpu_count()
+        start = time.perf_counter()
+        table = TranspositionTable.SharedTranspositionTable(self.transposition_table.megabytes)
+        table.new_search()  # once for every process: the workers' own new_search leaves the shared age alone
+        results = multiprocessing.Queue()
+        stop_event = multiprocessing.Event()
+        self.stop_requested = False
+        processes = []
+        try:
+            for worker_index in range(workers):
+                task = (type(board), board.to_fen(), dict(board.past_game_states), table.get_name(), depth, seconds,
+                        nodes, soft_seconds, min(1 + worker_index % 2, depth or self.MAX_PLY), self.get_switches())
+                process = multiprocessing.Process(target=search_in_worker, args=(task, results, stop_event),
+                                                  daemon=True)
+                process.start()
+                processes.append(process)
+
+            worker_results = []
+            while len(worker_results) < workers:
+                if self.stop_requested:
+                    stop_event.set()
+                try:
+                    worker_result = results.get(timeout=0.01)
+                except queue.Empty:
+                    if any(process.is_alive() for process in processes):
+                        continue
+                    try:
+                        worker_result = results.get(timeout=1.0)  # a result may still be on its way
+                    except queue.Empty:
+                        raise RuntimeError('a search process ended without a result') from None
+                worker_results.append(worker_result)
+                stop_event.set()  # a process is done: the depth or a limit was reached, the others can stop too
+            for process in processes:
+                process.join()
+        finally:
+            for process in processes:
+                if process.is_alive():
+                    process.terminate()
+            table.unlink()
+
+        # the deepest result, of those the one searched by the most nodes. Its statistics get the counters of the
+        # other processes added, so they describe the work of the whole search
+        best_result = max(worker_results, key=lambda result: (result[3], result[4]))
+        best_move, score, pv, result_depth, _, statistics = best_result
+        for worker_result in worker_results:
+            if worker_result is not best_result:
+                statistics.add_counters(worker_result[5])
+        seconds = time.perf_counter() - start
+        statistics.seconds = seconds
+        return SearchResult(best_move, score, pv, result_depth, statistics.nodes, seconds, statistics)
+
+    def analyse_root_moves(self, board, depth, workers=None, report=None):
+        # scores every root move to depth with a full window, each in its own task on a pool of workers processes
+        # (default one per core). Returns a SearchResult per root move, best first: best_move is the root move and
+        # pv starts with it. Results are ranked as they arrive, report (if given) is called with the ranking so far
+        # every time a move is done. stop() on this engine drops the moves that haven't started yet
+        self.stop_requested = False
+        moves = self.move_orderer.order_moves(board, self.get_all_moves(board))  # likely best moves finish first
+        tasks = [(type(board), board.to_fen(), dict(board.past_game_states), move, depth, self.get_switches())
+                 for move in moves]
+        ranked_results = []
+        with concurrent.futures.ProcessPoolExecutor(workers or os.cpu_count()) as executor:
+            futures = [executor.submit(search_root_move_in_worker, task) for task in tasks]
+            for future in concurrent.futures.as_completed(futures):
+                if future.cancelled():
+                    continue
+                ranked_results.append(SearchResult(*future.result()))
+                ranked_results.sort(key=lambda result: result.score, reverse=True)
+                if report is not None:
+                    report(list(ranked_results))
+                if self.stop_requested:
+                    for pending_future in futures:
+                        pending_future.cancel()
+        return ranked_results
+
+    def get_switches(self):
+        # {name: value} of the search switches, for engines in other processes to search the same way
+        return {name: getattr(self, name) for name in self.SEARCH_SWITCHES}
+
+    def set_switches(self, switches):
+        for name, value in switches.items():
+            setattr(self, name, value)
+
+    def get_best_move(self, board, depth=None, seconds=None):
+        return self.search(board, depth, seconds).best_move
+
+    def negamax(self, board, depth, alpha, beta, ply, previous_pv=None):
+        # score of the position for the side to move, exact if it lies strictly between alpha and beta.
+        # previous_pv: line to try first, the part of the last iteration's principal variation below this node
+        self.nodes += 1
+        if ply > self.selective_depth:
+            self.selective_depth = ply
+        if self.nodes >= self.next_limit_check:
+            self.check_limits()
+        self.pv_table[ply] = []
+        position_hash = board.hash
+        if ply > 0 and self.is_draw(board, position_hash):
+            return 0
+
+        if depth <= 0 or ply >= self.MAX_PLY:
+            return self.quiescence(board, alpha, beta, ply)
+
+        original_alpha = alpha
+        hash_move = None
+        entry = self.transposition_table.probe(position_hash)
+        if entry is not None:
+            hash_move, table_score, table_depth, bound = entry
+            if ply > 0 and table_depth >= depth:
+                table_score = self.get_score_from_table(table_score, ply)
+                if bound == TranspositionTable.EXACT \
+                        or (bound == TranspositionTable.LOWER_BOUND and table_score >= beta) \
+                        or (bound == TranspositionTable.UPPER_BOUND and table_score <= alpha):
+                    return table_score
+
+        moves = self.get_all_moves(board)
+        if len(moves) == 0:
+            return -(self.MATE_SCORE - ply) if board.is_side_to_move_in_check() else 0
+        if ply == 0 and self.root_moves is not None:
+            moves = [move for move in moves if move in self.root_moves]
+
+        # selective search, only where the window is null: the score just has to be shown above or below it
+        is_in_check = board.is_side_to_move_in_check()
+        is_pruning_node = ply > 0 and beta - alpha == 1 and not is_in_check and not self.is_mate_score(beta)
+        static_score = self.evaluate(board) if is_pruning_node else 0
+        if is_pruning_node and self.use_razoring and depth < len(self.RAZORING_MARGINS) \
+                and static_score + self.RAZORING_MARGINS[depth] <= alpha:
+            score = self.quiescence(board, alpha, beta, ply)
+            if score <= alpha:
+                return score
+        if is_pruning_node and self.use_null_move_pruning and depth >= self.NULL_MOVE_MIN_DEPTH \
+                and static_score >= beta and board.move_stack and board.move_stack[-1].move is not None \
+                and board.has_non_pawn_material(board.get_color_to_move()):
+            # no null move with only king and pawns, where passing could well be the best move (zugzwang)
+            board.push_null()
+            search_path, self.search_path = self.search_path, []
+            self.null_moves_on_path += 1
+            score = -self.negamax(board, depth - 1 - self.NULL_MOVE_REDUCTION, -beta, -beta + 1, ply + 1)
+            self.null_moves_on_path -= 1
+            self.search_path = search_path
+            board.pop()
+            if score >= beta:
+                return beta if self.is_mate_score(score) else score  # a mate found after passing proves nothing
+        is_futile = is_pruning_node and self.use_futility_pruning and depth < len(self.FUTILITY_MARGINS) \
+            and static_score + self.FUTILITY_MARGINS[depth] <= alpha
+
+        if previous_pv and previous_pv[0] in moves:
+            hash_move = previous_pv[0]
+        else:
+            previous_pv = None
+        self.move_orderer.order_moves(board, moves, hash_move, ply)
+
+        best_score = -self.INFINITE_SCORE
+        best_move = None
+        self.search_path.append(position_hash)
+        for move_number, move in enumerate(moves):
+            is_quiet = self.move_orderer.is_quiet(board, move)
+            board.push(move)
+            gives_check = is_quiet and move_number > 0 and board.is_side_to_move_in_check()
+            if is_futile and is_quiet and move_number > 0 and not gives_check:
+                board.pop()
+                continue
+            if move_number == 0:
+                score = -self.negamax(board, depth - 1, -beta, -alpha, ply + 1,
+                                      previous_pv[1:] if previous_pv else None)
+            else:
+                # the moves after the first are expected to fail low: a null window is enough to show that, and
+                # late quiet moves get less depth for it. Only a move that beats alpha after all is searched again
+                needs_full_search = True
+                if self.use_late_move_reductions and is_quiet and not is_in_check and not gives_check \
+                        and depth >= self.LATE_MOVE_REDUCTION_MIN_DEPTH \
+                        and move_number >= self.LATE_MOVE_REDUCTION_MIN_MOVES:
+                    reduction = 1 if move_number < 2 * self.LATE_MOVE_REDUCTION_MIN_MOVES else 2
+                    score = -self.negamax(board, max(1, depth - 1 - reduction), -alpha - 1, -alpha, ply + 1)
+                    needs_full_search = score > alpha
+                if needs_full_search and self.use_principal_variation_search:
+                    score = -self.negamax(board, depth - 1, -alpha - 1, -alpha, ply + 1)
+                    needs_full_search = alpha < score < beta
+                    if needs_full_search:
+                        self.principal_variation_researches += 1
+                if needs_full_search:
+                    score = -self.negamax(board, depth - 1, -beta, -alpha, ply + 1)
+            board.pop()
+            if score > best_score:
+                best_score = score
+                best_move = move
+                if score > alpha:
+                    alpha = score
+                    self.pv_table[ply] = [move] + self.pv_table[ply + 1]
+                    if alpha >= beta:
+                        self.beta_cutoffs += 1
+                        if move_number == 0:
+                            self.first_move_beta_cutoffs += 1
+                        self.move_orderer.record_cutoff(board, move, depth, ply)
+                        break
+        self.search_path.pop()
+
+        if best_score >= beta:
+            bound = TranspositionTable.LOWER_BOUND
+        elif best_score > original_alpha:
+            bound = TranspositionTable.EXACT
+        else:
+            bound = TranspositionTable.UPPER_BOUND
+            best_move = hash_move  # every move failed low, none of them is known to be best
+        if ply > 0 or self.root_moves is None:  # a score over some of the root moves isn't the position's score
+            self.transposition_table.store(position_hash, depth, self.get_score_for_table(best_score, ply), bound,
+                                           best_move)
+        return best_score
+
+    def quiescence(self, board, alpha, beta, ply):
+        # searches captures and promotions only, until the position is quiet enough to trust evaluate.
+        # The side to move may also stand pat: decline every capture and keep the static evaluation.
+        # In check there is no standing pat, all evasions are searched
+        self.nodes += 1
+        if ply > self.selective_depth:
+            self.selective_depth = ply
+        self.quiescence_nodes += 1
+        if self.nodes >= self.next_limit_check:
+            self.check_limits()
+        if ply >= self.MAX_PLY:
+            return self.evaluate(board)
+
+        is_in_check = board.is_side_to_move_in_check()
+        if is_in_check:
+            moves = self.get_all_moves(board)
+            if len(moves) == 0:
+                return -(self.MATE_SCORE - ply)
+            best_score = -self.INFINITE_SCORE
+        else:
+            best_score = self.evaluate(board)
+            if best_score >= beta:
+                return best_score
+            if best_score > alpha:
+                alpha = best_score
+            moves = board.generate_legal_captures()
+        self.move_orderer.order_captures(board, moves)
+
+        for move in moves:
+            if not is_in_check and len(move) == 2:
+                # delta pruning: even winning the captured piece for free leaves the score well below alpha
+                captured_piece = board.board[move[1]]
+                gain = self.CENTIPAWN_VALUES[captured_piece.symbol] if captured_piece != board.EMPTY_SQUARE \
+                    else self.CENTIPAWN_VALUES['p']
+                if best_score + gain + self.DELTA_MARGIN <= alpha:
+                    continue
+                if board.see(move) < 0:
+                    continue  # loses material on the square even after the best recaptures
+            board.push(move)
+            score = -self.quiescence(board, -beta, -alpha, ply + 1)
+            board.pop()
+            if score > best_score:
+                best_score = score
+                if score > alpha:
+                    alpha = score
+                    if alpha >= beta:
+                        break
+        return best_score
+
+
+def search_in_worker(task, results, stop_event):
+    # runs in a process of Engine.search_parallel, task = (board class, fen, past game states, name of the shared
+    # table, depth, seconds, nodes, soft_seconds, first_depth, switches).
+    # Puts (best move, score, pv, depth, nodes, statistics)
+    board_class, fen, past_game_states, table_name, depth, seconds, nodes, soft_seconds, first_depth, switches = task
+    board = board_class.from_fen(fen)
+    board.past_game_states = past_game_states
+    engine = Engine(0)  # the smallest table, replaced by the shared one
+    engine.transposition_table = TranspositionTable.SharedTranspositionTable(name=table_name)
+    engine.stop_event = stop_event
+    engine.set_switches(switches)
+    try:
+        result = engine.search(board, depth, seconds, nodes, soft_seconds, first_depth)
+    finally:
+        engine.transposition_table.close()
+    results.put((result.best_move, result.score, result.pv, result.depth, result.nodes, result.statistics))
+
+
+worker_engine = None  # every process of Engine.analyse_root_moves keeps its engine and its table across tasks
+
+
+def search_root_move_in_worker(task):
+    # runs in a process of Engine.analyse_root_moves, task = (board class, fen, past game states, root move, depth,
+    # switches). Returns (move, score, pv, depth, nodes, seconds, statistics)
+    global worker_engine
+    board_class, fen, past_game_states, move, depth, switches = task
+    board = board_class.from_fen(fen)
+    board.past_game_states = past_game_states
+    if worker_engine is None:
+        worker_engine = Engine()
+    worker_engine.set_switches(switches)
+    result = worker_engine.search(board, depth, root_moves=[move])
+    return move, result.score, result.pv, result.depth, result.nodes, result.seconds, result.statistics
@@ -0,0 +1,872 @@
+import importlib
+import io
+import os
+import subprocess
+import sys
+import threading
+import time
+import unittest
+import unittest.mock
+from multiprocessing import shared_memory
+import Bitboard
+import Board
+import Engine
+import MoveOrdering
+import TranspositionTable
+import Uci
+
+
+class EngineTests(unittest.TestCase):
+    board_class = Board.ChessBoard  # overridden to run the same tests against other board backends
+
+    def setUp(self):
+        self.engine = Engine.Engine()
+        self.longMessage = True
+
+    def tearDown(self):
+        self.engine = None
+
+    def search(self, fen, depth):
+        board = self.board_class.from_fen(fen)
+        result = self.engine.search(board, depth)
+        self.assertEqual(fen, board.to_fen(), "search must leave the position unchanged")
+        return board, result
+
+    def get_pv_notation(self, board, result):
+        return [board.get_move_notation(move) for move in result.pv]
+
+
+class SearchTests(EngineTests):
+    def test_finds_back_rank_mate_in_one(self):
+        board, result = self.search('6k1/5ppp/8/8/8/8/8/R5K1 w - - 0 1', 3)
+        self.assertEqual(['a1a8'], self.get_pv_notation(board, result))
+        self.assertEqual(Engine.Engine.MATE_SCORE - 1, result.score)
+
+    def test_finds_mate_in_two(self):
+        # 1. Rd8+ Rxd8 2. Rxd8#
+        board, result = self.search('2r3k1/5ppp/8/8/8/8/3R1PPP/3R2K1 w - - 0 1', 4)
+        self.assertEqual('d2d8', board.get_move_notation(result.best_move))
+        self.assertEqual(Engine.Engine.MATE_SCORE - 3, result.score)
+        self.assertEqual(3, len(result.pv))
+
+    def test_avoids_getting_mated(self):
+        # ...Rb1 mates whatever white does
+        board, result = self.search('7k/8/8/8/2P5/1r6/r7/7K w - - 0 1', 3)
+        self.assertEqual(-(Engine.Engine.MATE_SCORE - 2), result.score)
+
+    def test_material_score(self):
+        board = self.board_class()
+        self.assertEqual(1.0, self.engine.get_material_score(board))
+        board = self.board_class.from_fen('4k3/8/8/3q4/8/8/3R4/4K3 b - - 0 1')
+        self.assertAlmostEqual((900 + Engine.Engine.KING_VALUE) / (500 + Engine.Engine.KING_VALUE),
+                               self.engine.get_material_score(board))
+        # the one ply materialistic move takes the most material
+        board = self.board_class.from_fen('4k3/8/8/3q4/8/8/3R4/4K3 w - - 0 1')
+        self.assertEqual('d2d5', board.get_move_notation(self.engine.get_one_ply_materialistic_move(board)))
+
+    def test_wins_hanging_queen(self):
+        board, result = self.search('4k3/8/8/3q4/8/8/3R4/4K3 w - - 0 1', 2)
+        self.assertEqual('d2d5', board.get_move_notation(result.best_move))
+        self.assertAlmostEqual(500, result.score, delta=50)  # a rook up, give or take piece-square bonuses
+
+    def test_does_not_take_defended_pawn_with_queen(self):
+        board, result = self.search('4k3/2p5/3p4/8/8/8/3Q4/4K3 w - - 0 1', 2)
+        self.assertNotEqual('d2d6', board.get_move_notation(result.best_move))
+
+    def test_quiescence_sees_recapture_beyond_the_horizon(self):
+        # at depth 1 only Qxd6 itself is searched, quiescence has to find ...cxd6
+        board, result = self.search('4k3/2p5/3p4/8/8/8/3Q4/4K3 w - - 0 1', 1)
+        self.assertNotEqual('d2d6', board.get_move_notation(result.best_move))
+        self.assertGreater(self.engine.quiescence_nodes, 0)
+
+    def test_quiescence_resolves_capture_sequence(self):
+        # Rxd5 Rxd5 Rxd5 leaves white a rook up: the exchange on d5 is all captures, so depth 1 is enough
+        board, result = self.search('3rk3/8/8/3p4/8/8/3R4/3RK3 w - - 0 1', 1)
+        self.assertEqual('d2d5', board.get_move_notation(result.best_move))
+        self.assertAlmostEqual(500, result.score, delta=50)  # a rook up, give or take piece-square bonuses
+
+    def test_quiescence_stands_pat_in_quiet_position(self):
+        board = self.board_class.from_fen('4k3/pppp4/8/8/8/8/PPP5/4K3 w - - 0 1')
+        score = self.engine.quiescence(board, -Engine.Engine.INFINITE_SCORE, Engine.Engine.INFINITE_SCORE, 0)
+        self.assertEqual(self.engine.evaluate(board), score)
+        self.assertAlmostEqual(-100, score, delta=50)
+        self.assertEqual(1, self.engine.quiescence_nodes)
+
+    def test_quiescence_skips_captures_losing_material(self):
+        # Qxd5 wins a pawn but loses the queen to ...cxd5, so it isn't searched at all
+        board = self.board_class.from_fen('4k3/8/2p5/3p4/8/8/8/3QK3 w - - 0 1')
+        score = self.engine.quiescence(board, -Engine.Engine.INFINITE_SCORE, Engine.Engine.INFINITE_SCORE, 0)
+        self.assertEqual(self.engine.evaluate(board), score)
+        self.assertEqual(1, self.engine.quiescence_nodes)
+
+    def test_quiescence_finds_mate_when_in_check(self):
+        board = self.board_class.from_fen('R5k1/5ppp/8/8/8/8/8/6K1 b - - 0 1')
+        score = self.engine.quiescence(board, -Engine.Engine.INFINITE_SCORE, Engine.Engine.INFINITE_SCORE, 0)
+        self.assertEqual(-Engine.Engine.MATE_SCORE, score)
+
+    def test_evaluation_reads_material_and_piece_square_totals(self):
+        board = self.board_class()
+        self.assertEqual(0, self.engine.evaluate(board))
+        board.push(board.parse_move('e2e4'))
+        # black to move, white has the better pawn square
+        self.assertEqual(-40, self.engine.evaluate(board))
+        board.push(board.parse_move('d7d5'))
+        board.push(board.parse_move('e4d5'))
+        self.assertLess(self.engine.evaluate(board), -100)
+        board.pop()
+        board.pop()
+        board.pop()
+        self.assertEqual(0, self.engine.evaluate(board))
+
+    def test_stalemate_scores_as_draw(self):
+        board, result = self.search('7k/5Q2/6K1/8/8/8/8/8 b - - 0 1', 2)
+        self.assertEqual(0, result.score)
+        self.assertIsNone(result.best_move)
+
+    def test_repeating_a_game_position_scores_as_draw(self):
+        # a queen down, white heads for the position after its first Nf3 again
+        board = self.board_class.from_fen('4k3/8/8/8/8/8/q7/4K1N1 w - - 0 1')
+        for move in [('g1', 'f3'), ('e8', 'd8'), ('f3', 'g1'), ('d8', 'e8')]:
+            self.assertTrue(board.execute_move(move[0], move[1]))
+        result = self.engine.search(board, 2)
+        self.assertEqual('g1f3', board.get_move_notation(result.best_move))
+        self.assertEqual(0, result.score)
+
+    def test_result_reports_depth_and_nodes(self):
+        board, result = self.search(Board.ChessBoard.STARTING_POSITION_FEN, 3)
+        self.assertEqual(3, result.depth)
+        self.assertEqual(3, len(result.pv))
+        self.assertGreater(result.nodes, 20)
+        self.assertIn(result.best_move, board.generate_legal_moves())
+
+    def test_alpha_beta_agrees_with_full_minimax_over_quiescence(self):
+        fen = '4k3/2p5/3p4/8/8/8/3Q4/4K3 w - - 0 1'
+        board = self.board_class.from_fen(fen)
+
+        def minimax(depth):
+            # full width to depth, then the same quiescence search the engine uses at its leaves
+            if depth == 0:
+                return self.engine.quiescence(board, -Engine.Engine.INFINITE_SCORE, Engine.Engine.INFINITE_SCORE, 0)
+            best_score = -Engine.Engine.INFINITE_SCORE
+            for move in board.generate_legal_moves():
+                board.push(move)
+                best_score = max(best_score, -minimax(depth - 1))
+                board.pop()
+            return best_score
+
+        self.assertEqual(minimax(2), self.search(fen, 2)[1].score)
+
+    def test_transposition_table_keeps_score_and_reuses_results(self):
+        fen = 'r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1'
+        board, result = self.search(fen, 3)
+        table = self.engine.transposition_table
+        self.assertGreater(table.hits, 0)
+        self.assertGreater(table.stores, 0)
+
+        self.engine = Engine.Engine(0.001)  # a handful of buckets, nearly every store replaces something
+        small_table_result = self.search(fen, 3)[1]
+        self.assertEqual(result.score, small_table_result.score)
+        self.assertGreater(self.engine.transposition_table.collisions, 0)
+
+    def test_mate_score_is_right_when_read_back_from_the_table(self):
+        fen = '2r3k1/5ppp/8/8/8/8/3R1PPP/3R2K1 w - - 0 1'
+        self.search(fen, 4)
+        board, result = self.search(fen, 4)  # second search answers from entries stored by the first
+        self.assertEqual(Engine.Engine.MATE_SCORE - 3, result.score)
+
+    def test_move_ordering_reduces_nodes_and_reports_cutoffs(self):
+        fen = 'r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10'
+        # depth 2 keeps the unordered search affordable, it spends most of its nodes in quiescence
+        ordered_result = self.search(fen, 2)[1]
+        self.assertGreater(ordered_result.statistics.beta_cutoffs, 0)
+        self.assertGreater(ordered_result.statistics.get_first_move_cutoff_rate(), 0)
+
+        self.engine = Engine.Engine()
+        self.engine.move_orderer.order_moves = lambda board, moves, hash_move=None, ply=0: moves
+        unordered_result = self.search(fen, 2)[1]
+        self.assertEqual(unordered_result.score, ordered_result.score)
+        self.assertLess(ordered_result.nodes, unordered_result.nodes)
+
+
+class SelectiveSearchTests(EngineTests):
+    fen = 'r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10'
+
+    def search_with_switches(self, fen, depth, **switches):
+        self.engine = Engine.Engine()
+        self.engine.set_switches(switches)
+        return self.search(fen, depth)
+
+    def count_null_moves(self, fen, depth):
+        board = self.board_class.from_fen(fen)
+        null_moves = []
+        push_null = board.push_null
+        board.push_null = lambda: null_moves.append(board.to_fen()) or push_null()
+        self.engine.search(board, depth)
+        self.assertEqual(fen, board.to_fen())
+        return null_moves
+
+    def test_selective_search_cuts_nodes_and_keeps_the_best_move(self):
+        switches_off = dict.fromkeys(Engine.Engine.SELECTIVE_SEARCH_SWITCHES, False)
+        _, plain_result = self.search_with_switches(self.fen, 4, **switches_off)
+        _, result = self.search_with_switches(self.fen, 4)
+        self.assertEqual(plain_result.best_move, result.best_move)
+        self.assertLess(result.nodes, plain_result.nodes)
+        for name in Engine.Engine.SELECTIVE_SEARCH_SWITCHES:
+            # every technique left out on its own costs nodes (or at least saves none)
+            _, result_without = self.search_with_switches(self.fen, 4, **{name: False})
+            self.assertGreaterEqual(result_without.nodes, result.nodes, name)
+
+    def test_null_move_is_tried_with_pieces_on_the_board(self):
+        self.assertGreater(len(self.count_null_moves(self.fen, 5)), 0)
+
+    def test_no_null_move_with_only_king_and_pawns(self):
+        # zugzwang is common in pawn endings, passing could be better than every real move
+        # depth 7 is deep enough for null moves to be tried in this position if pieces were on the board
+        self.assertEqual([], self.count_null_moves('8/5k2/3p4/1p1Pp3/pP2Pp2/P4P2/8/6K1 w - - 0 1', 7))
+
+    def test_no_repetitions_across_a_null_move(self):
+        # knights out and back: the game history holds positions the search can reach again
+        board = self.board_class()
+        for move in ['g1f3', 'g8f6', 'f3g1', 'f6g8', 'e2e4', 'e7e5']:
+            self.assertTrue(board.attempt_to_make_move(move))
+        checks_after_null_moves = []
+        is_draw = self.engine.is_draw
+
+        def check_is_draw(board, position_hash):
+            draw = is_draw(board, position_hash)
+            null_moves = [index for index, record in enumerate(board.move_stack) if record.move is None]
+            if null_moves:
+                plies_since_null_move = len(board.move_stack) - 1 - null_moves[-1]
+                in_history = position_hash in board.past_game_states and position_hash not in self.engine.search_path
+                checks_after_null_moves.append(len(self.engine.search_path) <= plies_since_null_move
+                                               and not (draw and in_history))
+            return draw
+
+        self.engine.is_draw = check_is_draw
+        self.engine.search(board, 5)
+        self.assertGreater(len(checks_after_null_moves), 0)
+        self.assertTrue(all(checks_after_null_moves))
+
+    def test_pruning_still_finds_mates(self):
+        for switch in Engine.Engine.SELECTIVE_SEARCH_SWITCHES:
+            only_this_switch = dict.fromkeys(Engine.Engine.SELECTIVE_SEARCH_SWITCHES, False)
+            only_this_switch[switch] = True
+            board, result = self.search_with_switches('2r3k1/5ppp/8/8/8/8/3R1PPP/3R2K1 w - - 0 1', 4,
+                                                      **only_this_switch)
+            self.assertEqual('d2d8', board.get_move_notation(result.best_move))
+            self.assertEqual(Engine.Engine.MATE_SCORE - 3, result.score)
+
+    def test_principal_variation_search_keeps_the_score_with_fewer_nodes(self):
+        exact_switches = dict.fromkeys(Engine.Engine.SEARCH_SWITCHES, False)
+        _, plain_result = self.search_with_switches(self.fen, 4, **exact_switches)
+        exact_switches['use_principal_variation_search'] = True
+        _, result = self.search_with_switches(self.fen, 4, **exact_switches)
+        self.assertEqual(plain_result.score, result.score)
+        self.assertLess(result.nodes, plain_result.nodes)
+        self.assertGreater(self.engine.principal_variation_researches, 0)
+        self.assertEqual(0, self.engine.aspiration_researches)
+
+    def test_aspiration_window_researches_keep_the_score(self):
+        exact_switches = dict.fromkeys(Engine.Engine.SEARCH_SWITCHES, False)
+        _, plain_result = self.search_with_switches(self.fen, 4, **exact_switches)
+        exact_switches['use_aspiration_windows'] = True
+        self.engine = Engine.Engine()
+        self.engine.set_switches(exact_switches)
+        self.engine.ASPIRATION_WINDOW = 1  # every iteration falls outside and has to widen
+        _, result = self.search(self.fen, 4)
+        self.assertEqual(plain_result.score, result.score)
+        self.assertEqual(plain_result.pv[0], result.pv[0])
+        self.assertGreater(self.engine.aspiration_researches, 0)
+
+
+class SearchStatisticsTests(EngineTests):
+    fen = 'r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10'
+
+    def test_statistics_of_a_search(self):
+        board, result = self.search(self.fen, 4)
+        statistics = result.statistics
+        self.assertEqual(result.nodes, statistics.nodes)
+        self.assertEqual(self.engine.quiescence_nodes, statistics.quiescence_nodes)
+        self.assertLess(statistics.quiescence_nodes, statistics.nodes)
+        self.assertEqual(4, statistics.depth)
+        self.assertGreater(statistics.selective_depth, 4)  # quiescence goes beyond the nominal depth
+        self.assertEqual(4, len(statistics.iteration_seconds))
+        self.assertEqual(statistics.nodes, sum(statistics.iteration_nodes))
+        self.assertAlmostEqual(statistics.seconds, sum(statistics.iteration_seconds), delta=0.05)
+        self.assertGreater(statistics.get_effective_branching_factor(), 0)
+        self.assertGreater(statistics.get_nodes_per_second(), 0)
+        self.assertGreater(statistics.transposition_table_stores, 0)
+        self.assertLessEqual(statistics.transposition_table_hits, statistics.transposition_table_probes)
+        self.assertGreater(statistics.beta_cutoffs, 0)
+        self.assertEqual(self.engine.first_move_beta_cutoffs / self.engine.beta_cutoffs,
+                         statistics.get_first_move_cutoff_rate())
+        values = statistics.as_dict()
+        for name in ['nodes', 'quiescence_nodes', 'nodes_per_second', 'depth', 'selective_depth',
+                     'effective_branching_factor', 'transposition_table_hits', 'transposition_table_stores',
+                     'transposition_table_collisions', 'beta_cutoffs', 'first_move_cutoff_rate', 'iteration_seconds']:
+            self.assertIn(name, values)
+
+    def test_report_after_every_iteration(self):
+        board = self.board_class.from_fen(self.fen)
+        reported_results = []
+        result = self.engine.search(board, 4, report=reported_results.append)
+        self.assertEqual([1, 2, 3, 4], [reported.depth for reported in reported_results])
+        self.assertEqual(result.pv, reported_results[-1].pv)
+        for depth, reported in enumerate(reported_results, 1):
+            self.assertEqual(depth, len(reported.statistics.iteration_nodes))
+            self.assertEqual(reported.nodes, reported.statistics.nodes)
+
+    def test_stopped_search_counts_the_unfinished_iteration(self):
+        board = self.board_class.from_fen(self.fen)
+        result = self.engine.search(board, 5, nodes=3000)
+        self.assertEqual(self.engine.nodes, result.statistics.nodes)
+        self.assertGreaterEqual(result.statistics.nodes, result.nodes)
+        self.assertEqual(result.depth, len(result.statistics.iteration_nodes))
+
+    def test_parallel_search_adds_up_every_process(self):
+        board = self.board_class.from_fen(self.fen)
+        result = self.engine.search_parallel(board, 2, depth=2)
+        self.assertEqual(result.nodes, result.statistics.nodes)
+        self.assertGreater(result.statistics.transposition_table_stores, 0)
+
+
+class MultiPvSearchTests(EngineTests):
+    fen = 'r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10'
+
+    def search_lines(self, fen, depth, multipv, **limits):
+        board = self.board_class.from_fen(fen)
+        result = self.engine.search(board, depth, multipv=multipv, **limits)
+        self.assertEqual(fen, board.to_fen(), "search must leave the position unchanged")
+        return board, result
+
+    def test_lines_are_distinct_and_ranked(self):
+        board, result = self.search_lines(self.fen, 3, 3)
+        self.assertEqual(3, len(result.lines))
+        first_moves = [line.best_move for line in result.lines]
+        self.assertEqual(3, len(set(first_moves)))
+        for move in first_moves:
+            self.assertIn(move, board.generate_legal_moves())
+        scores = [line.score for line in result.lines]
+        self.assertEqual(sorted(scores, reverse=True), scores)
+        self.assertEqual((result.best_move, result.score, result.pv),
+                         (result.lines[0].best_move, result.lines[0].score, result.lines[0].pv))
+        for line in result.lines:
+            self.assertEqual(3, line.depth)
+            self.assertEqual(line.best_move, line.pv[0])
+            self.assertGreater(line.nodes, 0)
+        # the lines share the iteration's nodes
+        self.assertEqual(result.statistics.iteration_nodes[-1], sum(line.nodes for line in result.lines))
+
+    def test_every_pass_starts_from_a_line_it_may_play(self):
+        # the lines of kiwipete change places between iterations
+        board = self.board_class.from_fen('r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1')
+        hints = []
+        search_root = self.engine.search_root
+
+        def record_hint(board, depth, previous_result):
+            if previous_result is not None:
+                hints.append(previous_result.best_move in self.engine.get_root_moves(board))
+            return search_root(board, depth, previous_result)
+
+        self.engine.search_root = record_hint
+        self.engine.search(board, 3, multipv=3)
+        self.assertEqual(6, len(hints))  # every pass of iterations 2 and 3
+        self.assertTrue(all(hints))
+
+    def test_every_iteration_reports_its_lines(self):
+        board = self.board_class.from_fen(self.fen)
+        reported_results = []
+        self.engine.search(board, 3, multipv=2, report=reported_results.append)
+        self.assertEqual([2, 2, 2], [len(reported.lines) for reported in reported_results])
+        self.assertEqual([1, 2, 3], [reported.lines[1].depth for reported in reported_results])
+
+    def test_single_line_by_default(self):
+        _, result = self.search_lines(self.fen, 2, 1)
+        self.assertEqual(1, len(result.lines))
+        self.assertEqual(result.pv, result.lines[0].pv)
+
+    def test_fewer_moves_than_lines(self):
+        _, result = self.search_lines('7k/8/8/8/8/8/8/K7 w - - 0 1', 2, 5)
+        self.assertEqual(3, len(result.lines))  # Ka2, Kb1 and Kb2
+
+    def test_lines_only_among_root_moves(self):
+        board = self.board_class.from_fen(self.fen)
+        root_moves = [board.parse_move(move) for move in ['a3a4', 'h2h3', 'g1h1']]
+        _, result = self.search_lines(self.fen, 2, 5, root_moves=root_moves)
+        self.assertEqual(sorted(root_moves), sorted(line.best_move for line in result.lines))
+
+    def test_mate_in_first_line_does_not_end_the_other_lines(self):
+        board, result = self.search_lines('6k1/5ppp/8/8/8/8/8/R5K1 w - - 0 1', 3, 2)
+        self.assertEqual('a1a8', board.get_move_notation(result.best_move))
+        self.assertEqual(Engine.Engine.MATE_SCORE - 1, result.score)
+        self.assertEqual(3, result.depth)
+        self.assertFalse(Engine.Engine.is_mate_score(result.lines[1].score))
+
+    def test_stopped_search_keeps_the_lines_of_the_last_iteration(self):
+        _, result = self.search_lines(self.fen, 6, 3, nodes=4000)
+        self.assertEqual(3, len(result.lines))
+        self.assertTrue(all(line.depth == result.depth for line in result.lines))
+
+
+class SearchLimitTests(EngineTests):
+    fen = 'r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10'
+
+    def search_with_limits(self, **limits):
+        board = self.board_class.from_fen(self.fen)
+        start = time.perf_counter()
+        result = self.engine.search(board, **limits)
+        seconds = time.perf_counter() - start
+        self.assertEqual(self.fen, board.to_fen(), "a stopped search must leave the position unchanged")
+        self.assertIn(result.best_move, board.generate_legal_moves())
+        return result, seconds
+
+    def test_time_limit(self):
+        result, seconds = self.search_with_limits(seconds=0.3)
+        self.assertLess(seconds, 0.6)
+        self.assertGreater(result.depth, 0)
+
+    def test_node_limit(self):
+        result, _ = self.search_with_limits(nodes=3000)
+        self.assertLessEqual(self.engine.nodes, 3000)
+        self.assertLessEqual(result.nodes, 3000)
+
+    def test_stopped_search_returns_last_completed_iteration(self):
+        complete_result, _ = self.search_with_limits(depth=2)
+        self.engine = Engine.Engine()
+        stopped_result, _ = self.search_with_limits(depth=5, nodes=complete_result.nodes + 50)
+        self.assertEqual(2, stopped_result.depth)
+        self.assertEqual(complete_result.pv, stopped_result.pv)
+        self.assertEqual(complete_result.score, stopped_result.score)
+
+    def test_limit_before_first_iteration_completes_still_gives_a_move(self):
+        result, _ = self.search_with_limits(nodes=5)
+        self.assertEqual(0, result.depth)
+        self.assertIsNotNone(result.best_move)
+
+    def test_stop_from_another_thread(self):
+        timer = threading.Timer(0.2, self.engine.stop)
+        timer.start()
+        result, seconds = self.search_with_limits()
+        timer.join()
+        self.assertLess(seconds, 1.0)
+        self.assertGreater(result.depth, 0)
+
+    def test_time_allocation(self):
+        hard_seconds, soft_seconds = Engine.Engine.allocate_time(60, 1)
+        self.assertLess(soft_seconds, hard_seconds)
+        self.assertAlmostEqual(60 / 30 + 0.75, soft_seconds, delta=0.01)
+        self.assertLessEqual(hard_seconds, 30)
+        # last move before the time control may use the whole clock, but never more
+        self.assertAlmostEqual(1 - Engine.Engine.TIME_SAFETY_MARGIN, Engine.Engine.allocate_time(1, 0, 1)[0])
+        self.assertEqual((0.0, 0.0), Engine.Engine.allocate_time(0.01))
+        self.assertLessEqual(Engine.Engine.allocate_time(0.5, 10)[0], 0.5)
+
+
+class ParallelSearchTests(EngineTests):
+    def test_lazy_smp_completes_depth(self):
+        fen = 'r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10'
+        board = self.board_class.from_fen(fen)
+        serial_result = Engine.Engine().search(board, 2)
+        result = self.engine.search_parallel(board, 2, depth=2)
+        self.assertEqual(fen, board.to_fen())
+        self.assertEqual(2, result.depth)
+        self.assertEqual(serial_result.score, result.score)
+        self.assertIn(result.best_move, board.generate_legal_moves())
+        self.assertEqual(result.best_move, result.pv[0])
+        self.assertGreaterEqual(result.nodes, serial_result.nodes)
+
+    def test_root_moves_without_a_legal_move_are_ignored(self):
+        board = self.board_class.from_fen('6k1/5ppp/8/8/8/8/5PPP/R5K1 w - - 0 1')
+        result = self.engine.search(board, 2, root_moves=[(0, 16), (0, 17)])  # a1a3 is legal, a1b3 isn't
+        self.assertEqual([(0, 16)], result.pv[:1])
+        result = self.engine.search(board, 2, root_moves=[(0, 17)])
+        self.assertEqual('a1a8', board.get_move_notation(result.best_move))
+        self.assertEqual(Engine.Engine.MATE_SCORE - 1, result.score)
+
+    def test_lazy_smp_stores_with_one_age(self):
+        # the ages of the shared table's entries, read just before search_parallel frees it
+        ages = set()
+        unlink = TranspositionTable.SharedTranspositionTable.unlink
+
+        def read_ages_and_unlink(table):
+            ages.update(TranspositionTable.unpack_data(data)[4] for data in table.data if data != 0)
+            unlink(table)
+
+        board = self.board_class.from_fen('r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10')
+        with unittest.mock.patch.object(TranspositionTable.SharedTranspositionTable, 'unlink', read_ages_and_unlink):
+            self.engine.search_parallel(board, 3, depth=3)
+        self.assertEqual({1}, ages)
+
+    def test_lazy_smp_finds_mate(self):
+        board = self.board_class.from_fen('6k1/5ppp/8/8/8/8/8/R5K1 w - - 0 1')
+        result = self.engine.search_parallel(board, 2, depth=3)
+        self.assertEqual('a1a8', board.get_move_notation(result.best_move))
+        self.assertEqual(Engine.Engine.MATE_SCORE - 1, result.score)
+
+    def test_lazy_smp_time_limit(self):
+        board = self.board_class.from_fen(self.board_class.STARTING_POSITION_FEN)
+        start = time.perf_counter()
+        result = self.engine.search_parallel(board, 2, seconds=0.3)
+        self.assertLess(time.perf_counter() - start, 2.0)
+        self.assertIn(result.best_move, board.generate_legal_moves())
+
+    def test_search_restricted_to_root_moves(self):
+        board = self.board_class.from_fen('6k1/5ppp/8/8/8/8/5PPP/R5K1 w - - 0 1')
+        result = self.engine.search(board, 2, root_moves=[(0, 8)])  # a1a2 instead of mating on a8
+        self.assertEqual([(0, 8)], result.pv[:1])
+        self.assertLess(result.score, Engine.Engine.MATE_SCORE - 10)
+        # the restricted root score isn't kept for the position
+        self.assertEqual(Engine.Engine.MATE_SCORE - 1, self.engine.search(board, 2).score)
+
+    def test_root_moves_are_ranked(self):
+        fen = '6k1/5ppp/8/8/8/8/5PPP/R5K1 w - - 0 1'
+        board = self.board_class.from_fen(fen)
+        rankings = []
+        results = self.engine.analyse_root_moves(board, 2, 2, rankings.append)
+        self.assertEqual(fen, board.to_fen())
+        legal_moves = board.generate_legal_moves()
+        self.assertCountEqual(legal_moves, [result.best_move for result in results])
+        self.assertEqual([len(ranking) for ranking in rankings], list(range(1, len(legal_moves) + 1)))
+        scores = [result.score for result in results]
+        self.assertEqual(sorted(scores, reverse=True), scores)
+        self.assertEqual('a1a8', board.get_move_notation(results[0].best_move))
+        self.assertEqual(Engine.Engine().search(board, 2).score, results[0].score)
+        for result in results:
+            self.assertEqual(result.best_move, result.pv[0])
+            self.assertEqual(1 if Engine.Engine.is_mate_score(result.score) else 2, result.depth)
+            self.assertGreater(result.nodes, 0)
+
+
+class TranspositionTableTests(unittest.TestCase):
+    def setUp(self):
+        self.table = TranspositionTable.TranspositionTable(1)
+
+    def tearDown(self):
+        self.table = None
+
+    def get_keys_of_one_bucket(self, number_of_keys):
+        return [self.table.number_of_buckets * i + 5 for i in range(1, number_of_keys + 1)]
+
+    def test_size_follows_memory_budget(self):
+        self.assertEqual(1024 * 1024, self.table.get_memory_in_bytes())
+        self.assertEqual(65536, self.table.size)
+        self.assertEqual(2, TranspositionTable.TranspositionTable(0).size)
+
+    def test_moves_pack_into_sixteen_bits(self):
+        for move in [(0, 63), (12, 28), (52, 60, 'q'), (55, 62, 'n'), (8, 1, 'r'), (9, 0, 'b')]:
+            packed_move = TranspositionTable.pack_move(move)
+            self.assertLess(packed_move, 1 << 16)
+            self.assertEqual(move, TranspositionTable.unpack_move(packed_move))
+        self.assertIsNone(TranspositionTable.unpack_move(TranspositionTable.pack_move(None)))
+
+    def test_store_and_probe(self):
+        self.assertIsNone(self.table.probe(12345))
+        self.table.store(12345, 7, -99990, TranspositionTable.UPPER_BOUND, (12, 28))
+        self.assertEqual(((12, 28), -99990, 7, TranspositionTable.UPPER_BOUND), self.table.probe(12345))
+        self.table.store(12345, 3, 25, TranspositionTable.EXACT, None)  # keeps the move it had
+        self.assertEqual(((12, 28), 25, 3, TranspositionTable.EXACT), self.table.probe(12345))
+        self.assertEqual((3, 2), (self.table.probes, self.table.hits))
+
+    def test_depth_preferred_entry_keeps_deepest_result(self):
+        deep, shallow, other = self.get_keys_of_one_bucket(3)
+        self.table.store(deep, 8, 0, TranspositionTable.EXACT, None)
+        self.table.store(shallow, 2, 0, TranspositionTable.EXACT, None)
+        self.table.store(other, 1, 0, TranspositionTable.EXACT, None)  # replaces shallow, not deep
+        self.assertIsNotNone(self.table.probe(deep))
+        self.assertIsNone(self.table.probe(shallow))
+        self.assertIsNotNone(self.table.probe(other))
+        self.assertEqual(1, self.table.collisions)
+
+    def test_deeper_result_moves_old_one_to_always_replace_entry(self):
+        first, second = self.get_keys_of_one_bucket(2)
+        self.table.store(first, 2, 0, TranspositionTable.EXACT, None)
+        self.table.store(second, 5, 0, TranspositionTable.EXACT, None)
+        self.assertIsNotNone(self.table.probe(first))
+        self.assertIsNotNone(self.table.probe(second))
+        self.assertEqual(0, self.table.collisions)
+
+    def test_results_of_older_searches_are_replaced_first(self):
+        old, new, newer = self.get_keys_of_one_bucket(3)
+        self.table.store(old, 9, 0, TranspositionTable.EXACT, None)
+        self.table.new_search()
+        self.table.store(new, 1, 0, TranspositionTable.EXACT, None)
+        self.table.store(newer, 1, 0, TranspositionTable.EXACT, None)
+        self.assertIsNone(self.table.probe(old))
+        self.assertIsNotNone(self.table.probe(new))
+        self.assertIsNotNone(self.table.probe(newer))
+
+
+class SharedTranspositionTableTests(TranspositionTableTests):
+    def setUp(self):
+        self.table = TranspositionTable.SharedTranspositionTable(1)
+
+    def tearDown(self):
+        self.table.unlink()
+        self.table = None
+
+    def attach(self):
+        attached_table = TranspositionTable.SharedTranspositionTable(name=self.table.get_name())
+        self.addCleanup(attached_table.close)
+        return attached_table
+
+    def test_attached_table_shares_entries(self):
+        attached_table = self.attach()
+        self.assertEqual(self.table.size, attached_table.size)  # read from the header of the block
+        self.table.store(12345, 4, 10, TranspositionTable.EXACT, (12, 28))
+        self.assertEqual(((12, 28), 10, 4, TranspositionTable.EXACT), attached_table.probe(12345))
+        attached_table.store(54321, 2, -3, TranspositionTable.LOWER_BOUND, None)
+        self.assertEqual((None, -3, 2, TranspositionTable.LOWER_BOUND), self.table.probe(54321))
+        attached_table.clear()
+        self.assertIsNone(self.table.probe(12345))
+
+    def test_only_the_owner_advances_the_age(self):
+        attached_table = self.attach()
+        attached_table.new_search()
+        self.assertEqual(0, self.table.age)
+        self.table.new_search()
+        self.assertEqual(1, attached_table.age)
+        # entries stored by any process carry the age the owner set
+        attached_table.store(12345, 4, 10, TranspositionTable.EXACT, (12, 28))
+        slot = 12345 % self.table.number_of_buckets * TranspositionTable.ENTRIES_PER_BUCKET
+        self.assertEqual(1, TranspositionTable.unpack_data(self.table.data[slot])[4])
+
+    def test_table_created_by_name(self):
+        name = 'tt_test_{}'.format(os.getpid())
+        named_table = TranspositionTable.SharedTranspositionTable(0.5, name, create=True)
+        self.addCleanup(named_table.unlink)
+        attached_table = TranspositionTable.SharedTranspositionTable(name=name)
+        self.addCleanup(attached_table.close)
+        self.assertEqual(named_table.size, attached_table.size)
+
+    def test_attach_to_other_block_fails(self):
+        memory = shared_memory.SharedMemory(create=True, size=4096)
+        self.addCleanup(memory.unlink)
+        self.addCleanup(memory.close)
+        with self.assertRaises(ValueError):
+            TranspositionTable.SharedTranspositionTable(name=memory.name)
+
+    def test_separate_process_reads_and_writes(self):
+        self.table.store(12345, 4, 10, TranspositionTable.EXACT, (12, 28))
+        script = ('import sys, TranspositionTable\n'
+                  'table = TranspositionTable.SharedTranspositionTable(name=sys.argv[1])\n'
+                  'print(table.probe(12345))\n'
+                  'table.store(54321, 6, 7, TranspositionTable.LOWER_BOUND, (8, 24))\n'
+                  'table.close()\n')
+        output = subprocess.run([sys.executable, '-c', script, self.table.get_name()], capture_output=True, text=True,
+                                check=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout
+        self.assertEqual("((12, 28), 10, 4, 0)", output.strip())
+        # the block outlives the other process
+        self.assertEqual(((8, 24), 7, 6, TranspositionTable.LOWER_BOUND), self.attach().probe(54321))
+
+    def test_torn_entry_does_not_match(self):
+        deep, shallow = self.get_keys_of_one_bucket(2)
+        self.table.store(shallow, 4, 10, TranspositionTable.EXACT, (12, 28))
+        self.table.store(deep, 9, 0, TranspositionTable.EXACT, (8, 16))  # moves shallow to the second entry
+        self.assertEqual((2, 0), self.table.check_integrity())
+        slot = deep % self.table.number_of_buckets * TranspositionTable.ENTRIES_PER_BUCKET
+        # the data word of one position written next to the key word of another, as two racing writes could leave it
+        self.table.data[slot] = self.table.data[slot + 1]
+        self.assertIsNone(self.table.probe(deep))
+        self.assertEqual(((12, 28), 10, 4, TranspositionTable.EXACT), self.table.probe(shallow))
+        self.assertEqual(2, self.table.corrupt_entries)  # counted by both probes, it's the first entry of the bucket
+        self.assertEqual((2, 1), self.table.check_integrity())
+
+
+class MoveOrderingTests(unittest.TestCase):
+    def setUp(self):
+        self.board = Board.ChessBoard.from_fen('k7/8/3p1r2/2P1Q3/6N1/8/8/4K2R w K - 0 1')
+        self.move_orderer = MoveOrdering.MoveOrderer()
+
+    def tearDown(self):
+        self.board = None
+        self.move_orderer = None
+
+    def get_ordered_notation(self, hash_move=None, ply=0):
+        moves = self.move_orderer.order_moves(self.board, self.board.generate_legal_moves(), hash_move, ply)
+        return [self.board.get_move_notation(move) for move in moves]
+
+    def test_captures_ordered_most_valuable_victim_least_valuable_attacker(self):
+        # rook on f6 taken by knight, then by queen, then the pawn on d6 taken by pawn, then by queen
+        self.assertEqual(['g4f6', 'e5f6', 'c5d6', 'e5d6'], self.get_ordered_notation()[:4])
+
+    def test_hash_move_comes_first(self):
+        hash_move = self.board.parse_move('h1h4')
+        self.assertEqual('h1h4', self.get_ordered_notation(hash_move)[0])
+
+    def test_killer_and_history_moves_come_after_captures(self):
+        killer_move = self.board.parse_move('h1h5')
+        self.move_orderer.record_cutoff(self.board, killer_move, 3, 2)
+        self.move_orderer.record_cutoff(self.board, self.board.parse_move('e5f6'), 3, 2)  # captures aren't killers
+        self.assertEqual([killer_move, None], self.move_orderer.killer_moves[2])
+        self.assertEqual('h1h5', self.get_ordered_notation(ply=2)[4])
+        # at another ply only the history score is left, which still puts it before the other quiet moves
+        self.assertEqual('h1h5', self.get_ordered_notation(ply=3)[4])
+        self.move_orderer.new_search()
+        self.assertEqual([None, None], self.move_orderer.killer_moves[2])
+        self.assertEqual(4, self.move_orderer.history[0][killer_move[0] * 64 + killer_move[1]])
+
+
+class UciTests(unittest.TestCase):
+    board_class = Board.ChessBoard
+
+    def setUp(self):
+        self.output = io.StringIO()
+        self.driver = Uci.UciDriver(self.output, self.board_class)
+
+    def tearDown(self):
+        self.driver.handle_command('quit')
+
+    def send(self, *commands):
+        for command in commands:
+            self.assertTrue(self.driver.handle_command(command))
+
+    def get_lines(self):
+        return self.output.getvalue().splitlines()
+
+    def get_best_move_lines(self):
+        return [line for line in self.get_lines() if line.startswith('bestmove')]
+
+    def get_best_move_line(self):
+        self.driver.wait_for_search()
+        lines = self.get_best_move_lines()
+        self.assertEqual(1, len(lines))
+        return lines[0]
+
+    def test_handshake(self):
+        self.send('uci', 'isready', 'register later')  # unknown commands are ignored
+        lines = self.get_lines()
+        self.assertTrue(lines[0].startswith('id name '))
+        self.assertEqual(['uciok', 'readyok'], lines[-2:])
+
+    def test_position_with_moves(self):
+        self.send('position startpos moves e2e4 e7e5 g1f3')
+        self.assertEqual('rnbqkbnr/pppp1ppp/8/4p3/4P3/5N2/PPPP1PPP/RNBQKB1R b KQkq - 1 2', self.driver.board.to_fen())
+        self.send('position fen 8/7k/8/8/8/8/p7/7K b - - 0 1 moves a2a1q')
+        self.assertEqual('8/7k/8/8/8/8/8/q6K w - - 0 2', self.driver.board.to_fen())
+
+    def test_illegal_move_stops_the_move_list(self):
+        self.send('position startpos moves e2e4 e2e4 d7d5')
+        self.assertEqual('info string illegal move: e2e4', self.get_lines()[-1])
+        self.assertFalse(self.driver.board.is_whites_turn())
+
+    def test_go_depth_reports_every_iteration(self):
+        self.send('position startpos moves e2e4', 'go depth 2')
+        best_move_line = self.get_best_move_line()
+        info_lines = [line for line in self.get_lines() if line.startswith('info depth')]
+        self.assertEqual(['1', '2'], [line.split()[2] for line in info_lines])
+        self.assertIn(' pv ', info_lines[-1])
+        best_move = best_move_line.split()[1]
+        self.assertEqual(info_lines[-1].split(' pv ')[1].split()[0], best_move)
+        self.assertIn(self.driver.board.parse_move(best_move), self.driver.board.generate_legal_moves())
+
+    def test_mate_score(self):
+        self.send('position fen 6k1/5ppp/8/8/8/8/8/R5K1 w - - 0 1', 'go depth 3')
+        self.assertEqual('bestmove a1a8', self.get_best_move_line())
+        self.assertIn('score mate 1', self.get_lines()[-2])
+
+    def test_infinite_search_answers_stop_at_once(self):
+        self.send('position startpos', 'go infinite')
+        time.sleep(0.3)
+        self.send('isready')
+        self.assertEqual('readyok', self.get_lines()[-1])
+        start = time.perf_counter()
+        self.send('stop')
+        self.assertLess(time.perf_counter() - start, 0.5)
+        self.assertTrue(self.get_lines()[-1].startswith('bestmove '))
+
+    def test_infinite_search_waits_for_stop_after_a_mate(self):
+        self.send('position fen 6k1/5ppp/8/8/8/8/8/R5K1 w - - 0 1', 'go infinite')
+        time.sleep(0.3)
+        self.assertFalse(any(line.startswith('bestmove') for line in self.get_lines()))
+        self.send('stop')
+        self.assertEqual('bestmove a1a8', self.get_lines()[-1])
+
+    def test_clock_limits(self):
+        self.send('position startpos', 'go wtime 2000 btime 100000 winc 0 binc 0')
+        start = time.perf_counter()
+        self.get_best_move_line()
+        self.assertLess(time.perf_counter() - start, 1.0)
+
+    def test_movetime_nodes_and_searchmoves(self):
+        self.send('position startpos', 'go movetime 300')
+        start = time.perf_counter()
+        self.get_best_move_line()
+        self.assertLess(time.perf_counter() - start, 0.6)
+        limits, infinite, ponder = self.driver.get_search_limits(
+            'nodes 5000 searchmoves a2a3 h2h4 depth 6'.split(), self.driver.board)
+        self.assertEqual({'multipv': 1, 'nodes': 5000, 'depth': 6, 'root_moves': [(8, 16), (15, 31)]}, limits)
+        self.assertFalse(infinite)
+        self.assertFalse(ponder)
+
+    def test_ponder_hit_continues_the_search_within_the_move_limits(self):
+        self.send('position startpos moves e2e4 e7e5', 'go ponder wtime 2000 btime 2000')
+        time.sleep(0.5)
+        self.assertEqual([], self.get_best_move_lines(), "no bestmove while pondering")
+        pondered_depth = max(int(line.split()[2]) for line in self.get_lines() if line.startswith('info depth'))
+        start = time.perf_counter()
+        self.send('ponderhit')
+        best_move_line = self.get_best_move_line()
+        self.assertLess(time.perf_counter() - start, 1.0)
+        # the iterations of the ponder search are kept: the search doesn't start again at depth 1
+        info_lines = [line for line in self.get_lines() if line.startswith('info depth')]
+        self.assertEqual(1, sum(1 for line in info_lines if line.split()[2] == '1'))
+        self.assertGreaterEqual(int(info_lines[-1].split()[2]), pondered_depth)
+        best_move = self.driver.board.parse_move(best_move_line.split()[1])
+        self.assertIn(best_move, self.driver.board.generate_legal_moves())
+
+    def test_ponder_search_that_ended_waits_for_ponder_hit(self):
+        self.send('position fen 6k1/5ppp/8/8/8/8/8/R5K1 w - - 0 1', 'go ponder depth 2')
+        time.sleep(0.3)
+        self.assertEqual([], self.get_best_move_lines())
+        self.send('ponderhit')
+        self.assertEqual('bestmove a1a8', self.get_best_move_line())
+
+    def test_ponder_miss_stops_at_once_and_keeps_the_table(self):
+        self.send('position startpos moves e2e4 e7e5', 'go ponder wtime 60000 btime 60000')
+        time.sleep(0.3)
+        start = time.perf_counter()
+        self.send('stop')
+        self.assertLess(time.perf_counter() - start, 0.5)
+        self.assertEqual(1, len(self.get_best_move_lines()))
+        self.assertFalse(self.driver.pondering)
+        self.assertTrue(any(self.driver.engine.transposition_table.data))
+        self.send('ponderhit')  # late, for the search that was stopped: ignored
+        self.send('position startpos moves e2e4 e7e6', 'go depth 1')
+        self.driver.wait_for_search()
+        self.assertEqual(2, len(self.get_best_move_lines()))
+
+    def test_multipv_option(self):
+        self.send('setoption name MultiPV value 3', 'position startpos', 'go depth 2')
+        self.get_best_move_line()
+        last_iteration = [line.split() for line in self.get_lines() if line.startswith('info depth 2 ')]
+        self.assertEqual(['1', '2', '3'], [line[line.index('multipv') + 1] for line in last_iteration])
+        self.assertEqual(3, len(set(line[line.index('pv') + 1] for line in last_iteration)))
+
+    def test_illegal_searchmoves_are_left_out(self):
+        self.send('position startpos')
+        limits, _, _ = self.driver.get_search_limits('searchmoves e2e5 e2e4 depth 2'.split(), self.driver.board)
+        self.assertEqual([(12, 28)], limits['root_moves'])
+        self.send('go searchmoves e2e5 depth 2')  # no legal move among them: every move is searched
+        best_move = self.get_best_move_line().split()[1]
+        self.assertIn(self.driver.board.parse_move(best_move), self.driver.board.generate_legal_moves())
+
+    def test_score_notation(self):
+        self.assertEqual('cp -35', Uci.get_score_notation(-35))
+        self.assertEqual('mate 2', Uci.get_score_notation(Engine.Engine.MATE_SCORE - 3))
+        self.assertEqual('mate -1', Uci.get_score_notation(-(Engine.Engine.MATE_SCORE - 2)))
+
+    def test_no_legal_moves(self):
+        self.send('position fen 7k/6Q1/6K1/8/8/8/8/8 b - - 0 1', 'go depth 2')
+        self.assertEqual('bestmove 0000', self.get_best_move_line())
+
+    def test_importing_game_does_not_start_a_game(self):
+        with unittest.mock.patch('builtins.input', side_effect=AssertionError('a game was started')):
+            importlib.import_module('Game')
+
+
+class BitboardSearchTests(SearchTests):
+    board_class = Bitboard.BitboardChessBoard
+
+
+if __name__ == '__main__':
+    unittest.main()
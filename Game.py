@@ -7,7 +7,8 @@ class Game:
     def __init__(self):
         self.board = ChessBoard()
         self.engine = Engine()
-        pass
+        self.ai_search_depth = None  # no depth limit, the time limit ends the search
+        self.ai_seconds_per_move = 2.0
 
     def play_game(self, with_ai=False, verbose=False):
         while not self.is_game_over():
@@ -38,16 +39,17 @@ class Game:
             print("\n Invalid Move! \n")
 
     def play_ai_move(self):
-        origin, destination = self.engine.get_one_ply_materialistic_move(self.board)
-        self.board.execute_move(origin, destination)
-        print("Computer plays: {}{}".format(origin, destination))
+        best_move = self.engine.get_best_move(self.board, self.ai_search_depth, self.ai_seconds_per_move)
+        move = self.board.get_move_notation(best_move)
+        self.board.attempt_to_make_move(move)
+        print("Computer plays: {}".format(move))
 
 
-g = Game()
+if __name__ == '__main__':
+    g = Game()
 
+    play_with_ai = False
+    verbose_display = True
 
-play_with_ai = False
-verbose_display = True
-
-g.play_game(play_with_ai, verbose_display)
-# cProfile.run('g.auto_play()')
+    g.play_game(play_with_ai, verbose_display)
+    # cProfile.run('g.auto_play()')
@@ -0,0 +1,92 @@
+# move ordering for the alpha-beta search: the sooner the best move is tried, the more of the others get cut off
+#
+# Moves are tried in this order:
+#     1. the hash move (best move stored in the transposition table, or the previous principal variation)
+#     2. captures and promotions, most valuable victim first and of those the least valuable attacker first
+#     3. the two killer moves of the ply: quiet moves that caused a beta cutoff in a sibling position
+#     4. the other quiet moves, by how often they caused cutoffs before (history heuristic)
+import Pieces
+
+HASH_MOVE_SCORE = 10000000
+CAPTURE_SCORE = 1000000
+KILLER_SCORES = (900000, 800000)
+MAX_HISTORY_SCORE = 500000  # every history score is halved once one gets this big, so they stay below the killers
+MAX_PLY = 128
+
+# ORDERING_VALUES[symbol]: rank of a piece for MVV-LVA, pawn lowest and king highest
+ORDERING_VALUES = {'p': 1, 'n': 2, 'b': 3, 'r': 4, 'q': 5, 'k': 6,
+                   'P': 1, 'N': 2, 'B': 3, 'R': 4, 'Q': 5, 'K': 6}
+PROMOTION_ORDERING_VALUES = {'q': 5, 'r': 4, 'b': 3, 'n': 2}
+
+
+class MoveOrderer:
+    def __init__(self):
+        self.killer_moves = [[None, None] for _ in range(MAX_PLY + 1)]
+        self.history = [[0] * 4096 for _ in range(2)]  # history[side to move][origin * 64 + destination]
+
+    def new_search(self):
+        # killers only make sense within one search tree, history carries over with less weight
+        self.killer_moves = [[None, None] for _ in range(MAX_PLY + 1)]
+        self.halve_history()
+
+    def halve_history(self):
+        for side_history in self.history:
+            for index in range(4096):
+                side_history[index] >>= 1
+
+    @staticmethod
+    def is_capture(board, move):
+        destination_index = move[1]
+        if board.board[destination_index] != board.EMPTY_SQUARE:
+            return True
+        return destination_index == board.en_passant_index and type(board.board[move[0]]) == Pieces.Pawn
+
+    @staticmethod
+    def is_quiet(board, move):
+        return len(move) == 2 and not MoveOrderer.is_capture(board, move)
+
+    @staticmethod
+    def get_capture_score(board, move):
+        # MVV-LVA, promotions count as capturing the piece promoted to
+        victim = board.board[move[1]]
+        victim_value = ORDERING_VALUES[victim.symbol] if victim != board.EMPTY_SQUARE else 1  # en passant
+        if len(move) > 2:
+            victim_value += PROMOTION_ORDERING_VALUES[move[2]]
+        return CAPTURE_SCORE + victim_value * 10 - ORDERING_VALUES[board.board[move[0]].symbol]
+
+    def get_move_score(self, board, move, hash_move, ply):
+        if move == hash_move:
+            return HASH_MOVE_SCORE
+        if len(move) > 2 or self.is_capture(board, move):
+            return self.get_capture_score(board, move)
+        killers = self.killer_moves[ply]
+        if move == killers[0]:
+            return KILLER_SCORES[0]
+        if move == killers[1]:
+            return KILLER_SCORES[1]
+        return self.history[board.sideToMove][move[0] * 64 + move[1]]
+
+    def order_moves(self, board, moves, hash_move=None, ply=0):
+        # sorts moves in place, best first
+        moves.sort(key=lambda move: self.get_move_score(board, move, hash_move, ply), reverse=True)
+        return moves
+
+    def order_captures(self, board, moves):
+        # MVV-LVA only, for quiescence search where killers and history don't apply. Sorts moves in place
+        moves.sort(key=lambda move: self.get_capture_score(board, move)
+                   if len(move) > 2 or self.is_capture(board, move) else 0, reverse=True)
+        return moves
+
+    def record_cutoff(self, board, move, depth, ply):
+        # move caused a beta cutoff in board (the position before it is made)
+        if not self.is_quiet(board, move):
+            return
+        killers = self.killer_moves[ply]
+        if killers[0] != move:
+            killers[1] = killers[0]
+            killers[0] = move
+        side_history = self.history[board.sideToMove]
+        index = move[0] * 64 + move[1]
+        side_history[index] += depth * depth
+        if side_history[index] > MAX_HISTORY_SCORE:
+            self.halve_history()
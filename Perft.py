@@ -0,0 +1,262 @@
+# perft: counts the leaf nodes of the legal move tree to a fixed depth.
+# Comparing the counts with known values checks the move generator, timing them measures its speed.
+#
+# usage:
+#     python Perft.py                       run the reference positions
+#     python Perft.py --depth 4 --divide    node count per root move of the starting position
+#     python Perft.py --fen "<fen>" --depth 3 --backend bitboard
+#     python Perft.py --depth 6 --divide --workers 32 --split-depth 2
+#     python Perft.py --depth 6 --hash-mb 256
+import argparse
+import array
+import concurrent.futures
+import os
+import sys
+import time
+
+import Bitboard
+import Board
+from Engine import Engine
+
+BOARD_BACKENDS = {'mailbox': Board.ChessBoard, 'bitboard': Bitboard.BitboardChessBoard}
+
+# (name, fen, {depth: expected node count})
+REFERENCE_POSITIONS = [
+    ('start position', Board.ChessBoard.STARTING_POSITION_FEN,
+     {1: 20, 2: 400, 3: 8902, 4: 197281, 5: 4865609}),
+    ('kiwipete', 'r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1',
+     {1: 48, 2: 2039, 3: 97862, 4: 4085603}),
+    ('en passant and pins', '8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1',
+     {1: 14, 2: 191, 3: 2812, 4: 43238, 5: 674624}),
+    ('promotions', 'r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1',
+     {1: 6, 2: 264, 3: 9467, 4: 422333}),
+    ('promotion with check', 'rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8',
+     {1: 44, 2: 1486, 3: 62379, 4: 2103487}),
+    ('middle game', 'r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10',
+     {1: 46, 2: 2079, 3: 89890, 4: 3894594}),
+]
+
+
+def perft(board, depth):
+    if depth == 0:
+        return 1
+    moves = Engine.get_all_moves(board)
+    if depth == 1:
+        return len(moves)
+    nodes = 0
+    for move in moves:
+        board.push(move)
+        nodes += perft(board, depth - 1)
+        board.pop()
+    return nodes
+
+
+class PerftHashTable:
+    # Fixed size cache of (position hash, remaining depth) -> node count for hashed_perft.
+    # Preallocated from a memory budget and never grows, a new entry simply replaces whatever was in its slot.
+    # Every entry takes 8 bytes of key, 8 bytes of node count and 1 byte of depth, depth 0 marks an empty slot
+
+    BYTES_PER_ENTRY = 17
+
+    def __init__(self, megabytes=64):
+        self.megabytes = megabytes
+        self.size = max(1, int(megabytes * 1024 * 1024) // self.BYTES_PER_ENTRY)
+        self.keys = array.array('Q', bytes(8 * self.size))
+        self.nodes = array.array('Q', bytes(8 * self.size))
+        self.depths = array.array('B', bytes(self.size))
+        self.probes = 0
+        self.hits = 0
+        self.stores = 0
+
+    def probe(self, key, depth):
+        self.probes += 1
+        slot = key % self.size
+        if self.depths[slot] == depth and self.keys[slot] == key:
+            self.hits += 1
+            return self.nodes[slot]
+        return None
+
+    def store(self, key, depth, nodes):
+        self.stores += 1
+        slot = key % self.size
+        self.keys[slot] = key
+        self.nodes[slot] = nodes
+        self.depths[slot] = depth
+
+    def get_hit_rate(self):
+        return self.hits / self.probes if self.probes else 0.0
+
+
+def hashed_perft(board, depth, table):
+    # perft that looks every subtree of depth 2 or more up in table before counting it
+    if depth == 0:
+        return 1
+    if depth == 1:
+        return len(Engine.get_all_moves(board))
+    key = board.hash
+    nodes = table.probe(key, depth)
+    if nodes is not None:
+        return nodes
+    nodes = 0
+    for move in Engine.get_all_moves(board):
+        board.push(move)
+        nodes += hashed_perft(board, depth - 1, table)
+        board.pop()
+    table.store(key, depth, nodes)
+    return nodes
+
+
+def divide(board, depth, table=None):
+    # [(move in algebraic notation, nodes below it)] for every root move, hashed when a PerftHashTable is given
+    counts = []
+    for move in Engine.get_all_moves(board):
+        board.push(move)
+        if depth == 1:
+            nodes = 1
+        elif table is None:
+            nodes = perft(board, depth - 1)
+        else:
+            nodes = hashed_perft(board, depth - 1, table)
+        board.pop()
+        counts.append((board.get_move_notation(move), nodes))
+    return counts
+
+
+worker_hash_table = None  # every worker process keeps its own table across the tasks it is given
+
+
+def count_nodes_of_task(task):
+    # runs in a worker process, task = (backend name, fen, moves in algebraic notation from there, depth after them,
+    # megabytes of hash table or 0 for none). Positions travel as text, so workers never have to unpickle a board.
+    # Returns (nodes, hash table probes, hash table hits), the probes and hits of this task only
+    global worker_hash_table
+    backend, fen, moves, depth, hash_megabytes = task
+    board = BOARD_BACKENDS[backend].from_fen(fen)
+    for notation in moves:
+        board.push(board.parse_move(notation))
+    if hash_megabytes <= 0:
+        return perft(board, depth), 0, 0
+    if worker_hash_table is None or worker_hash_table.megabytes != hash_megabytes:
+        worker_hash_table = PerftHashTable(hash_megabytes)
+    probes, hits = worker_hash_table.probes, worker_hash_table.hits
+    nodes = hashed_perft(board, depth, worker_hash_table)
+    return nodes, worker_hash_table.probes - probes, worker_hash_table.hits - hits
+
+
+def get_parallel_tasks(board, backend, fen, depth, split_depth, hash_megabytes=0):
+    # one task per line of split_depth moves, so there are enough tasks to keep every worker busy
+    # Lines ending in checkmate or stalemate before split_depth have no nodes at depth and get no task
+    tasks = []
+
+    def add_tasks(moves):
+        if len(moves) == split_depth:
+            tasks.append((backend, fen, tuple(moves), depth - split_depth, hash_megabytes))
+            return
+        for move in Engine.get_all_moves(board):
+            board.push(move)
+            add_tasks(moves + [board.get_move_notation(move)])
+            board.pop()
+
+    add_tasks([])
+    return tasks
+
+
+def parallel_divide(fen, depth, workers=None, split_depth=1, backend='mailbox', hash_megabytes=0):
+    # divide with the subtrees below the first split_depth plies counted across a pool of worker processes
+    # workers defaults to the number of cores, split_depth 2 splits every root move further by its replies.
+    # With hash_megabytes every worker counts with a PerftHashTable of that size.
+    # Returns (counts as divide returns them, hash table probes, hash table hits), probes and hits of all workers
+    board = BOARD_BACKENDS[backend].from_fen(fen)
+    split_depth = max(1, min(split_depth, depth))
+    tasks = get_parallel_tasks(board, backend, fen, depth, split_depth, hash_megabytes)
+    root_counts = {}
+    hash_probes = 0
+    hash_hits = 0
+    with concurrent.futures.ProcessPoolExecutor(workers or os.cpu_count()) as executor:
+        for task, (nodes, probes, hits) in zip(tasks, executor.map(count_nodes_of_task, tasks)):
+            root_notation = task[2][0]
+            root_counts[root_notation] = root_counts.get(root_notation, 0) + nodes
+            hash_probes += probes
+            hash_hits += hits
+    root_notations = [board.get_move_notation(move) for move in Engine.get_all_moves(board)]
+    return [(notation, root_counts.get(notation, 0)) for notation in root_notations], hash_probes, hash_hits
+
+
+def get_nodes_per_second(nodes, seconds):
+    return int(nodes / seconds) if seconds > 0 else 0
+
+
+def run_reference_positions(max_nodes=100000, board_class=Board.ChessBoard, report=print):
+    # every reference position at every depth with at most max_nodes nodes, returns True if all counts match
+    all_passed = True
+    for name, fen, expected_counts in REFERENCE_POSITIONS:
+        board = board_class.from_fen(fen)
+        for depth, expected_nodes in sorted(expected_counts.items()):
+            if expected_nodes > max_nodes:
+                break
+            start = time.perf_counter()
+            nodes = perft(board, depth)
+            seconds = time.perf_counter() - start
+            passed = nodes == expected_nodes
+            all_passed = all_passed and passed
+            report('{:<22} depth {}  {:>9} nodes  {:>8.2f}s  {:>7} nps  {}'.format(
+                name, depth, nodes, seconds, get_nodes_per_second(nodes, seconds),
+                'ok' if passed else 'FAILED (expected {})'.format(expected_nodes)))
+    return all_passed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Count move generator nodes (perft).')
+    parser.add_argument('--fen', help='position to search, defaults to the reference positions')
+    parser.add_argument('--depth', type=int, default=3)
+    parser.add_argument('--divide', action='store_true', help='print the node count below every root move')
+    parser.add_argument('--max-nodes', type=int, default=100000,
+                        help='largest expected node count to run from the reference positions')
+    parser.add_argument('--backend', choices=sorted(BOARD_BACKENDS), default='mailbox')
+    parser.add_argument('--workers', type=int, default=0,
+                        help='count subtrees in this many processes, -1 for one per core (default: no pool)')
+    parser.add_argument('--split-depth', type=int, default=1, choices=(1, 2),
+                        help='plies expanded in the main process before handing subtrees to the workers')
+    parser.add_argument('--hash-mb', type=float, default=0,
+                        help='cache subtree counts in a table of this many megabytes, one per worker with --workers '
+                             '(default: no hashing)')
+    args = parser.parse_args(argv)
+    if args.depth < 1:
+        parser.error('--depth must be at least 1')
+    board_class = BOARD_BACKENDS[args.backend]
+
+    if args.fen is None and not args.divide and args.workers == 0:
+        return 0 if run_reference_positions(args.max_nodes, board_class) else 1
+
+    fen = args.fen or Board.ChessBoard.STARTING_POSITION_FEN
+    board = board_class.from_fen(fen)
+    table = PerftHashTable(args.hash_mb) if args.hash_mb > 0 and args.workers == 0 else None
+    start = time.perf_counter()
+    if args.workers != 0:
+        counts, hash_probes, hash_hits = parallel_divide(fen, args.depth, args.workers if args.workers > 0 else None,
+                                                         args.split_depth, args.backend, args.hash_mb)
+    elif args.divide:
+        counts = divide(board, args.depth, table)
+    if args.divide:
+        for notation, nodes in counts:
+            print('{}: {}'.format(notation, nodes))
+        nodes = sum(count for _, count in counts)
+        print('\nmoves: {}'.format(len(counts)))
+    elif args.workers != 0:
+        nodes = sum(count for _, count in counts)
+    elif table is not None:
+        nodes = hashed_perft(board, args.depth, table)
+    else:
+        nodes = perft(board, args.depth)
+    seconds = time.perf_counter() - start
+    print('nodes: {}\ntime: {:.2f}s\nnps: {}'.format(nodes, seconds, get_nodes_per_second(nodes, seconds)))
+    if table is not None:
+        print('hash: {} entries, {} probes, {:.1%} hits'.format(table.size, table.probes, table.get_hit_rate()))
+    elif args.workers != 0 and args.hash_mb > 0:
+        print('hash: {:g} MB per worker, {} probes, {:.1%} hits'.format(
+            args.hash_mb, hash_probes, hash_hits / hash_probes if hash_probes else 0.0))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,56 +1,55 @@
 # piece
+import Squares
 
 
 class Piece(object):
     WHITE = 'w'
     BLACK = 'b'
 
-    def __init__(self, color, current_square=None):
+    def __init__(self, color, index=None):
         self.color = color
         assert self.is_white_piece() or self.is_black_piece()
-        self.current_square = current_square
+        self.index = index  # board index of the square the piece is on, see Squares
+        self.symbol = str(self)  # e.g. 'N' or 'n', cached since it's looked up on every board update
 
-    # abstract method
-    def get_possible_squares_to_move_to(self, board):
-        raise NotImplementedError
+    @property
+    def current_square(self):
+        # algebraic notation, e.g. 'e4'
+        if self.index is None:
+            return None
+        return Squares.get_square_from_index(self.index)
 
     # abstract method
-    def is_legal_move(self, board, destination_square):
+    def get_possible_indices_to_move_to(self, board):
         raise NotImplementedError
 
     # abstract method
-    def is_defending_square(self, board, square):
+    def can_move_to_index(self, board, index, ensure_own_king_safety=True):
         raise NotImplementedError
 
-    # abstract method
-    def can_move_to_square(self, board, square, ensure_own_king_safety=True):
-        raise NotImplementedError
-
-    def all_legal_squares_to_move_to(self, board):
-        possible_squares = self.get_possible_squares_to_move_to(board)
-        legal_squares = []
-        if self.is_white_piece():
-            king_to_verify = board.whiteKing
-        else:
-            king_to_verify = board.blackKing
-        for sq in possible_squares:
-            if not board.is_square_on_board(sq):
-                continue
-            if self.is_legal_move(board, sq) \
-                    and not board.is_king_in_check_after_simulating_move(
-                        self.current_square, sq, king_to_verify):
-                legal_squares.append(sq)
-        return legal_squares
-
-    def execute_move(self, board, destination_square):
-        self.special_move_maintenance_before_executing_move(board, destination_square)
-        origin_square = self.current_square
-        piece_to_move = board.get_contents_of_square(origin_square)
-        board.update_square_with_piece(piece_to_move, destination_square)
-        piece_to_move.current_square = destination_square
-        board.clear_square(origin_square)
-
-    def special_move_maintenance_before_executing_move(self, board, destination_square):
+    def is_legal_move(self, board, destination_square):
+        # destination_square in algebraic notation, e.g. 'e4'
+        return self.can_move_to_index(board, Squares.get_index_from_square(destination_square))
+
+    def is_defending_index(self, board, index):
+        return self.can_move_to_index(board, index, False)
+
+    def all_legal_indices_to_move_to(self, board):
+        legal_indices = []
+        for move in board.generate_legal_moves(self.color):
+            if move[0] == self.index and move[1] not in legal_indices:
+                legal_indices.append(move[1])
+        return legal_indices
+
+    def execute_move(self, board, destination_index):
+        self.special_move_maintenance_before_executing_move(board, destination_index)
+        origin_index = self.index
+        piece_to_move = board.board[origin_index]
+        board.update_index_with_piece(piece_to_move, destination_index)
+        piece_to_move.index = destination_index
+        board.clear_index(origin_index)
+
+    def special_move_maintenance_before_executing_move(self, board, destination_index):
         # override where needed, otherwise no maintenance will take place
         pass
 
@@ -68,59 +67,44 @@ class Piece(object):
     def is_opponent_piece(self, piece):
         return self.color != piece.color
 
-    def is_square_occupied_by_opponent_piece(self, board, square):
-        if board.is_square_empty(square):
-            return False
-        return self.is_opponent_piece(board.get_contents_of_square(square))
-
-    def is_viable_square_to_move_to(self, board, destination_square):
-        if not board.is_square_on_board(destination_square):
+    def is_index_occupied_by_opponent_piece(self, board, index):
+        contents = board.board[index]
+        if contents == board.EMPTY_SQUARE:
             return False
+        return self.is_opponent_piece(contents)
 
-        contents_of_destination_square = board.get_contents_of_square(destination_square)
-        if contents_of_destination_square != board.EMPTY_SQUARE and contents_of_destination_square.color == self.color:
+    def is_viable_index_to_move_to(self, board, destination_index):
+        contents_of_destination = board.board[destination_index]
+        if contents_of_destination != board.EMPTY_SQUARE and contents_of_destination.color == self.color:
             return False
 
-        return self.current_square != destination_square
+        return self.index != destination_index
 
-    def get_possible_squares_from_transformations(self, board, transformations):
+    def get_possible_indices_from_transformations(self, transformations):
         # used with Knight, Pawn and King
-        possible_squares = []
-        pos_sq = self.current_square
+        possible_indices = []
         for trans in transformations:
-            pos_row, pos_col = board.get_row_and_col_coordinates_from_square(pos_sq)
-            pos_row, pos_col = board.get_coordinates_after_applying_traversal_incrementer((pos_row, pos_col), trans)
-            if board.is_coordinate_on_board(pos_row, pos_col):
-                possible_squares.append(board.get_square_from_row_and_col_coordinates(pos_row, pos_col))
-        return possible_squares
+            pos_index = Squares.SQUARE_AFTER_TRANSFORMATION[trans][self.index]
+            if pos_index is not None:
+                possible_indices.append(pos_index)
+        return possible_indices
 
-    def get_possible_moves_using_incrementer(self, board, incrementers_list):
+    def get_possible_indices_using_directions(self, board, directions):
         # used with Bishop, Rook and Queen
-        possible_squares = []
-        for incrementer in incrementers_list:
-            pos_sq = self.current_square
-            pos_row, pos_col = board.get_row_and_col_coordinates_from_square(pos_sq)
-            pos_row, pos_col = board.get_coordinates_after_applying_traversal_incrementer(
-                (pos_row, pos_col), incrementer)
-            while self.continue_traversing_transformation(board, pos_row, pos_col):
-                possible_squares.append(board.get_square_from_row_and_col_coordinates(pos_row, pos_col))
-                pos_row, pos_col = board.get_coordinates_after_applying_traversal_incrementer(
-                    (pos_row, pos_col), incrementer)
-
-        return possible_squares
-
-    def continue_traversing_transformation(self, board, pos_row, pos_col):
-        return board.is_coordinate_on_board(pos_row, pos_col) \
-               and (board.is_coordinate_empty(pos_row, pos_col)
-                    or self.is_square_occupied_by_opponent_piece(
-                        board, board.get_square_from_row_and_col_coordinates(pos_row, pos_col)))
-
-    def is_own_king_safe_after_move(self, board, destination_square):
-        if self.is_white_piece():
-            king_to_verify = board.whiteKing
-        else:
-            king_to_verify = board.blackKing
-        return not board.is_king_in_check_after_simulating_move(self.current_square, destination_square, king_to_verify)
+        possible_indices = []
+        for direction in directions:
+            for pos_index in Squares.RAYS[direction][self.index]:
+                contents = board.board[pos_index]
+                if contents == board.EMPTY_SQUARE:
+                    possible_indices.append(pos_index)
+                    continue
+                if self.is_opponent_piece(contents):
+                    possible_indices.append(pos_index)
+                break
+        return possible_indices
+
+    def is_own_king_safe_after_move(self, board, destination_index):
+        return board.is_own_king_safe_after_move(self.index, destination_index)
 
     def get_name(self):
         raise NotImplementedError
@@ -147,22 +131,18 @@ class Pawn(Piece):
     transformationsWhite = [(1, 0), (2, 0), (1, -1), (1, 1)]
     transformationsBlack = [(-1, 0), (-2, 0), (-1, -1), (-1, 1)]
 
-    def special_move_maintenance_before_executing_move(self, board, destination_square):
-        if destination_square == board.enPassantTargetSquare:
+    def special_move_maintenance_before_executing_move(self, board, destination_index):
+        if destination_index == board.en_passant_index:
             # remove the pawn that created the en passant target square
-            pawn_to_clear_row = board.get_row_number_from_square(self.current_square)
-            pawn_to_clear_col = board.get_col_number_from_square(destination_square)
-            board.update_square_with_piece(board.EMPTY_SQUARE,
-                                           board.get_square_from_row_and_col_coordinates(
-                                               pawn_to_clear_row, pawn_to_clear_col))
-
-        elif self.is_forward_two_squares(board, destination_square) and self.is_on_starting_square(board):
-            board.update_en_passant_target_square(self.get_square_one_forward(board))
+            board.update_index_with_piece(board.EMPTY_SQUARE,
+                                          Squares.get_index(Squares.get_row(self.index),
+                                                            Squares.get_col(destination_index)))
+
+        elif self.is_forward_two_squares(destination_index) and self.is_on_starting_square():
+            board.update_en_passant_index(self.get_index_one_forward())
             board.resetEnPassantTargetSquare = False  # to account for back to back en passant making moves
 
-        elif self.is_pawn_on_final_row(board, destination_square):
-            new_piece_color = self.color
-            new_piece_square = self.current_square
+        elif self.is_pawn_on_final_row(destination_index):
             promote_to = board.promotePawnTo
             if promote_to == 'r':
                 new_piece = Rook
@@ -173,104 +153,75 @@ class Pawn(Piece):
             else:  # default to 'q' (queen) if no selection or if invalid
                 new_piece = Queen
 
-            board.add_piece_to_board(new_piece, new_piece_color, [new_piece_square])
+            board.add_piece_to_index(new_piece, self.color, self.index)
 
-    def is_pawn_on_final_row(self, board, square):
-        return abs(board.get_row_number_from_square(square) - self.get_starting_row()) == 6
+    def is_pawn_on_final_row(self, index):
+        return abs(Squares.get_row(index) - self.get_starting_row()) == 6
 
     def get_starting_row(self):
         if self.is_white_piece():
             return self.WHITE_PAWN_STARTING_ROW
         return self.BLACK_PAWN_STARTING_ROW
 
-    def is_on_starting_square(self, board):
-        current_row = board.get_row_number_from_square(self.current_square)
-        return current_row == self.get_starting_row()
-
-    def is_forward_move(self, board, destination_square):
+    def get_forward_row_increment(self):
         if self.is_white_piece():
-            return board.get_row_number_from_square(
-                self.current_square) < board.get_row_number_from_square(destination_square)
-        else:
-            return board.get_row_number_from_square(
-                self.current_square) > board.get_row_number_from_square(destination_square)
+            return 1
+        return -1
 
-    def is_forward_num_of_squares(self, board, destination_square, num_squares):
-        if not self.is_forward_move(board, destination_square):
-            return False
-        # check if any movement besides straight forward
-        if abs(board.get_col_number_from_square(self.current_square)
-                - board.get_col_number_from_square(destination_square)) != 0:
-            return False
-        return abs(board.get_row_number_from_square(self.current_square)
-                   - board.get_row_number_from_square(destination_square)) == num_squares
+    def is_on_starting_square(self):
+        return Squares.get_row(self.index) == self.get_starting_row()
 
-    def is_forward_one_square(self, board, destination_square):
-        return self.is_forward_num_of_squares(board, destination_square, 1)
+    def is_forward_num_of_squares(self, destination_index, num_squares):
+        # straight forward only, no movement to the side
+        return destination_index - self.index == 8 * self.get_forward_row_increment() * num_squares
 
-    def is_forward_two_squares(self, board, destination_square):
-        return self.is_forward_num_of_squares(board, destination_square, 2)
+    def is_forward_one_square(self, destination_index):
+        return self.is_forward_num_of_squares(destination_index, 1)
 
-    def is_forward_and_diagonal_one_square(self, board, destination_square):
-        if not self.is_forward_move(board, destination_square):
-            return False
-        if abs(board.get_row_number_from_square(self.current_square)
-                - board.get_row_number_from_square(destination_square)) != 1:
-            return False
-        if abs(board.get_col_number_from_square(self.current_square)
-                - board.get_col_number_from_square(destination_square)) != 1:
-            return False
-        return True
+    def is_forward_two_squares(self, destination_index):
+        return self.is_forward_num_of_squares(destination_index, 2)
 
-    def get_square_one_forward(self, board):
-        row, col = board.get_row_and_col_coordinates_from_square(self.current_square)
-        if self.is_white_piece():
-            row += 1
-        else:
-            row -= 1
-        return board.get_square_from_row_and_col_coordinates(row, col)
+    def is_forward_and_diagonal_one_square(self, destination_index):
+        return destination_index in Squares.PAWN_ATTACKS[self.color][self.index]
+
+    def get_index_one_forward(self):
+        return self.index + 8 * self.get_forward_row_increment()
 
-    def is_valid_square_to_attack(self, board, destination_square):
-        if not self.is_forward_and_diagonal_one_square(board, destination_square):
+    def is_valid_index_to_attack(self, board, destination_index):
+        if not self.is_forward_and_diagonal_one_square(destination_index):
             return False
-        if self.is_square_occupied_by_opponent_piece(board, destination_square):
+        if self.is_index_occupied_by_opponent_piece(board, destination_index):
             return True
-        return destination_square == board.enPassantTargetSquare
-
-    def is_legal_move(self, board, destination_square):
-        return self.can_move_to_square(board, destination_square)
-
-    def is_defending_square(self, board, square):
-        return self.can_move_to_square(board, square, False)
+        return destination_index == board.en_passant_index
 
-    def can_move_to_square(self, board, square, ensure_own_king_safety=True):
-        if not self.is_viable_square_to_move_to(board, square):
+    def can_move_to_index(self, board, index, ensure_own_king_safety=True):
+        if not self.is_viable_index_to_move_to(board, index):
             return False
 
-        if self.is_forward_one_square(board, square):
-            if not board.is_square_empty(square):
+        if self.is_forward_one_square(index):
+            if board.board[index] != board.EMPTY_SQUARE:
                 return False
-        elif self.is_forward_two_squares(board, square):
-            if not self.is_on_starting_square(board):
+        elif self.is_forward_two_squares(index):
+            if not self.is_on_starting_square():
                 return False
-            if not board.is_empty_orthogonal_from(self.current_square, square):
+            if board.board[self.get_index_one_forward()] != board.EMPTY_SQUARE:
                 return False
-            if not board.is_square_empty(square):
+            if board.board[index] != board.EMPTY_SQUARE:
                 return False
 
-        elif not self.is_valid_square_to_attack(board, square):
+        elif not self.is_valid_index_to_attack(board, index):
             return False
 
         if ensure_own_king_safety:
-            return self.is_own_king_safe_after_move(board, square)
+            return self.is_own_king_safe_after_move(board, index)
         return True
 
-    def get_possible_squares_to_move_to(self, board):
+    def get_possible_indices_to_move_to(self, board):
         if self.is_white_piece():
             transformations = self.transformationsWhite
         else:
             transformations = self.transformationsBlack
-        return self.get_possible_squares_from_transformations(board, transformations)
+        return self.get_possible_indices_from_transformations(transformations)
 
     def get_name(self):
         return 'p'
@@ -284,40 +235,34 @@ class Rook(Piece):
     # (castling is initiated by the king so does not need to be handled here.
     # The rook will be "teleported" to the other side of the king.
     isFirstMove = True
-    orthogonalTransformationsIncrementers = [(1, 0), (-1, 0), (0, 1), (0, -1)]
+    orthogonalTransformationsIncrementers = Squares.ORTHOGONAL_DIRECTIONS
 
-    def special_move_maintenance_before_executing_move(self, board, destination_square):
+    def special_move_maintenance_before_executing_move(self, board, destination_index):
         # check to see if castling privileges should be revoked
         if self.isFirstMove:
-            if self.current_square == 'a1':
+            if self.index == Squares.A1:
                 board.canWhiteCastleLong = False
-            elif self.current_square == 'h1':
+            elif self.index == Squares.H1:
                 board.canWhiteCastleShort = False
-            elif self.current_square == 'a8':
+            elif self.index == Squares.A8:
                 board.canBlackCastleLong = False
-            elif self.current_square == 'h8':
+            elif self.index == Squares.H8:
                 board.canBlackCastleShort = False
             self.isFirstMove = False
 
-    def is_legal_move(self, board, destination_square):
-        return self.can_move_to_square(board, destination_square)
-
-    def is_defending_square(self, board, square):
-        return self.can_move_to_square(board, square, False)
-
-    def can_move_to_square(self, board, square, ensure_own_king_safety=True):
-        if not self.is_viable_square_to_move_to(board, square):
+    def can_move_to_index(self, board, index, ensure_own_king_safety=True):
+        if not self.is_viable_index_to_move_to(board, index):
             return False
 
-        if not board.is_empty_orthogonal_from(self.current_square, square):
+        if not board.is_empty_orthogonal_from(self.index, index):
             return False
 
         if ensure_own_king_safety:
-            return self.is_own_king_safe_after_move(board, square)
+            return self.is_own_king_safe_after_move(board, index)
         return True
 
-    def get_possible_squares_to_move_to(self, board):
-        return self.get_possible_moves_using_incrementer(board, self.orthogonalTransformationsIncrementers)
+    def get_possible_indices_to_move_to(self, board):
+        return self.get_possible_indices_using_directions(board, self.orthogonalTransformationsIncrementers)
 
     def get_name(self):
         return 'r'
@@ -333,39 +278,25 @@ class Knight(Piece):
     #     The target square is on the board
     #     The target square is empty
     #     The target square contains an opponents piece
-    transformations = [(1, 2), (1, -2), (2, 1), (2, -1), (-1, 2), (-1, -2), (-2, 1), (-2, -1)]
+    transformations = Squares.KNIGHT_TRANSFORMATIONS
 
-    def is_move_in_knight_shape(self, board, destination_square):
+    def is_move_in_knight_shape(self, destination_index):
         # aka is move in "L" shape
-        dest_row, dest_col = board.get_row_and_col_coordinates_from_square(destination_square)
-        curr_row, curr_col = board.get_row_and_col_coordinates_from_square(self.current_square)
-
-        if abs(curr_col - dest_col) == 1 and abs(curr_row - dest_row) == 2:
-            return True
-        if abs(curr_col - dest_col) == 2 and abs(curr_row - dest_row) == 1:
-            return True
-
-        return False
-
-    def is_legal_move(self, board, destination_square):
-        return self.can_move_to_square(board, destination_square)
-
-    def is_defending_square(self, board, square):
-        return self.can_move_to_square(board, square, False)
+        return destination_index in Squares.KNIGHT_TARGETS[self.index]
 
-    def can_move_to_square(self, board, square, ensure_own_king_safety=True):
-        if not self.is_viable_square_to_move_to(board, square):
+    def can_move_to_index(self, board, index, ensure_own_king_safety=True):
+        if not self.is_viable_index_to_move_to(board, index):
             return False
 
-        if not self.is_move_in_knight_shape(board, square):
+        if not self.is_move_in_knight_shape(index):
             return False
 
         if ensure_own_king_safety:
-            return self.is_own_king_safe_after_move(board, square)
+            return self.is_own_king_safe_after_move(board, index)
         return True
 
-    def get_possible_squares_to_move_to(self, board):
-        return self.get_possible_squares_from_transformations(board, self.transformations)
+    def get_possible_indices_to_move_to(self, board):
+        return list(Squares.KNIGHT_TARGETS[self.index])
 
     def get_name(self):
         return 'n'
@@ -376,30 +307,21 @@ class Bishop(Piece):
     #     The edge of the board
     #     a square directly before a piece of its own color
     #     a square containing an opponent's piece.
-    diagonalTransformationIncrementers = [(1, 1), (1, -1), (-1, 1), (-1, -1)]
-
-    def is_diagonal_from(self, destination_square):
-        pass
-
-    def is_legal_move(self, board, destination_square):
-        return self.can_move_to_square(board, destination_square)
-
-    def is_defending_square(self, board, square):
-        return self.can_move_to_square(board, square, False)
+    diagonalTransformationIncrementers = Squares.DIAGONAL_DIRECTIONS
 
-    def can_move_to_square(self, board, square, ensure_own_king_safety=True):
-        if not self.is_viable_square_to_move_to(board, square):
+    def can_move_to_index(self, board, index, ensure_own_king_safety=True):
+        if not self.is_viable_index_to_move_to(board, index):
             return False
 
-        if not board.is_empty_diagonal_from(self.current_square, square):
+        if not board.is_empty_diagonal_from(self.index, index):
             return False
 
         if ensure_own_king_safety:
-            return self.is_own_king_safe_after_move(board, square)
+            return self.is_own_king_safe_after_move(board, index)
         return True
 
-    def get_possible_squares_to_move_to(self, board):
-        return self.get_possible_moves_using_incrementer(board, self.diagonalTransformationIncrementers)
+    def get_possible_indices_to_move_to(self, board):
+        return self.get_possible_indices_using_directions(board, self.diagonalTransformationIncrementers)
 
     def get_name(self):
         return 'b'
@@ -407,35 +329,26 @@ class Bishop(Piece):
 
 class Queen(Piece):
     # The queens can move to any square that a bishop or rook can
-    diagonalAndOrthogonalTransformationIncrementers = [
-        (1, 1), (1, -1), (-1, 1), (-1, -1), (1, 0), (-1, 0), (0, 1), (0, -1)]
+    diagonalAndOrthogonalTransformationIncrementers = Squares.ALL_DIRECTIONS
 
-    def is_move_along_empty_diagonal_or_orthogonal(self, board, destination_square):
+    def is_move_along_empty_diagonal_or_orthogonal(self, board, destination_index):
         # check for either legal bishop or rook move
-        if board.is_empty_diagonal_from(self.current_square, destination_square):
-            return True
-        if board.is_empty_orthogonal_from(self.current_square, destination_square):
-            return True
-
-    def is_legal_move(self, board, destination_square):
-        return self.can_move_to_square(board, destination_square)
-
-    def is_defending_square(self, board, square):
-        return self.can_move_to_square(board, square, False)
+        return Squares.DIRECTION_BETWEEN[self.index][destination_index] is not None \
+            and board.is_empty_path_between(self.index, destination_index)
 
-    def can_move_to_square(self, board, square, ensure_own_king_safety=True):
-        if not self.is_viable_square_to_move_to(board, square):
+    def can_move_to_index(self, board, index, ensure_own_king_safety=True):
+        if not self.is_viable_index_to_move_to(board, index):
             return False
 
-        if not self.is_move_along_empty_diagonal_or_orthogonal(board, square):
+        if not self.is_move_along_empty_diagonal_or_orthogonal(board, index):
             return False
 
         if ensure_own_king_safety:
-            return self.is_own_king_safe_after_move(board, square)
+            return self.is_own_king_safe_after_move(board, index)
         return True
 
-    def get_possible_squares_to_move_to(self, board):
-        return self.get_possible_moves_using_incrementer(board, self.diagonalAndOrthogonalTransformationIncrementers)
+    def get_possible_indices_to_move_to(self, board):
+        return self.get_possible_indices_using_directions(board, self.diagonalAndOrthogonalTransformationIncrementers)
 
     def get_name(self):
         return 'q'
@@ -453,16 +366,19 @@ class King(Piece):
     #      There are no other pieces between the king and the rook (before castling is done)
     isFirstMove = True
     transformations = [(1, 1), (1, 0), (1, -1), (0, 1), (0, -1), (-1, 1), (-1, 0), (-1, -1), (0, 2), (0, -2)]
+    # king destination when castling: (square the rook starts on, square the king passes over where the rook lands)
+    CASTLING_ROOK_SQUARES = {Squares.G1: (Squares.H1, Squares.F1), Squares.C1: (Squares.A1, Squares.D1),
+                             Squares.G8: (Squares.H8, Squares.F8), Squares.C8: (Squares.A8, Squares.D8)}
 
-    def special_move_maintenance_before_executing_move(self, board, destination_square):
+    def special_move_maintenance_before_executing_move(self, board, destination_index):
         if self.isFirstMove:
-            if self.is_legal_castling_move(board, destination_square):
-                new_rook_square = self.get_square_king_passes_over_when_castling(destination_square)
-                old_rook_square = self.get_old_rook_square(destination_square)
-                rook_piece = board.get_contents_of_square(old_rook_square)
-                board.clear_square(old_rook_square)
-                board.update_square_with_piece(rook_piece, new_rook_square)
-                rook_piece.current_square = new_rook_square
+            if self.is_legal_castling_move(board, destination_index):
+                new_rook_index = self.get_index_king_passes_over_when_castling(destination_index)
+                old_rook_index = self.get_old_rook_index(destination_index)
+                rook_piece = board.board[old_rook_index]
+                board.clear_index(old_rook_index)
+                board.update_index_with_piece(rook_piece, new_rook_index)
+                rook_piece.index = new_rook_index
 
             self.isFirstMove = False
             if self.is_white_piece():
@@ -472,87 +388,68 @@ class King(Piece):
                 board.canBlackCastleShort = False
                 board.canBlackCastleLong = False
 
-    def is_castling_short_still_available(self, board, destination_square):
-        if self.is_white_piece() and self.current_square == 'e1' and destination_square == 'g1':
-            return board.canWhiteCastleShort
-        elif self.current_square == 'e8' and destination_square == 'g8':
-            return board.canBlackCastleShort
+    def is_castling_still_available(self, board, destination_index):
+        if self.is_white_piece() and self.index == Squares.E1:
+            if destination_index == Squares.G1:
+                return board.canWhiteCastleShort
+            if destination_index == Squares.C1:
+                return board.canWhiteCastleLong
+        elif self.is_black_piece() and self.index == Squares.E8:
+            if destination_index == Squares.G8:
+                return board.canBlackCastleShort
+            if destination_index == Squares.C8:
+                return board.canBlackCastleLong
         return False
 
-    def is_castling_long_still_available(self, board, destination_square):
-        if self.is_white_piece() and self.current_square == 'e1' and destination_square == 'c1':
-            return board.canWhiteCastleLong
-        elif self.current_square == 'e8' and destination_square == 'c8':
-            return board.canBlackCastleLong
-        return False
+    @classmethod
+    def get_index_king_passes_over_when_castling(cls, destination_index):
+        assert destination_index in cls.CASTLING_ROOK_SQUARES
+        return cls.CASTLING_ROOK_SQUARES[destination_index][1]
+
+    @classmethod
+    def get_old_rook_index(cls, destination_index):
+        assert destination_index in cls.CASTLING_ROOK_SQUARES
+        return cls.CASTLING_ROOK_SQUARES[destination_index][0]
 
-    def is_castling_still_available(self, board, destination_square):
-        return self.is_castling_short_still_available(board, destination_square) \
-               or self.is_castling_long_still_available(board, destination_square)
-
-    @staticmethod
-    def get_square_king_passes_over_when_castling(destination_square):
-        assert destination_square in ('g1', 'c1', 'g8', 'c8')
-        if destination_square == 'g1':
-            return 'f1'
-        elif destination_square == 'c1':
-            return 'd1'
-        elif destination_square == 'g8':
-            return 'f8'
-        elif destination_square == 'c8':
-            return 'd8'
-
-    @staticmethod
-    def get_old_rook_square(destination_square):
-        assert destination_square in ('g1', 'c1', 'g8', 'c8')
-        if destination_square == 'g1':
-            return 'h1'
-        elif destination_square == 'c1':
-            return 'a1'
-        elif destination_square == 'g8':
-            return 'h8'
-        elif destination_square == 'c8':
-            return 'a8'
-
-    def is_legal_castling_move(self, board, destination_square):
+    def is_legal_castling_move(self, board, destination_index):
         if not self.isFirstMove:
             return False
-        if not self.is_castling_still_available(board, destination_square):
+        if not self.is_castling_still_available(board, destination_index):
+            return False
+
+        old_rook_index = self.get_old_rook_index(destination_index)
+        rook = board.board[old_rook_index]
+        if type(rook) != Rook or rook.color != self.color:
             return False
 
-        if not board.is_empty_orthogonal_from(self.current_square, destination_square):
+        # every square between king and rook must be empty, including b1/b8 when castling long
+        if not board.is_empty_path_between(self.index, old_rook_index):
             return False
 
-        if board.is_king_in_check(self):
+        if board.is_index_attacked_by(self.index, self.get_color_of_opponent_side()):
             return False
 
         # (destination square check will be handled by game logic that checks if the final position is in check)
 
-        return not board.is_square_under_attack(
-            self.get_square_king_passes_over_when_castling(destination_square),
+        return not board.is_index_attacked_by(
+            self.get_index_king_passes_over_when_castling(destination_index),
             self.get_color_of_opponent_side())
 
-    def is_legal_move(self, board, destination_square):
-        return self.can_move_to_square(board, destination_square)
-
-    def is_defending_square(self, board, square):
-        return self.can_move_to_square(board, square, False)
-
-    def can_move_to_square(self, board, square, ensure_own_king_safety=True):
+    def can_move_to_index(self, board, index, ensure_own_king_safety=True):
         # does not take into consideration: check, checkmate, castling
-        if not self.is_viable_square_to_move_to(board, square):
+        if not self.is_viable_index_to_move_to(board, index):
             return False
 
-        if not board.is_one_square_away(self.current_square, square) \
-                and not self.is_legal_castling_move(board, square):
+        if index not in Squares.KING_TARGETS[self.index] \
+                and not self.is_legal_castling_move(board, index):
             return False
 
         if ensure_own_king_safety:
-            return self.is_own_king_safe_after_move(board, square)
+            return self.is_own_king_safe_after_move(board, index)
         return True
 
-    def get_possible_squares_to_move_to(self, board):
-        return self.get_possible_squares_from_transformations(board, self.transformations)
+    def get_possible_indices_to_move_to(self, board):
+        return self.get_possible_indices_from_transformations(self.transformations)
 
     def get_name(self):
         return 'k'
@@ -0,0 +1,98 @@
+# search benchmark: time to reach a fixed depth on a set of positions, to measure search changes against each other
+#
+# usage:
+#     python SearchBenchmark.py --depth 4                   one process
+#     python SearchBenchmark.py --depth 5 --workers 1 2 4 8  Lazy SMP speedup in time to depth as cores are added
+#     python SearchBenchmark.py --depth 5 --disable null-move    what one search technique gains
+#     python SearchBenchmark.py --depth 5 --multipv 3           what the second and third best lines cost
+import argparse
+import sys
+import time
+
+import Bitboard
+import Board
+from Engine import Engine
+
+BOARD_BACKENDS = {'mailbox': Board.ChessBoard, 'bitboard': Bitboard.BitboardChessBoard}
+
+# --disable choices: the Engine switch each of them turns off (see Engine.SEARCH_SWITCHES)
+SEARCH_SWITCHES = {'null-move': 'use_null_move_pruning', 'lmr': 'use_late_move_reductions',
+                   'futility': 'use_futility_pruning', 'razoring': 'use_razoring',
+                   'pvs': 'use_principal_variation_search', 'aspiration': 'use_aspiration_windows'}
+
+# (name, fen)
+BENCHMARK_POSITIONS = [
+    ('start position', Board.ChessBoard.STARTING_POSITION_FEN),
+    ('kiwipete', 'r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1'),
+    ('middle game', 'r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10'),
+    ('open middle game', 'r1bq1rk1/pp2bppp/2n1pn2/2pp4/2PP4/2NBPN2/PP3PPP/R1BQK2R w KQ - 0 8'),
+    ('rook endgame', '8/5pk1/6p1/8/3R4/6PP/r4PK1/8 w - - 0 40'),
+    ('pawn endgame', '8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1'),
+]
+
+# name, depth/selective depth, nodes, seconds, nps, effective branching factor, re-searches, best move and score
+REPORT_FORMAT = '{:<18} depth {}/{:<2} {:>9} nodes  {:>8.2f}s  {:>7} nps  ebf {:>5.2f}  ' \
+                're-searches {:>4} pvs {:>2} aspiration  {} {}'
+
+
+def run_benchmark(depth, workers=0, board_class=Board.ChessBoard, hash_megabytes=16, report=print, disabled=(),
+                  multipv=1):
+    # searches every benchmark position to depth with a new engine, workers > 0 with Engine.search_parallel.
+    # disabled: names of SEARCH_SWITCHES to turn off. multipv: lines per search, without workers only.
+    # Returns (total seconds, total nodes)
+    total_seconds = 0.0
+    total_nodes = 0
+    for name, fen in BENCHMARK_POSITIONS:
+        board = board_class.from_fen(fen)
+        engine = Engine(hash_megabytes)
+        engine.set_switches({SEARCH_SWITCHES[technique]: False for technique in disabled})
+        start = time.perf_counter()
+        if workers > 0:
+            result = engine.search_parallel(board, workers, depth)
+        else:
+            result = engine.search(board, depth, multipv=multipv)
+        seconds = time.perf_counter() - start
+        total_seconds += seconds
+        total_nodes += result.nodes
+        statistics = result.statistics
+        report(REPORT_FORMAT.format(
+            name, result.depth, statistics.selective_depth, result.nodes, seconds, result.get_nodes_per_second(),
+            statistics.get_effective_branching_factor(), statistics.principal_variation_researches,
+            statistics.aspiration_researches,
+            board.get_move_notation(result.best_move) if result.best_move else '-', result.score))
+    return total_seconds, total_nodes
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Time the search to a fixed depth on the benchmark positions.')
+    parser.add_argument('--depth', type=int, default=4)
+    parser.add_argument('--backend', choices=sorted(BOARD_BACKENDS), default='mailbox')
+    parser.add_argument('--hash-mb', type=float, default=16)
+    parser.add_argument('--workers', type=int, nargs='+', default=[0],
+                        help='search with this many Lazy SMP processes, several counts are compared by time to depth '
+                             '(default: 0, a plain search in this process)')
+    parser.add_argument('--disable', nargs='+', default=[], choices=sorted(SEARCH_SWITCHES) + ['all'],
+                        help='search without these techniques')
+    parser.add_argument('--multipv', type=int, default=1, help='best lines searched in each position (default: 1)')
+    args = parser.parse_args(argv)
+    if args.depth < 1:
+        parser.error('--depth must be at least 1')
+    if args.multipv < 1:
+        parser.error('--multipv must be at least 1')
+    if args.multipv > 1 and any(workers > 0 for workers in args.workers):
+        parser.error('--multipv is only supported without --workers')
+    board_class = BOARD_BACKENDS[args.backend]
+    disabled = sorted(SEARCH_SWITCHES) if 'all' in args.disable else args.disable
+
+    baseline_seconds = None
+    for workers in args.workers:
+        print('workers: {}'.format(workers))
+        seconds, nodes = run_benchmark(args.depth, workers, board_class, args.hash_mb, disabled=disabled,
+                                       multipv=args.multipv)
+        baseline_seconds = baseline_seconds or seconds
+        print('total: {} nodes  {:.2f}s  speedup {:.2f}\n'.format(nodes, seconds, baseline_seconds / seconds))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
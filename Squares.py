@@ -0,0 +1,94 @@
+# square indexing and precomputed board geometry
+# Internally squares are numbered row * 8 + col, so a1 = 0, h1 = 7, a8 = 56 and h8 = 63.
+# Algebraic names such as 'e4' are only used when talking to the outside world.
+
+ALL_COLS = 'abcdefgh'
+ALL_ROWS = '12345678'
+
+SQUARE_NAMES = [col + row for row in ALL_ROWS for col in ALL_COLS]
+SQUARE_INDICES = {name: index for index, name in enumerate(SQUARE_NAMES)}
+
+A1, C1, D1, E1, F1, G1, H1 = 0, 2, 3, 4, 5, 6, 7
+A8, C8, D8, E8, F8, G8, H8 = 56, 58, 59, 60, 61, 62, 63
+
+DIAGONAL_DIRECTIONS = [(1, 1), (1, -1), (-1, 1), (-1, -1)]
+ORTHOGONAL_DIRECTIONS = [(1, 0), (-1, 0), (0, 1), (0, -1)]
+ALL_DIRECTIONS = DIAGONAL_DIRECTIONS + ORTHOGONAL_DIRECTIONS
+KNIGHT_TRANSFORMATIONS = [(1, 2), (1, -2), (2, 1), (2, -1), (-1, 2), (-1, -2), (-2, 1), (-2, -1)]
+
+
+def get_index(row, col):
+    return row * 8 + col
+
+
+def get_row(index):
+    return index >> 3
+
+
+def get_col(index):
+    return index & 7
+
+
+def is_coordinate_on_board(row, col):
+    return (0 <= row <= 7) and (0 <= col <= 7)
+
+
+def _get_squares_after_transformation(transformation):
+    # list indexed by square: the square reached by applying transformation, or None if it falls off the board
+    squares = []
+    for index in range(64):
+        row, col = get_row(index) + transformation[0], get_col(index) + transformation[1]
+        squares.append(get_index(row, col) if is_coordinate_on_board(row, col) else None)
+    return squares
+
+
+def _get_ray(index, direction):
+    # squares walked from index (exclusive) in direction until the edge of the board
+    ray = []
+    row, col = get_row(index) + direction[0], get_col(index) + direction[1]
+    while is_coordinate_on_board(row, col):
+        ray.append(get_index(row, col))
+        row, col = row + direction[0], col + direction[1]
+    return tuple(ray)
+
+
+# SQUARE_AFTER_TRANSFORMATION[(row_inc, col_inc)][index] for every transformation a piece can make in one jump
+SQUARE_AFTER_TRANSFORMATION = {
+    (row_inc, col_inc): _get_squares_after_transformation((row_inc, col_inc))
+    for row_inc in range(-2, 3) for col_inc in range(-2, 3)}
+
+# RAYS[direction][index]
+RAYS = {direction: [_get_ray(index, direction) for index in range(64)] for direction in ALL_DIRECTIONS}
+
+KNIGHT_TARGETS = [tuple(sq for sq in (SQUARE_AFTER_TRANSFORMATION[trans][index] for trans in KNIGHT_TRANSFORMATIONS)
+                        if sq is not None) for index in range(64)]
+KING_TARGETS = [tuple(sq for sq in (SQUARE_AFTER_TRANSFORMATION[direction][index] for direction in ALL_DIRECTIONS)
+                      if sq is not None) for index in range(64)]
+# PAWN_ATTACKS[color][index]: squares a pawn of color standing on index attacks
+PAWN_ATTACKS = {
+    color: [tuple(sq for sq in (SQUARE_AFTER_TRANSFORMATION[(row_inc, col_inc)][index] for col_inc in (-1, 1))
+                  if sq is not None) for index in range(64)]
+    for color, row_inc in (('w', 1), ('b', -1))}
+
+# DIRECTION_BETWEEN[origin][destination]: direction leading from origin to destination, or None if not on a line
+DIRECTION_BETWEEN = [[None] * 64 for _ in range(64)]
+# SQUARES_BETWEEN[origin][destination]: squares strictly between two squares on a line (empty if not on a line)
+SQUARES_BETWEEN = [[()] * 64 for _ in range(64)]
+for _origin in range(64):
+    for _direction in ALL_DIRECTIONS:
+        for _i, _destination in enumerate(RAYS[_direction][_origin]):
+            DIRECTION_BETWEEN[_origin][_destination] = _direction
+            SQUARES_BETWEEN[_origin][_destination] = RAYS[_direction][_origin][:_i]
+
+
+def is_valid_square(square):
+    # square in algebraic notation, e.g. 'e4'
+    return square in SQUARE_INDICES
+
+
+def get_index_from_square(square):
+    return SQUARE_INDICES[square]
+
+
+def get_square_from_index(index):
+    return SQUARE_NAMES[index]
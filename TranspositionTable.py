@@ -0,0 +1,262 @@
+# transposition table: search results of positions, looked up by their zobrist hash (see Board.hash)
+#
+# The table is allocated once from a megabyte budget and never grows. It is split into buckets of two entries:
+# the first keeps the deepest result of the current search (depth-preferred), the second takes everything else,
+# including results pushed out of the first (always-replace).
+# Every entry is two unsigned 64 bit words, the key XOR the data and the packed data. Storing the key XOR the data
+# lets several processes share one table without locks (see SharedTranspositionTable): an entry torn by two writes
+# at once has a key word and a data word that don't belong together, so it no longer matches the position's key.
+# The data word is:
+#
+#     bits  0-15  best move, see pack_move (0 = no move)
+#     bits 16-47  score + SCORE_OFFSET
+#     bits 48-55  remaining depth the score was searched to
+#     bits 56-57  bound: EXACT, LOWER_BOUND (score >= stored score) or UPPER_BOUND (score <= stored score)
+#     bits 58-63  age: the search that stored it, modulo 64
+import array
+from multiprocessing import resource_tracker, shared_memory
+
+EXACT = 0
+LOWER_BOUND = 1
+UPPER_BOUND = 2
+
+BYTES_PER_ENTRY = 16
+ENTRIES_PER_BUCKET = 2
+SCORE_OFFSET = 1 << 31
+AGE_MODULO = 64
+PROMOTION_CODES = {None: 0, 'q': 1, 'r': 2, 'b': 3, 'n': 4}
+PROMOTION_PIECES = (None, 'q', 'r', 'b', 'n')
+SHARED_TABLE_MAGIC = int.from_bytes(b'PYCHESTT', 'little')
+SHARED_TABLE_VERSION = 1
+
+
+def pack_move(move):
+    if move is None:
+        return 0
+    promotion = move[2] if len(move) > 2 else None
+    return move[0] | move[1] << 6 | PROMOTION_CODES[promotion] << 12
+
+
+def unpack_move(packed_move):
+    if packed_move == 0:
+        return None
+    promotion = PROMOTION_PIECES[packed_move >> 12]
+    if promotion is None:
+        return packed_move & 63, packed_move >> 6 & 63
+    return packed_move & 63, packed_move >> 6 & 63, promotion
+
+
+def pack_data(move, score, depth, bound, age):
+    return pack_move(move) | (score + SCORE_OFFSET) << 16 | depth << 48 | bound << 56 | age << 58
+
+
+def unpack_data(data):
+    # (move, score, depth, bound, age)
+    return (unpack_move(data & 0xffff), (data >> 16 & 0xffffffff) - SCORE_OFFSET,
+            data >> 48 & 0xff, data >> 56 & 3, data >> 58)
+
+
+class TranspositionTable:
+    def __init__(self, megabytes=16):
+        self.number_of_buckets = max(1, int(megabytes * 1024 * 1024) // (BYTES_PER_ENTRY * ENTRIES_PER_BUCKET))
+        self.size = self.number_of_buckets * ENTRIES_PER_BUCKET
+        self.megabytes = megabytes
+        self.keys = array.array('Q', bytes(8 * self.size))
+        self.data = array.array('Q', bytes(8 * self.size))  # 0 marks an empty entry
+        self.age = 0
+        self.probes = 0
+        self.hits = 0
+        self.stores = 0
+        self.collisions = 0  # stores that overwrote an entry of a different position
+
+    def clear(self):
+        self.keys = array.array('Q', bytes(8 * self.size))
+        self.data = array.array('Q', bytes(8 * self.size))
+        self.age = 0
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.probes = 0
+        self.hits = 0
+        self.stores = 0
+        self.collisions = 0
+
+    def new_search(self):
+        # entries stored before this are from an older search and are the first to be replaced
+        self.age = (self.age + 1) % AGE_MODULO
+
+    def get_memory_in_bytes(self):
+        return self.size * BYTES_PER_ENTRY
+
+    def probe(self, key):
+        # (move, score, depth, bound) stored for the position with key, or None
+        self.probes += 1
+        slot = key % self.number_of_buckets * ENTRIES_PER_BUCKET
+        for entry in (slot, slot + 1):
+            data = self.data[entry]
+            if data != 0 and self.keys[entry] ^ data == key:
+                self.hits += 1
+                return unpack_data(data)[:4]
+        return None
+
+    def store(self, key, depth, score, bound, move):
+        self.stores += 1
+        slot = key % self.number_of_buckets * ENTRIES_PER_BUCKET
+        keys, data = self.keys, self.data
+        depth = min(max(depth, 0), 255)
+
+        if data[slot] != 0 and keys[slot] ^ data[slot] == key:
+            entry = slot
+        elif data[slot + 1] != 0 and keys[slot + 1] ^ data[slot + 1] == key:
+            entry = slot + 1
+        else:
+            entry = None
+        if entry is not None:
+            # same position: the new result replaces the old one, but keeps its best move if it has none
+            if move is None:
+                move = unpack_move(data[entry] & 0xffff)
+            new_data = pack_data(move, score, depth, bound, self.age)
+            keys[entry], data[entry] = key ^ new_data, new_data
+            return
+
+        old_data = data[slot]
+        if old_data == 0 or old_data >> 58 != self.age or depth >= old_data >> 48 & 0xff:
+            entry = slot
+            if old_data != 0:
+                # move the replaced result to the always-replace entry rather than losing it
+                if data[slot + 1] != 0:
+                    self.collisions += 1
+                keys[slot + 1], data[slot + 1] = keys[slot], old_data
+        else:
+            entry = slot + 1
+            if data[entry] != 0:
+                self.collisions += 1
+        new_data = pack_data(move, score, depth, bound, self.age)
+        keys[entry], data[entry] = key ^ new_data, new_data
+
+    def get_hit_rate(self):
+        return self.hits / self.probes if self.probes else 0.0
+
+    def get_usage(self):
+        # fraction of the first 1000 entries in use, the usual cheap estimate of how full the table is
+        sample = min(1000, self.size)
+        return sum(1 for entry in range(sample) if self.data[entry] != 0) / sample
+
+
+class SharedTranspositionTable(TranspositionTable):
+    # a transposition table in a named shared memory block, read and written by any number of processes at the same
+    # time without locks. Layout of the block, all unsigned 64 bit words in native byte order:
+    #
+    #     words 0-7                      header: SHARED_TABLE_MAGIC, SHARED_TABLE_VERSION, number of buckets,
+    #                                    age of the current search, then 4 reserved words
+    #     the next size words            key XOR data of every entry, bucket b holds entries 2b and 2b + 1
+    #     the next size words            data of every entry, packed as described at the top of this module
+    #
+    # A process that creates the table owns the block and calls unlink when every process is done with it.
+    # The others attach with only the name of the block (see get_name), read its size from the header, and call close.
+    # Integrity: an entry whose key XOR data doesn't belong in its bucket was torn by two writes at once (or the
+    # block was overwritten by something else). probe counts these in corrupt_entries and treats them as empty,
+    # check_integrity scans the whole table. Statistics are kept per process, the age is shared.
+    # Only the owner advances the age, once per search of all processes, before they start (new_search is a no-op
+    # for attached tables): store treats entries of another age as stale, so processes moving it on their own would
+    # replace each other's deep results of the same search
+    HEADER_WORDS = 8
+
+    def __init__(self, megabytes=16, name=None, create=None):
+        # name=None creates a table with a generated name, a name attaches to an existing table unless create=True.
+        # megabytes only matters when creating
+        self.is_owner = name is None or bool(create)
+        if self.is_owner:
+            self.number_of_buckets = max(1, int(megabytes * 1024 * 1024) // (BYTES_PER_ENTRY * ENTRIES_PER_BUCKET))
+            size = self.number_of_buckets * ENTRIES_PER_BUCKET
+            self.memory = shared_memory.SharedMemory(name, create=True,
+                                                     size=self.HEADER_WORDS * 8 + size * BYTES_PER_ENTRY)
+            self.words = self.memory.buf.cast('Q')  # new blocks are zero filled: all entries empty, age 0
+            self.words[0] = SHARED_TABLE_MAGIC
+            self.words[1] = SHARED_TABLE_VERSION
+            self.words[2] = self.number_of_buckets
+        else:
+            self.memory = shared_memory.SharedMemory(name)
+            self.words = self.memory.buf.cast('Q')
+            if len(self.words) < self.HEADER_WORDS or self.words[0] != SHARED_TABLE_MAGIC \
+                    or self.words[1] != SHARED_TABLE_VERSION:
+                self.words.release()
+                self.memory.close()
+                raise ValueError('shared memory block {} is not a transposition table'.format(name))
+            # attaching registered the block with this process's resource tracker, which would remove it when the
+            # process exits, pulling it from under the others. Only the owner keeps it registered, see unlink
+            resource_tracker.unregister(self.memory._name, 'shared_memory')
+            self.number_of_buckets = self.words[2]
+        self.size = self.number_of_buckets * ENTRIES_PER_BUCKET
+        self.megabytes = self.size * BYTES_PER_ENTRY / (1024 * 1024)
+        self.keys = self.words[self.HEADER_WORDS:self.HEADER_WORDS + self.size]
+        self.data = self.words[self.HEADER_WORDS + self.size:self.HEADER_WORDS + 2 * self.size]
+        self.reset_stats()
+
+    @property
+    def age(self):
+        return self.words[3]
+
+    @age.setter
+    def age(self, age):
+        self.words[3] = age
+
+    def get_name(self):
+        return self.memory.name
+
+    def new_search(self):
+        if self.is_owner:
+            super().new_search()
+
+    def reset_stats(self):
+        super().reset_stats()
+        self.corrupt_entries = 0
+
+    def clear(self):
+        # clears the entries for every process attached to the table
+        start = self.HEADER_WORDS * 8
+        self.memory.buf[start:start + self.size * BYTES_PER_ENTRY] = bytes(self.size * BYTES_PER_ENTRY)
+        self.age = 0
+        self.reset_stats()
+
+    def probe(self, key):
+        self.probes += 1
+        bucket = key % self.number_of_buckets
+        slot = bucket * ENTRIES_PER_BUCKET
+        for entry in (slot, slot + 1):
+            data = self.data[entry]
+            if data != 0:
+                stored_key = self.keys[entry] ^ data
+                if stored_key == key:
+                    self.hits += 1
+                    return unpack_data(data)[:4]
+                if stored_key % self.number_of_buckets != bucket:
+                    self.corrupt_entries += 1
+        return None
+
+    def check_integrity(self):
+        # (entries in use, corrupt entries) over the whole table
+        used_entries = 0
+        corrupt_entries = 0
+        keys, data, number_of_buckets = self.keys, self.data, self.number_of_buckets
+        for entry in range(self.size):
+            if data[entry] != 0:
+                used_entries += 1
+                if (keys[entry] ^ data[entry]) % number_of_buckets != entry // ENTRIES_PER_BUCKET:
+                    corrupt_entries += 1
+        return used_entries, corrupt_entries
+
+    def close(self):
+        # the views into the block have to be released before it can be unmapped
+        self.keys.release()
+        self.data.release()
+        self.words.release()
+        self.memory.close()
+
+    def unlink(self):
+        # frees the block once every process has closed it, only for the process that created it.
+        # Registering again first: processes attached to the block may share the owner's resource tracker and have
+        # unregistered it there
+        self.close()
+        resource_tracker.register(self.memory._name, 'shared_memory')
+        self.memory.unlink()
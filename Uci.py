@@ -0,0 +1,292 @@
+# UCI (universal chess interface) driver: plays ChessBoard + Engine over stdin/stdout for chess GUIs and match runners
+#
+# usage:
+#     python Uci.py
+#     python Uci.py --backend bitboard --hash-mb 64
+import argparse
+import sys
+import threading
+import time
+
+import Bitboard
+import Board
+import MoveOrdering
+from Engine import Engine
+
+BOARD_BACKENDS = {'mailbox': Board.ChessBoard, 'bitboard': Bitboard.BitboardChessBoard}
+
+ENGINE_NAME = 'Python Chess'
+ENGINE_AUTHOR = 'Python Chess contributors'
+MIN_HASH_MEGABYTES = 1
+MAX_HASH_MEGABYTES = 1024
+MAX_MULTIPV = 64
+
+# keywords of the go command: searchmoves is followed by moves, infinite and ponder by nothing, the others by a number
+GO_KEYWORDS = ('searchmoves', 'ponder', 'wtime', 'btime', 'winc', 'binc', 'movestogo', 'depth', 'nodes', 'mate',
+               'movetime', 'infinite')
+
+
+class UciDriver:
+    def __init__(self, output=sys.stdout, board_class=Board.ChessBoard, hash_megabytes=16):
+        self.output = output
+        self.output_lock = threading.Lock()  # the search thread reports while the main thread answers commands
+        self.board_class = board_class
+        self.board = board_class()
+        self.engine = Engine(hash_megabytes)
+        self.multipv = 1  # lines searched and reported, see Engine.search
+        self.search_thread = None
+        self.stop_event = None  # set by stop, ends the search of the last go
+        # pondering (go ponder): the search of the position after the expected reply runs without time limits
+        # until ponderhit, which gives it the limits of the move from then on, or stop when the reply was another
+        self.ponder_lock = threading.Lock()  # ponderhit and the end of the search may come at the same time
+        self.pondering = False
+        self.ponder_limits = (None, None)  # (seconds, soft_seconds) the search takes on at ponderhit
+        self.search_finished = False
+        self.soft_deadline = None  # time.perf_counter() value after which no new iteration is started
+        self.hard_timer = None  # threading.Timer that stops the search at the hard limit, after a ponderhit
+
+    def run(self, input_stream=sys.stdin):
+        # answers the commands of input_stream until quit or the end of the input
+        for line in iter(input_stream.readline, ''):
+            if not self.handle_command(line):
+                break
+        self.stop_search()
+
+    def handle_command(self, line):
+        # answers one line of input, returns False after quit. Unknown commands are ignored, as the protocol asks
+        tokens = line.split()
+        if not tokens:
+            return True
+        command, arguments = tokens[0], tokens[1:]
+        if command == 'uci':
+            self.send('id name {}'.format(ENGINE_NAME))
+            self.send('id author {}'.format(ENGINE_AUTHOR))
+            self.send('option name Hash type spin default {} min {} max {}'.format(
+                self.engine.transposition_table.megabytes, MIN_HASH_MEGABYTES, MAX_HASH_MEGABYTES))
+            self.send('option name Ponder type check default false')  # tells the GUI that go ponder is understood
+            self.send('option name MultiPV type spin default 1 min 1 max {}'.format(MAX_MULTIPV))
+            self.send('uciok')
+        elif command == 'isready':
+            self.send('readyok')  # answered at once, also while searching
+        elif command == 'ucinewgame':
+            self.stop_search()
+            self.engine.transposition_table.clear()
+            self.engine.move_orderer = MoveOrdering.MoveOrderer()
+            self.board = self.board_class()
+        elif command == 'setoption':
+            self.set_option(arguments)
+        elif command == 'position':
+            self.set_position(arguments)
+        elif command == 'go':
+            self.go(arguments)
+        elif command == 'ponderhit':
+            self.ponder_hit()
+        elif command == 'stop':
+            self.stop_search()
+        elif command == 'quit':
+            self.stop_search()
+            return False
+        return True
+
+    def send(self, line):
+        with self.output_lock:
+            self.output.write(line + '\n')
+            self.output.flush()
+
+    def set_option(self, arguments):
+        # setoption name <name> value <value>, names are case insensitive
+        if 'name' not in arguments:
+            return
+        name_index = arguments.index('name') + 1
+        value_index = arguments.index('value') if 'value' in arguments else len(arguments)
+        name = ' '.join(arguments[name_index:value_index]).lower()
+        value = ' '.join(arguments[value_index + 1:])
+        if name == 'hash':
+            try:
+                megabytes = min(MAX_HASH_MEGABYTES, max(MIN_HASH_MEGABYTES, int(value)))
+            except ValueError:
+                self.send('info string invalid Hash value: {}'.format(value))
+                return
+            self.stop_search()
+            switches = self.engine.get_switches()
+            self.engine = Engine(megabytes)
+            self.engine.set_switches(switches)
+        elif name == 'multipv':
+            try:
+                self.multipv = min(MAX_MULTIPV, max(1, int(value)))
+            except ValueError:
+                self.send('info string invalid MultiPV value: {}'.format(value))
+
+    def set_position(self, arguments):
+        # position startpos|fen <fen> [moves <move>...], an invalid fen or move keeps the board up to there
+        if 'moves' in arguments:
+            moves_index = arguments.index('moves')
+            moves = arguments[moves_index + 1:]
+            arguments = arguments[:moves_index]
+        else:
+            moves = []
+        if arguments[:1] == ['startpos']:
+            board = self.board_class()
+        elif arguments[:1] == ['fen']:
+            try:
+                board = self.board_class.from_fen(' '.join(arguments[1:]))
+            except ValueError as error:
+                self.send('info string invalid fen: {}'.format(error))
+                return
+        else:
+            return
+        for move in moves:
+            if board.is_game_over or board.parse_move(move) is None or not board.attempt_to_make_move(move):
+                self.send('info string illegal move: {}'.format(move))
+                break
+        self.board = board
+
+    def go(self, arguments):
+        # starts a search on a thread, the thread sends bestmove when a limit is reached or stop is received
+        self.stop_search()
+        if self.board.is_game_over:
+            self.send('bestmove 0000')
+            return
+        limits, infinite, ponder = self.get_search_limits(arguments, self.board)
+        self.pondering = ponder
+        self.ponder_limits = (limits.pop('seconds', None), limits.pop('soft_seconds', None)) if ponder else (None, None)
+        self.search_finished = False
+        self.soft_deadline = None
+        # the search works on a copy: position may change the board while the thread is still sending its result
+        board = self.board_class.from_fen(self.board.to_fen())
+        board.past_game_states = dict(self.board.past_game_states)
+        self.stop_event = threading.Event()
+        self.engine.stop_event = self.stop_event
+        self.search_thread = threading.Thread(target=self.search, args=(board, limits, infinite, self.stop_event),
+                                              daemon=True)
+        self.search_thread.start()
+
+    def get_search_limits(self, arguments, board):
+        # (keyword arguments of Engine.search, whether to wait for stop, whether to ponder) for the arguments of go
+        options = {}
+        index = 0
+        while index < len(arguments):
+            keyword = arguments[index]
+            index += 1
+            if keyword == 'searchmoves':
+                # only the legal ones, with none of them legal every move is searched
+                legal_moves = board.generate_legal_moves()
+                moves = []
+                while index < len(arguments) and arguments[index] not in GO_KEYWORDS:
+                    move = board.parse_move(arguments[index])
+                    if move in legal_moves:
+                        moves.append(move)
+                    index += 1
+                options[keyword] = moves
+            elif keyword in ('infinite', 'ponder'):
+                options[keyword] = True
+            elif keyword in GO_KEYWORDS and index < len(arguments):
+                try:
+                    options[keyword] = int(arguments[index])
+                except ValueError:
+                    pass
+                index += 1
+
+        limits = {'multipv': self.multipv}
+        if 'depth' in options:
+            limits['depth'] = max(1, options['depth'])
+        if 'mate' in options:
+            # a mate in n moves is found by a search of 2n - 1 plies
+            limits['depth'] = min(limits.get('depth', Engine.MAX_PLY), max(1, 2 * options['mate'] - 1))
+        if 'nodes' in options:
+            limits['nodes'] = max(1, options['nodes'])
+        if options.get('searchmoves'):
+            limits['root_moves'] = options['searchmoves']
+        clock, increment = ('wtime', 'winc') if board.is_whites_turn() else ('btime', 'binc')
+        if 'movetime' in options:
+            limits['seconds'] = max(0.0, options['movetime'] / 1000 - Engine.TIME_SAFETY_MARGIN)
+        elif clock in options:
+            limits['seconds'], limits['soft_seconds'] = Engine.allocate_time(
+                options[clock] / 1000, options.get(increment, 0) / 1000, options.get('movestogo'))
+        return limits, 'infinite' in options, 'ponder' in options
+
+    def search(self, board, limits, infinite, stop_event):
+        result = self.engine.search(board, report=self.report_iteration, **limits)
+        with self.ponder_lock:
+            self.search_finished = True
+            wait = infinite or self.pondering
+        if wait:
+            # the protocol asks for bestmove only after stop (or ponderhit), also when the search ended by itself
+            stop_event.wait()
+        if result.best_move is None:
+            self.send('bestmove 0000')
+        elif len(result.pv) > 1:
+            self.send('bestmove {} ponder {}'.format(board.get_move_notation(result.best_move),
+                                                     board.get_move_notation(result.pv[1])))
+        else:
+            self.send('bestmove {}'.format(board.get_move_notation(result.best_move)))
+
+    def report_iteration(self, result):
+        self.send_info(result)
+        if self.soft_deadline is not None and time.perf_counter() >= self.soft_deadline:
+            self.stop_event.set()  # the next iteration would rarely finish in the time left after the ponderhit
+
+    def ponder_hit(self):
+        # the opponent played the expected move: the ponder search goes on as the search of this move, with all it
+        # has searched and stored in the transposition table so far, from now on within the limits of the move
+        with self.ponder_lock:
+            if not self.pondering:
+                return
+            self.pondering = False
+            if self.search_finished:
+                self.stop_event.set()  # sends the bestmove it has been waiting with
+                return
+            seconds, soft_seconds = self.ponder_limits
+            if soft_seconds is not None:
+                self.soft_deadline = time.perf_counter() + soft_seconds
+            if seconds is not None:
+                self.hard_timer = threading.Timer(seconds, self.stop_event.set)
+                self.hard_timer.daemon = True
+                self.hard_timer.start()
+
+    def send_info(self, result):
+        # the info lines of a completed iteration, one per line of a multi-PV search
+        statistics = result.statistics
+        for line_number, line in enumerate(result.lines, 1):
+            self.send('info depth {} seldepth {} multipv {} score {} nodes {} nps {} time {} pv {}'.format(
+                result.depth, max(result.depth, statistics.selective_depth), line_number,
+                get_score_notation(line.score), result.nodes, result.get_nodes_per_second(),
+                int(result.seconds * 1000), ' '.join(Board.ChessBoard.get_move_notation(move) for move in line.pv)))
+
+    def stop_search(self):
+        # stops the running search and waits for its bestmove to be sent. A ponder search is stopped like any
+        # other when the opponent didn't play the expected move, its transposition table entries are kept
+        if self.search_thread is not None:
+            self.stop_event.set()
+            self.wait_for_search()
+
+    def wait_for_search(self):
+        # waits for the running search to end by itself
+        if self.search_thread is not None:
+            self.search_thread.join()
+            self.search_thread = None
+        if self.hard_timer is not None:
+            self.hard_timer.cancel()
+            self.hard_timer = None
+        self.pondering = False
+
+
+def get_score_notation(score):
+    # cp <centipawns>, or mate <moves> for mate scores: negative when the side to move is getting mated
+    if Engine.is_mate_score(score):
+        plies = Engine.MATE_SCORE - abs(score)
+        return 'mate {}'.format((plies + 1) // 2 if score > 0 else -((plies + 1) // 2))
+    return 'cp {}'.format(score)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Play over the universal chess interface on stdin/stdout.')
+    parser.add_argument('--backend', choices=sorted(BOARD_BACKENDS), default='mailbox')
+    parser.add_argument('--hash-mb', type=int, default=16)
+    args = parser.parse_args(argv)
+    UciDriver(sys.stdout, BOARD_BACKENDS[args.backend], args.hash_mb).run(sys.stdin)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,23 @@
+# zobrist hashing keys
+import random
+
+PIECE_SYMBOLS = 'PNBRQKpnbrqk'
+
+_key_generator = random.Random(20240101)  # fixed seed so keys (and therefore hashes) are the same on every run
+
+
+def _get_random_key():
+    return _key_generator.getrandbits(64)
+
+
+# PIECE_SQUARE_KEYS['N'][square_index] where square_index = row * 8 + col (a1 = 0, h8 = 63)
+PIECE_SQUARE_KEYS = {symbol: [_get_random_key() for _ in range(64)] for symbol in PIECE_SYMBOLS}
+BLACK_TO_MOVE_KEY = _get_random_key()
+# CASTLING_KEYS[mask], mask bits: 1 = white short, 2 = white long, 4 = black short, 8 = black long
+_castling_right_keys = [_get_random_key() for _ in range(4)]
+CASTLING_KEYS = [0] * 16
+for _mask in range(16):
+    for _bit in range(4):
+        if _mask & (1 << _bit):
+            CASTLING_KEYS[_mask] ^= _castling_right_keys[_bit]
+EN_PASSANT_FILE_KEYS = [_get_random_key() for _ in range(8)]